@@ -0,0 +1,83 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+import argparse
+
+from config.config import MODEL_CACHE_DIR
+from detection.drawer import DetectionDrawer
+from detection.optimized_model import OptimizedDETRModel
+from main import build_model_factory
+from processor.batch_job import BatchJob
+from processor.frame_processor import FrameProcessor
+
+def main(source, output_dir, workers=1, torch_threads=None, frame_rate=1, batch_size=1, sampling="read",
+         store_video=False, write_detections=True, backend="eager", quantize=False, input_size=(800, 800),
+         model_cache_dir=MODEL_CACHE_DIR, roi=None, tiles=(1, 1), tile_overlap=0.2, interop_threads=None):
+    """
+    Processes every video of a directory or manifest, resuming after the clips already done.
+
+    Args:
+        source (str): A directory searched recursively for videos, or a manifest file with one video path per line.
+        output_dir (str): Directory holding summary.jsonl and one output directory per clip.
+        workers (int): Number of worker processes, each loading the model once.
+        torch_threads (int): Number of torch intra-op threads per worker, defaults to sharing the cores.
+        frame_rate (int): Frame extraction rate in milliseconds.
+        batch_size (int): Number of frames analyzed per model call.
+        sampling (str): How skipped frames are stepped over, see FrameProcessor.stream_frames.
+        store_video (bool): Whether to write an annotated video per clip.
+        write_detections (bool): Whether to write the detections of each clip to detections.jsonl.
+        backend (str): Inference backend, see main.main.
+        quantize (bool): Whether to apply dynamic int8 quantization to the backend.
+        input_size (tuple): Fixed (height, width) input size of the exported backends.
+        model_cache_dir (str): Local serialized model cache directory, or None to disable it.
+        roi (tuple): The (x, y, width, height) region of the frames to analyze, in pixels.
+        tiles (tuple): The number of (rows, columns) the region is split into.
+        tile_overlap (float): Fraction of a tile shared with its neighbours.
+        interop_threads (int): Number of torch inter-op threads per worker.
+
+    Returns:
+        list: The summary of every clip processed by this run.
+    """
+    model_factory = build_model_factory(backend, quantize, input_size, model_cache_dir, roi, tiles, tile_overlap)
+    job = BatchJob(model_factory, output_dir, workers, torch_threads, batch_size, frame_rate, sampling, store_video,
+                   write_detections, DetectionDrawer if store_video else None, interop_threads)
+    summaries = job.run(BatchJob.discover(source))
+
+    failed = [summary for summary in summaries if summary["status"] != "ok"]
+    frames = sum(summary.get("frames", 0) for summary in summaries)
+    detections = sum(summary.get("detections", 0) for summary in summaries)
+    print(f"Processed {len(summaries) - len(failed)} clips, {frames} frames, {detections} detections; {len(failed)} failed")
+    return summaries
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch Object Detection over many Videos")
+    parser.add_argument("source", type=str, help="Directory of videos, or a manifest with one video path per line.")
+    parser.add_argument("--output_dir", type=str, required=True, help="Directory of the summary and per-clip outputs.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each loading the model once.")
+    parser.add_argument("--torch_threads", type=int, default=None, help="Torch threads per worker.")
+    parser.add_argument("--interop_threads", type=int, default=None, help="Torch inter-op threads per worker.")
+    parser.add_argument("--frame_rate", type=int, default=1, help="Frame extraction rate per ms.")
+    parser.add_argument("--batch_size", type=int, default=1, help="Frames analyzed per model call.")
+    parser.add_argument("--sampling", type=str, default="read", choices=FrameProcessor.SAMPLING_MODES,
+                        help="How skipped frames are stepped over.")
+    parser.add_argument("--store_video", action="store_true", help="Write an annotated video per clip.")
+    parser.add_argument("--no_detections", action="store_true", help="Skip writing detections.jsonl per clip.")
+    parser.add_argument("--backend", type=str, default="eager", choices=("eager",) + OptimizedDETRModel.BACKENDS,
+                        help="Inference backend.")
+    parser.add_argument("--quantize", action="store_true", help="Apply dynamic int8 quantization to the backend.")
+    parser.add_argument("--input_size", type=int, nargs=2, default=(800, 800), metavar=("HEIGHT", "WIDTH"),
+                        help="Fixed input size of the exported backends.")
+    parser.add_argument("--model_cache_dir", type=str, default=MODEL_CACHE_DIR,
+                        help="Local serialized model cache directory, empty to disable.")
+    parser.add_argument("--roi", type=int, nargs=4, default=None, metavar=("X", "Y", "WIDTH", "HEIGHT"),
+                        help="Region of the frames to analyze, in pixels.")
+    parser.add_argument("--tiles", type=int, nargs=2, default=(1, 1), metavar=("ROWS", "COLUMNS"),
+                        help="Split the region into overlapping tiles analyzed as one batch.")
+    parser.add_argument("--tile_overlap", type=float, default=0.2, help="Fraction of a tile shared with its neighbours.")
+    args = parser.parse_args()
+
+    main(args.source, args.output_dir, args.workers, args.torch_threads, args.frame_rate, args.batch_size, args.sampling,
+         args.store_video, not args.no_detections, args.backend, args.quantize, tuple(args.input_size),
+         args.model_cache_dir or None, args.roi, tuple(args.tiles), args.tile_overlap, args.interop_threads)
@@ -0,0 +1,204 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+Autotune of the eager model's CPU inference settings on the current host.
+
+Measures the throughput of the eager DETR model under different intra-op and
+inter-op thread counts, bf16 autocast, the channels_last memory format and a
+fixed input size, and saves the fastest combination where main.py and
+server.py load it by default. The settings are tuned one at a time, keeping
+the best value of each before moving to the next, which needs far fewer runs
+than the full grid. Every candidate runs in a fresh process, since inter-op
+threads can only be set once per process.
+
+Candidates whose detections on the tuning frames differ from those of the
+default settings, by label or by more than --box_tolerance on a box, are
+rejected, so pass a representative video with --video_path. Synthetic frames
+rarely contain anything to detect, so when the default settings detect nothing
+the settings that change detections (bf16 and the fixed input size) cannot be
+verified and are never selected.
+
+Usage:
+    python -m benchmarks.autotune
+    python -m benchmarks.autotune --video_path=input_video.mp4 --batch_size=4 --iterations=5
+"""
+
+import argparse
+import multiprocessing
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+
+from benchmarks.benchmark_engines import measure
+from config.config import INFERENCE_CONFIG_PATH, MODEL_CACHE_DIR
+from config.inference_config import InferenceConfig
+from detection.model import DETRModel
+from processor.frame_processor import FrameProcessor
+
+def candidate_values(cpu_count, input_size):
+    """
+    Lists the values tried for every setting, in tuning order.
+
+    Args:
+        cpu_count (int): Number of cores of the host.
+        input_size (tuple): The (height, width) tried as fixed input size.
+
+    Returns:
+        list: The (setting, values) pairs; the first value of each is the default.
+    """
+    intra_op_threads = sorted({cpu_count, max(1, cpu_count // 2), max(1, cpu_count // 4)}, reverse=True)
+    return [
+        ("intra_op_threads", [None] + intra_op_threads),
+        ("inter_op_threads", [None, 1, 2]),
+        ("bf16", [False, True]),
+        ("channels_last", [False, True]),
+        ("input_size", [None, tuple(input_size)]),
+    ]
+
+# Settings that change the detections, which can only be verified on frames with detections
+ACCURACY_SETTINGS = ("bf16", "input_size")
+
+def same_detections(detections, reference, box_tolerance=0.01):
+    """
+    Checks whether detections match a reference, with the same labels and nearby boxes.
+
+    Args:
+        detections (list): The (labels, boxes) of every frame.
+        reference (list): The (labels, boxes) of every frame under the default settings.
+        box_tolerance (float): Largest difference allowed on a normalized box coordinate.
+
+    Returns:
+        bool: Whether the detections match.
+    """
+    if len(detections) != len(reference):
+        return False
+    for (labels, boxes), (reference_labels, reference_boxes) in zip(detections, reference):
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        reference_boxes = np.asarray(reference_boxes, dtype=np.float64).reshape(-1, 4)
+        if list(labels) != list(reference_labels) or not np.allclose(boxes, reference_boxes, rtol=0, atol=box_tolerance):
+            return False
+    return True
+
+def tune(measure_config, candidates, base=None, box_tolerance=0.01):
+    """
+    Tunes the settings one at a time, keeping the fastest value of each.
+
+    Args:
+        measure_config (callable): Measures a configuration, returning its frames per
+            second and its (labels, boxes) detections on the tuning frames.
+        candidates (list): The (setting, values) pairs to try, in order.
+        base (InferenceConfig): The configuration the search starts from and whose
+            detections the candidates must reproduce, the defaults when None.
+        box_tolerance (float): Largest difference allowed on a normalized box coordinate.
+
+    Returns:
+        tuple: The fastest configuration and the measurements of every run, as a list of
+        dicts with the settings, the frames per second and whether it was rejected.
+    """
+    best = base if base is not None else InferenceConfig()
+    best_fps, reference = measure_config(best)
+    runs = [{"config": best.to_dict(), "fps": best_fps, "rejected": False}]
+    print(f"{best}: {best_fps:.2f} frames/sec")
+    verifiable = any(len(labels) for labels, _ in reference)
+    if not verifiable:
+        print(f"Nothing detected on the tuning frames, so {' and '.join(ACCURACY_SETTINGS)} are left unchanged")
+    for field, values in candidates:
+        if field in ACCURACY_SETTINGS and not verifiable:
+            continue
+        for value in values:
+            if value == getattr(best, field):
+                continue
+            candidate = best.replace(**{field: value})
+            fps, detections = measure_config(candidate)
+            rejected = not same_detections(detections, reference, box_tolerance)
+            runs.append({"config": candidate.to_dict(), "fps": fps, "rejected": rejected})
+            print(f"{candidate}: {fps:.2f} frames/sec{' (rejected, detections differ)' if rejected else ''}")
+            if not rejected and fps > best_fps:
+                best, best_fps = candidate, fps
+    return best, runs
+
+def load_frames(video_path, width, height, batch_size):
+    """
+    Loads the frames the candidates are measured on.
+
+    Args:
+        video_path (str): Video the first frames are taken from, or None for synthetic frames.
+        width (int): Width of the synthetic frames.
+        height (int): Height of the synthetic frames.
+        batch_size (int): Number of frames.
+
+    Returns:
+        list: The frames.
+    """
+    if video_path is None:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(batch_size)]
+    _, frames = FrameProcessor(None, None).stream_frames(video_path)
+    return [frame for _, (_, frame) in zip(range(batch_size), frames)]
+
+def _measure_in_process(model_name, model_cache_dir, config_dict, frames, iterations):
+    """
+    Measures a configuration in the current process, which must be fresh.
+
+    Args:
+        model_name (str): Name or path of the DETR model.
+        model_cache_dir (str): Directory of the local serialized model copies.
+        config_dict (dict): The settings to measure.
+        frames (list): The batch of frames analyzed on each iteration.
+        iterations (int): Number of timed iterations.
+
+    Returns:
+        tuple: The frames per second and the (labels, boxes) detected in every frame.
+    """
+    inference_config = InferenceConfig.from_dict(config_dict)
+    inference_config.apply()
+    model = DETRModel(model_name, model_cache_dir=model_cache_dir, inference_config=inference_config)
+    detections = [(list(labels), np.asarray(boxes).tolist()) for labels, boxes in model.analyze_frames(frames)]
+    return measure(model, frames, iterations), detections
+
+def main(model_name, model_cache_dir, video_path, width, height, batch_size, iterations, input_size, output,
+         box_tolerance=0.01):
+    frames = load_frames(video_path, width, height, batch_size)
+    context = multiprocessing.get_context("spawn")
+
+    def measure_config(inference_config):
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            return executor.submit(_measure_in_process, model_name, model_cache_dir, inference_config.to_dict(),
+                                   frames, iterations).result()
+
+    start = time.perf_counter()
+    best, runs = tune(measure_config, candidate_values(os.cpu_count() or 1, input_size), box_tolerance=box_tolerance)
+    print(f"Fastest: {best} at {max(run['fps'] for run in runs if not run['rejected']):.2f} frames/sec")
+    best.save(output, autotune={
+        "model_name": model_name, "frames": len(frames), "frame_size": list(frames[0].shape[:2]),
+        "iterations": iterations, "box_tolerance": box_tolerance, "seconds": time.perf_counter() - start, "platform": platform.platform(),
+        "torch": torch.__version__, "runs": runs,
+    })
+    print(f"Saved to {output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inference Settings Autotune")
+    parser.add_argument("--model_name", type=str, default="facebook/detr-resnet-50", help="Model name or path.")
+    parser.add_argument("--model_cache_dir", type=str, default=MODEL_CACHE_DIR,
+                        help="Local serialized model cache directory, empty to disable.")
+    parser.add_argument("--video_path", type=str, default=None, help="Tune on the first frames of this video.")
+    parser.add_argument("--width", type=int, default=1280, help="Width of the synthetic frames.")
+    parser.add_argument("--height", type=int, default=720, help="Height of the synthetic frames.")
+    parser.add_argument("--batch_size", type=int, default=4, help="Frames analyzed per model call.")
+    parser.add_argument("--iterations", type=int, default=3, help="Timed iterations per candidate.")
+    parser.add_argument("--input_size", type=int, nargs=2, default=(800, 800), metavar=("HEIGHT", "WIDTH"),
+                        help="Fixed input size to try.")
+    parser.add_argument("--box_tolerance", type=float, default=0.01,
+                        help="Largest difference allowed on a normalized box coordinate.")
+    parser.add_argument("--output", type=str, default=INFERENCE_CONFIG_PATH, help="Where to save the fastest settings.")
+    args = parser.parse_args()
+
+    main(args.model_name, args.model_cache_dir or None, args.video_path, args.width, args.height, args.batch_size,
+         args.iterations, tuple(args.input_size), args.output, args.box_tolerance)
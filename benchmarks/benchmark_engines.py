@@ -0,0 +1,73 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+Benchmark comparing the CPU throughput of the DETR inference backends.
+
+Runs the eager model and every exported backend, with and without int8
+quantization, on synthetic frames and reports frames per second.
+
+Usage:
+    python -m benchmarks.benchmark_engines --batch_size=4 --iterations=10
+    python -m benchmarks.benchmark_engines --model_name=/path/to/local/detr
+"""
+
+import argparse
+import importlib.util
+import time
+
+import numpy as np
+
+from detection.model import DETRModel
+from detection.optimized_model import OptimizedDETRModel
+
+def measure(model, frames, iterations):
+    """
+    Measures the throughput of a model on a batch of frames.
+
+    Args:
+        model: The object detection model to measure.
+        frames (list): The batch of frames analyzed on each iteration.
+        iterations (int): Number of timed iterations, after one warm-up iteration.
+
+    Returns:
+        float: The number of frames analyzed per second.
+    """
+    model.analyze_frames(frames)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        model.analyze_frames(frames)
+    return len(frames) * iterations / (time.perf_counter() - start)
+
+def main(model_name, width, height, batch_size, iterations, input_size):
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(batch_size)]
+
+    variants = [("eager", lambda: DETRModel(model_name))]
+    backends = ["torchscript"]
+    if importlib.util.find_spec("onnxruntime") is not None:
+        backends.append("onnx")
+    for backend in backends:
+        for quantize in (False, True):
+            name = f"{backend}{'+int8' if quantize else ''}"
+            variants.append((name, lambda backend=backend, quantize=quantize: OptimizedDETRModel(
+                model_name, backend=backend, quantize=quantize, input_size=input_size)))
+
+    for name, factory in variants:
+        fps = measure(factory(), frames, iterations)
+        print(f"{name:>16}: {fps:.2f} frames/sec")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inference Backend Benchmark")
+    parser.add_argument("--model_name", type=str, default="facebook/detr-resnet-50", help="Model name or path.")
+    parser.add_argument("--width", type=int, default=1280, help="Frame width.")
+    parser.add_argument("--height", type=int, default=720, help="Frame height.")
+    parser.add_argument("--batch_size", type=int, default=4, help="Frames analyzed per model call.")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed iterations per backend.")
+    parser.add_argument("--input_size", type=int, nargs=2, default=(800, 800), metavar=("HEIGHT", "WIDTH"),
+                        help="Fixed input size of the exported backends.")
+    args = parser.parse_args()
+
+    main(args.model_name, args.width, args.height, args.batch_size, args.iterations, tuple(args.input_size))
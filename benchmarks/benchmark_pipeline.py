@@ -0,0 +1,279 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+End-to-end benchmark of the video processing pipeline.
+
+Generates a synthetic video, so no network access is needed, and runs it
+through FrameProcessor with either the real DETR model or a stub model of
+the same shape. Reports the time spent in each stage, decode, preprocess,
+forward, postprocess, draw, image write and encode, along with frames per
+second and peak RSS, as JSON. A previous result can be passed as a baseline
+to fail on throughput regressions.
+
+Usage:
+    python -m benchmarks.benchmark_pipeline --model=stub --seconds=5 --output=results.json
+    python -m benchmarks.benchmark_pipeline --model=detr --model_name=/path/to/local/detr
+    python -m benchmarks.benchmark_pipeline --baseline=results.json --tolerance=0.1
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from benchmarks.benchmark_sampling import write_synthetic_video
+from config.config import RESTRICTED_CLASSES
+from detection.drawer import DetectionDrawer
+from detection.model import DETRModel, ObjectDetectionModel
+from processor.frame_processor import FrameProcessor
+from processor.image_writer import AsyncImageWriter
+
+STAGES = ("decode", "preprocess", "forward", "postprocess", "draw", "image_write", "encode")
+
+class StubModel(ObjectDetectionModel):
+    def __init__(self, input_size=(800, 800), detections=3):
+        """
+        Initializes a stand-in for DETRModel with the same stages and output format.
+
+        The forward pass is a fixed amount of matrix work, so the other stages
+        can be measured without the real model.
+
+        Args:
+            input_size (tuple): The (height, width) frames are resized to.
+            detections (int): Number of detections reported per frame.
+        """
+        self.model_name = "stub"
+        self.model_id = "stub"
+        self.threshold = 0.9
+        self.id2label = dict(RESTRICTED_CLASSES)
+        self.input_size = input_size
+        self.detections = detections
+        self._weights = torch.randn(256, 256)
+
+    def analyze_frame(self, frame, return_scores=False):
+        return self.analyze_frames([frame], return_scores)[0]
+
+    def analyze_frames(self, frames, return_scores=False):
+        return self._postprocess(self._forward(self._preprocess(frames)), return_scores)
+
+    def _preprocess(self, frames):
+        height, width = self.input_size
+        return torch.from_numpy(np.stack([cv2.resize(frame, (width, height)) for frame in frames]))
+
+    def _forward(self, pixel_values):
+        features = torch.randn(len(pixel_values), 256)
+        for _ in range(50):
+            features = torch.tanh(features @ self._weights)
+        return features
+
+    def _postprocess(self, features, return_scores):
+        labels = list(RESTRICTED_CLASSES)[:self.detections]
+        boxes = np.tile([0.5, 0.5, 0.2, 0.2], (len(labels), 1)) * np.linspace(0.5, 1.5, len(labels))[:, None]
+        scores = np.full(len(labels), 0.95)
+        return [(labels, boxes, scores) if return_scores else (labels, boxes) for _ in range(len(features))]
+
+class StageTimer:
+    def __init__(self):
+        """
+        Accumulates the time spent in each pipeline stage.
+        """
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.calls = dict.fromkeys(STAGES, 0)
+
+    def wrap(self, obj, name, stage):
+        """
+        Replaces a method of an object with a version that times every call.
+
+        Args:
+            obj: The object owning the method.
+            name (str): Name of the method.
+            stage (str): The stage the time is added to.
+        """
+        method = getattr(obj, name)
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        setattr(obj, name, timed)
+
+    def wrap_iter(self, iterable, stage):
+        """
+        Times how long every item of an iterable takes to produce.
+
+        Args:
+            iterable: The iterable to time.
+            stage (str): The stage the time is added to.
+
+        Yields:
+            The items of the iterable.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - start, calls=0)
+                return
+            self.add(stage, time.perf_counter() - start)
+            yield item
+
+    def add(self, stage, seconds, calls=1):
+        """
+        Adds calls and their duration to a stage.
+
+        Args:
+            stage (str): The stage.
+            seconds (float): The duration of the calls.
+            calls (int): The number of calls.
+        """
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + calls
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the process.
+
+    Returns:
+        float: The peak RSS in megabytes, or None where the resource module is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+def run_benchmark(video_path, model, batch_size=1, frame_rate=1, image_format=None, store_video=True, work_dir=None):
+    """
+    Runs a video through the pipeline and times each stage.
+
+    Args:
+        video_path (str): Path to the input video file.
+        model: The object detection model, a DETRModel or a StubModel.
+        batch_size (int): Number of frames analyzed per model call.
+        frame_rate (int): Frame extraction rate in milliseconds.
+        image_format (str): Format frames are saved in, or None to not save them.
+        store_video (bool): Whether to encode the output video.
+        work_dir (str): Directory the images and video are written to.
+
+    Returns:
+        dict: The per-stage seconds and milliseconds per frame, the frame count, frames per second and peak RSS.
+    """
+    timer = StageTimer()
+    for name, stage in (("_preprocess", "preprocess"), ("_forward", "forward"), ("_postprocess", "postprocess")):
+        timer.wrap(model, name, stage)
+    drawer = DetectionDrawer()
+    timer.wrap(drawer, "draw_detections", "draw")
+    image_writer = AsyncImageWriter(work_dir, image_format) if image_format is not None else None
+    processor = FrameProcessor(model, drawer, batch_size, image_writer=image_writer)
+    timer.wrap(processor, "_save_frame", "image_write")
+
+    start = time.perf_counter()
+    fps, frames = processor.stream_frames(video_path, frame_rate)
+    processed_frames = timer.wrap_iter(processor.process_frames(timer.wrap_iter(frames, "decode")), "upstream")
+    # The encoder pulls the output frames, so encoding is the time not spent producing them
+    encode_start = time.perf_counter()
+    processor.compile_video(processed_frames, work_dir if store_video else None, fps)
+    timer.seconds["encode"] = time.perf_counter() - encode_start - timer.seconds.pop("upstream", 0.0)
+    if image_writer is not None:
+        write_start = time.perf_counter()
+        image_writer.close()
+        timer.seconds["image_write"] += time.perf_counter() - write_start
+    elapsed = time.perf_counter() - start
+
+    frame_count = timer.calls["decode"]
+    return {
+        "frames": frame_count,
+        "seconds": elapsed,
+        "fps": frame_count / elapsed if elapsed else 0.0,
+        "stages": {stage: {"seconds": seconds, "ms_per_frame": 1000 * seconds / max(frame_count, 1)}
+                   for stage, seconds in timer.seconds.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def check_regression(result, baseline_path, tolerance):
+    """
+    Compares the throughput of a run against a previous result.
+
+    Args:
+        result (dict): The result of the current run.
+        baseline_path (str): Path of a JSON result written by a previous run.
+        tolerance (float): Fraction of the baseline frames per second that may be lost.
+
+    Returns:
+        bool: True if the throughput is within tolerance of the baseline.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    floor = baseline["result"]["fps"] * (1 - tolerance)
+    print(f"Baseline: {baseline['result']['fps']:.2f} frames/sec, current: {result['fps']:.2f} frames/sec", file=sys.stderr)
+    return result["fps"] >= floor
+
+def main(model_type, model_name, width, height, fps, seconds, batch_size, frame_rate, image_format, store_video,
+         output, baseline, tolerance):
+    config = {
+        "model": model_type, "model_name": model_name if model_type == "detr" else None, "width": width, "height": height,
+        "fps": fps, "seconds": seconds, "batch_size": batch_size, "frame_rate": frame_rate,
+        "image_format": image_format, "store_video": store_video,
+    }
+    model = DETRModel(model_name) if model_type == "detr" else StubModel()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = os.path.join(tmp_dir, "synthetic.mp4")
+        write_synthetic_video(video_path, width, height, fps, seconds)
+        work_dir = os.path.join(tmp_dir, "output")
+        os.makedirs(work_dir)
+        result = run_benchmark(video_path, model, batch_size, frame_rate, image_format, store_video, work_dir)
+
+    report = {
+        "config": config,
+        "environment": {
+            "python": platform.python_version(), "platform": platform.platform(), "torch": torch.__version__,
+            "torch_threads": torch.get_num_threads(), "opencv": cv2.__version__,
+        },
+        "result": result,
+    }
+    print(json.dumps(report, indent=2))
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    if baseline is not None and not check_regression(result, baseline, tolerance):
+        sys.exit("Throughput regressed beyond the tolerance")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end Pipeline Benchmark")
+    parser.add_argument("--model", type=str, default="stub", choices=("stub", "detr"), help="Model to run.")
+    parser.add_argument("--model_name", type=str, default="facebook/detr-resnet-50",
+                        help="Name or local path of the DETR model.")
+    parser.add_argument("--width", type=int, default=1280, help="Frame width.")
+    parser.add_argument("--height", type=int, default=720, help="Frame height.")
+    parser.add_argument("--fps", type=int, default=30, help="Frames per second of the synthetic video.")
+    parser.add_argument("--seconds", type=int, default=5, help="Duration of the synthetic video.")
+    parser.add_argument("--batch_size", type=int, default=1, help="Frames analyzed per model call.")
+    parser.add_argument("--frame_rate", type=int, default=1, help="Frame extraction rate per ms.")
+    parser.add_argument("--image_format", type=str, default=None, choices=AsyncImageWriter.FORMATS,
+                        help="Save the frames in this format.")
+    parser.add_argument("--no_video", action="store_true", help="Skip encoding the output video.")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON results to this file.")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON results of a previous run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed frames/sec loss against the baseline.")
+    args = parser.parse_args()
+
+    main(args.model, args.model_name, args.width, args.height, args.fps, args.seconds, args.batch_size, args.frame_rate,
+         args.image_format, not args.no_video, args.output, args.baseline, args.tolerance)
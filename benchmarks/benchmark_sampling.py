@@ -0,0 +1,97 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+Benchmark comparing the frame sampling modes of FrameProcessor.
+
+Generates a synthetic video, extracts frames from it with every sampling mode
+and reports the wall-clock time of each, checking that all modes decode the
+same frames. Frame contents are compared through checksums, since the seek
+mode relies on CAP_PROP_POS_FRAMES, which is approximate for some codecs.
+
+Usage:
+    python -m benchmarks.benchmark_sampling --fps=60 --seconds=30 --frame_rate=1000
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from processor.frame_processor import FrameProcessor
+
+def write_synthetic_video(video_path, width, height, fps, seconds):
+    """
+    Writes a synthetic video of moving noise, which does not compress away.
+
+    Args:
+        video_path (str): Path of the video to write.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        fps (int): Frames per second of the video.
+        seconds (int): Duration of the video in seconds.
+    """
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, (height, width * 2, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for idx in range(fps * seconds):
+        offset = idx % width
+        writer.write(np.ascontiguousarray(base[:, offset:offset + width]))
+    writer.release()
+
+def run_benchmark(video_path, frame_rate):
+    """
+    Extracts frames with every sampling mode and times each run.
+
+    Args:
+        video_path (str): Path to the input video file.
+        frame_rate (int): Frame extraction rate in milliseconds.
+
+    Returns:
+        dict: The elapsed seconds, selected frame indices and frame checksums of each sampling mode.
+    """
+    processor = FrameProcessor(None, None)
+    results = {}
+    for sampling in FrameProcessor.SAMPLING_MODES:
+        start = time.perf_counter()
+        _, frames = processor.stream_frames(video_path, frame_rate, sampling)
+        indices, checksums = [], []
+        for frame_idx, frame in frames:
+            indices.append(frame_idx)
+            checksums.append(hashlib.sha1(frame.tobytes()).hexdigest())
+        results[sampling] = {"seconds": time.perf_counter() - start, "indices": indices, "checksums": checksums}
+    return results
+
+def main(width, height, fps, seconds, frame_rate):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = os.path.join(tmp_dir, "synthetic.mp4")
+        write_synthetic_video(video_path, width, height, fps, seconds)
+        results = run_benchmark(video_path, frame_rate)
+
+    baseline = results["read"]
+    for sampling, result in results.items():
+        if result["indices"] != baseline["indices"]:
+            raise RuntimeError(f"Sampling mode {sampling} selected different frames than read")
+        mismatched = [idx for idx, checksum, expected in zip(result["indices"], result["checksums"], baseline["checksums"])
+                      if checksum != expected]
+        if mismatched:
+            raise RuntimeError(f"Sampling mode {sampling} decoded different content than read at frames {mismatched[:10]}")
+        speedup = baseline["seconds"] / result["seconds"]
+        print(f"{sampling:>5}: {len(result['indices'])} frames in {result['seconds']:.3f}s ({speedup:.2f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Frame Sampling Benchmark")
+    parser.add_argument("--width", type=int, default=1920, help="Frame width.")
+    parser.add_argument("--height", type=int, default=1080, help="Frame height.")
+    parser.add_argument("--fps", type=int, default=60, help="Frames per second of the synthetic video.")
+    parser.add_argument("--seconds", type=int, default=10, help="Duration of the synthetic video.")
+    parser.add_argument("--frame_rate", type=int, default=1000, help="Frame extraction rate per ms.")
+    args = parser.parse_args()
+
+    main(args.width, args.height, args.fps, args.seconds, args.frame_rate)
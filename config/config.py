@@ -3,11 +3,18 @@
 #
 # This software is licensed under the terms of the MIT License.
 # See the LICENSE file in the project root for license terms.
+import os
 import torch
 
 # Device configuration
 device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
 
+# Local serialized copies of the pre-trained models, for fast startup
+MODEL_CACHE_DIR = os.path.expanduser("~/.cache/object-detection/models")
+
+# Execution settings written by the autotune command and loaded by default
+INFERENCE_CONFIG_PATH = os.path.expanduser("~/.cache/object-detection/inference.json")
+
 # Restricted classes and their colors
 RESTRICTED_CLASSES = {
     1: "person",
@@ -0,0 +1,130 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+InferenceConfig class for the CPU execution settings of the model.
+
+The settings are the number of torch intra-op and inter-op threads, bf16
+autocast, the channels_last memory format and a fixed input size. They are
+stored as JSON, so the autotune command can save the fastest combination for
+the host and every run can load it.
+"""
+
+import json
+import os
+
+import torch
+
+class InferenceConfig:
+    FIELDS = ("intra_op_threads", "inter_op_threads", "bf16", "channels_last", "input_size")
+
+    def __init__(self, intra_op_threads=None, inter_op_threads=None, bf16=False, channels_last=False, input_size=None):
+        """
+        Initializes the InferenceConfig.
+
+        Args:
+            intra_op_threads (int): Threads used within an operator, torch's default when None.
+            inter_op_threads (int): Threads running independent operators in parallel, torch's default when None.
+            bf16 (bool): Whether to run the forward pass under bf16 autocast on the CPU.
+            channels_last (bool): Whether to run the convolutions in the channels_last memory format.
+            input_size (tuple): A fixed (height, width) frames are resized to, instead of the
+                image processor's aspect-preserving resize.
+        """
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.bf16 = bf16
+        self.channels_last = channels_last
+        self.input_size = tuple(input_size) if input_size is not None else None
+
+    def apply(self):
+        """
+        Applies the thread settings to the current process.
+
+        Inter-op threads can only be set before torch starts any parallel work,
+        so a failure to set them is reported and otherwise ignored.
+        """
+        if self.intra_op_threads:
+            torch.set_num_threads(self.intra_op_threads)
+        if self.inter_op_threads:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError as e:
+                print(f"Could not set the inter-op threads: {e}")
+
+    def replace(self, **changes):
+        """
+        Returns a copy of the configuration with some settings changed.
+
+        Args:
+            **changes: The settings to change.
+
+        Returns:
+            InferenceConfig: The new configuration.
+        """
+        return InferenceConfig(**{**self.to_dict(), **changes})
+
+    def to_dict(self):
+        """
+        Returns the settings of the configuration.
+
+        Returns:
+            dict: The settings by name.
+        """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a configuration from its settings, ignoring the autotune report of saved files.
+
+        Args:
+            data (dict): The settings by name.
+
+        Returns:
+            InferenceConfig: The configuration.
+
+        Raises:
+            ValueError: If a setting is unknown.
+        """
+        unknown = set(data) - set(cls.FIELDS) - {"autotune"}
+        if unknown:
+            raise ValueError(f"Unknown inference settings: {', '.join(sorted(unknown))}")
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a configuration saved as JSON.
+
+        Args:
+            path (str): Path of the JSON file.
+
+        Returns:
+            InferenceConfig: The configuration.
+        """
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path, autotune=None):
+        """
+        Saves the configuration as JSON.
+
+        Args:
+            path (str): Path of the JSON file, whose directory is created if missing.
+            autotune (dict): The autotune measurements stored alongside the settings.
+        """
+        data = self.to_dict()
+        if autotune is not None:
+            data["autotune"] = autotune
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def __eq__(self, other):
+        return isinstance(other, InferenceConfig) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        settings = ", ".join(f"{field}={value!r}" for field, value in self.to_dict().items())
+        return f"InferenceConfig({settings})"
@@ -4,35 +4,55 @@
 # This software is licensed under the terms of the MIT License.
 # See the LICENSE file in the project root for license terms.
 import cv2
-from config.config import RESTRICTED_CLASSES, RESTRICTED_COLORS
+import numpy as np
+from config.config import RESTRICTED_COLORS
 
-class DetectionDrawer:
-    def draw_detections(self, frame, labels, boxes, id2label):
-        h, w, _ = frame.shape
-        for i in range(len(labels)):
-            label_id = labels[i]
-            label = id2label[label_id]
-            if label not in RESTRICTED_CLASSES.values():
-                continue
-
-            box = boxes[i]
-            x_center, y_center, box_width, box_height = box
-            x1 = int((x_center - box_width / 2) * w)
-            y1 = int((y_center - box_height / 2) * h)
-            x2 = int((x_center + box_width / 2) * w)
-            y2 = int((y_center + box_height / 2) * h)
-
-            color = RESTRICTED_COLORS.get(label, (255, 255, 255))
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+def boxes_to_pixels(boxes, width, height):
+    """
+    Converts normalized (cx, cy, w, h) boxes into pixel (x1, y1, x2, y2) corners.
 
-        return frame
+    Args:
+        boxes: An (N, 4) array of normalized boxes.
+        width (int): Width of the frame in pixels.
+        height (int): Height of the frame in pixels.
+
+    Returns:
+        np.ndarray: An (N, 4) integer array of pixel corners, truncated towards zero.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    centers, sizes = boxes[:, :2], boxes[:, 2:] / 2
+    scale = np.array([width, height, width, height], dtype=np.float64)
+    return (np.concatenate([centers - sizes, centers + sizes], axis=1) * scale).astype(np.int64)
 
 class DetectionDrawer:
+    FONT = cv2.FONT_HERSHEY_SIMPLEX
+    FONT_SCALE = 0.9
+    THICKNESS = 2
+    # Baseline offsets of the label name and ID above the top edge of the box
+    NAME_OFFSET = 10
+    ID_OFFSET = 30
+
+    def __init__(self, antialiased=False):
+        """
+        Initializes the DetectionDrawer.
+
+        Labels are rasterized once per text and color into sprites, which are then
+        alpha-blended onto every frame they appear on instead of being re-rendered.
+
+        Args:
+            antialiased (bool): Whether to draw antialiased boxes and labels, which
+                look smoother but are slower to draw than the default 8-connected lines.
+        """
+        self.line_type = cv2.LINE_AA if antialiased else cv2.LINE_8
+        self._sprites = {}
+
     def draw_detections(self, frame, labels, boxes, id2label):
         """
         Draws detections on a given frame.
 
+        Every box is outlined in the color of its label, with the label name and ID above it.
+        The boxes of each color are drawn in a single pass, then the labels on top of them.
+
         Args:
             frame: The frame on which to draw the detections.
             labels (list): List of label IDs for the detected objects.
@@ -43,22 +63,136 @@ class DetectionDrawer:
             The frame with the detections drawn on it.
         """
         h, w, _ = frame.shape
-        for i in range(len(labels)):
-            label_id = labels[i]
-            coco_label = id2label[label_id]
-            # if coco_label not in RESTRICTED_CLASSES.values():
-            #     continue
-
-            box = boxes[i]
-            x_center, y_center, box_width, box_height = box
-            x1 = int((x_center - box_width / 2) * w)
-            y1 = int((y_center - box_height / 2) * h)
-            x2 = int((x_center + box_width / 2) * w)
-            y2 = int((y_center + box_height / 2) * h)
-
-            color = RESTRICTED_COLORS.get(coco_label, (255, 255, 255))
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(frame, coco_label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
-            cv2.putText(frame, str(label_id), (x1, y1 - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
-
-        return frame
\ No newline at end of file
+        corners = boxes_to_pixels(boxes, w, h)
+        names = [id2label[label_id] for label_id in labels]
+        colors = [RESTRICTED_COLORS.get(name, (255, 255, 255)) for name in names]
+
+        # The (N, 4, 2) outlines of all boxes, drawn with one polylines call per color
+        outlines = corners[:, [[0, 1], [2, 1], [2, 3], [0, 3]]].astype(np.int32)
+        by_color = {}
+        for i, color in enumerate(colors):
+            by_color.setdefault(color, []).append(i)
+        for color, indices in by_color.items():
+            cv2.polylines(frame, outlines[indices], True, color, self.THICKNESS, self.line_type)
+
+        for label_id, name, color, (x1, y1) in zip(labels, names, colors, corners[:, :2].tolist()):
+            self._sprite(name, str(label_id), color).blend(frame, x1, y1)
+        return frame
+
+    def draw_preview(self, frame, labels, boxes, id2label, scale=0.5):
+        """
+        Draws detections on a downscaled copy of a frame, leaving the frame itself untouched.
+
+        Boxes are normalized, so they map onto the preview directly, and the labels
+        keep their size, so they stay readable on small previews.
+
+        Args:
+            frame: The full-resolution frame.
+            labels (list): List of label IDs for the detected objects.
+            boxes (list): List of bounding boxes for the detected objects.
+            id2label (dict): Dictionary mapping label IDs to label names.
+            scale (float): Size of the preview relative to the frame.
+
+        Returns:
+            The downscaled frame with the detections drawn on it.
+        """
+        # Linear interpolation is several times faster than area averaging on large frames
+        preview = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+        return self.draw_detections(preview, labels, boxes, id2label)
+
+    def _sprite(self, name, label_id, color):
+        """
+        Returns the pre-rendered label of a detection, rendering it on first use.
+
+        Args:
+            name (str): The label name.
+            label_id (str): The label ID.
+            color (tuple): The BGR color of the label.
+
+        Returns:
+            _LabelSprite: The label sprite.
+        """
+        key = (name, label_id, color)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = self._sprites[key] = self._render_sprite(name, label_id, color)
+        return sprite
+
+    def _render_sprite(self, name, label_id, color):
+        """
+        Rasterizes a label into an alpha mask, cropped to the drawn pixels.
+
+        Args:
+            name (str): The label name.
+            label_id (str): The label ID.
+            color (tuple): The BGR color of the label.
+
+        Returns:
+            _LabelSprite: The label sprite.
+        """
+        sizes = [cv2.getTextSize(text, self.FONT, self.FONT_SCALE, self.THICKNESS) for text in (name, label_id)]
+        pad = 2 * self.THICKNESS
+        text_width = max(width for (width, _), _ in sizes)
+        text_height = max(height for (_, height), _ in sizes)
+        baseline = max(baseline for _, baseline in sizes)
+        # The top-left corner of the box sits at (pad, anchor_y) on the canvas
+        anchor_y = pad + text_height + self.ID_OFFSET
+        alpha = np.zeros((anchor_y + baseline + pad, text_width + 2 * pad), dtype=np.uint8)
+        cv2.putText(alpha, name, (pad, anchor_y - self.NAME_OFFSET), self.FONT, self.FONT_SCALE, 255, self.THICKNESS,
+                    self.line_type)
+        cv2.putText(alpha, label_id, (pad, anchor_y - self.ID_OFFSET), self.FONT, self.FONT_SCALE, 255, self.THICKNESS,
+                    self.line_type)
+
+        ys, xs = np.nonzero(alpha)
+        if len(ys) == 0:
+            return _LabelSprite(0, 0, color, np.zeros((0, 0), dtype=np.uint8))
+        y1, y2, x1, x2 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+        return _LabelSprite(int(x1) - pad, int(y1) - anchor_y, color, alpha[y1:y2, x1:x2])
+
+class _LabelSprite:
+    def __init__(self, offset_x, offset_y, color, alpha):
+        """
+        Prepares a rasterized label for blending.
+
+        Args:
+            offset_x (int): Horizontal offset of the sprite from the top-left corner of the box.
+            offset_y (int): Vertical offset of the sprite from the top-left corner of the box.
+            color (tuple): The BGR color of the label.
+            alpha (np.ndarray): The (h, w) coverage of every pixel by the label, from 0 to 255.
+        """
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.height, self.width = alpha.shape
+        self.image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self.image[:] = color
+        if np.isin(alpha, (0, 255)).all():
+            # A binary alpha reduces blending to a masked copy
+            self.mask = alpha
+            self.inverse_alpha = None
+        else:
+            alpha = cv2.cvtColor(alpha, cv2.COLOR_GRAY2BGR)
+            self.mask = None
+            self.image = cv2.multiply(self.image, alpha, scale=1 / 255)
+            self.inverse_alpha = 255 - alpha
+
+    def blend(self, frame, x, y):
+        """
+        Alpha-blends the label onto a frame, clipped to the frame.
+
+        Args:
+            frame: The frame to draw on, modified in place.
+            x (int): The x coordinate of the top-left corner of the box.
+            y (int): The y coordinate of the top-left corner of the box.
+        """
+        left, top = x + self.offset_x, y + self.offset_y
+        x1, y1 = max(left, 0), max(top, 0)
+        x2, y2 = min(left + self.width, frame.shape[1]), min(top + self.height, frame.shape[0])
+        if x1 >= x2 or y1 >= y2:
+            return
+        region = frame[y1:y2, x1:x2]
+        window = (slice(y1 - top, y2 - top), slice(x1 - left, x2 - left))
+        if self.inverse_alpha is None:
+            cv2.copyTo(self.image[window], self.mask[window], region)
+        else:
+            # The image is premultiplied by the alpha
+            region[:] = cv2.add(cv2.multiply(region, self.inverse_alpha[window], scale=1 / 255), self.image[window])
@@ -7,54 +7,221 @@ from abc import ABC, abstractmethod
 from transformers import DetrForObjectDetection, DetrImageProcessor
 from PIL import Image
 import cv2
+import numpy as np
+import torch
 from config.config import device, RESTRICTED_CLASSES
+from config.inference_config import InferenceConfig
+from detection.model_cache import ModelCache
+
+RESTRICTED_CLASS_IDS = np.array(sorted(RESTRICTED_CLASSES), dtype=np.int64)
 
 class ObjectDetectionModel(ABC):
     @abstractmethod
-    def analyze_frame(self, frame):
+    def analyze_frame(self, frame, return_scores=False):
         """
         Analyzes a frame to detect objects.
 
         Args:
             frame: The frame to analyze.
+            return_scores (bool): Whether to also return the confidence of each detection.
 
         Returns:
-            A tuple containing the labels and bounding boxes of detected objects.
+            A tuple containing the labels and bounding boxes of detected objects, and their scores if requested.
         """
         pass
 
+    def analyze_frames(self, frames, return_scores=False):
+        """
+        Analyzes a batch of frames to detect objects.
+
+        Models that cannot batch fall back to analyzing one frame at a time.
+
+        Args:
+            frames (list): The frames to analyze.
+            return_scores (bool): Whether to also return the confidence of each detection.
+
+        Returns:
+            list: A (labels, boxes) tuple per frame, or (labels, boxes, scores) if requested, in input order.
+        """
+        return [self.analyze_frame(frame, return_scores=return_scores) for frame in frames]
+
 class DETRModel(ObjectDetectionModel):
-    def __init__(self):
+    def __init__(self, model_name="facebook/detr-resnet-50", threshold=0.9, model_cache_dir=None, inference_config=None):
         """
         Initializes the DETRModel by loading the pre-trained DETR model and image processor.
+
+        Args:
+            model_name (str): Name or path of the pre-trained DETR model.
+            threshold (float): Confidence above which a detection is kept.
+            model_cache_dir (str): Directory of a local serialized copy of the model, which
+                loads much faster than from_pretrained after the first run.
+            inference_config (InferenceConfig): The bf16, channels_last and fixed input size
+                settings of the forward pass; threads are applied by the caller.
         """
+        self.model_name = model_name
+        self.threshold = threshold
+        self.inference_config = inference_config if inference_config is not None else InferenceConfig()
         try:
-            self.model = DetrForObjectDetection.from_pretrained("facebook/detr-resnet-50").to(device)
-            self.image_processor = DetrImageProcessor.from_pretrained("facebook/detr-resnet-50")
+            if model_cache_dir is None:
+                model = DetrForObjectDetection.from_pretrained(model_name)
+                self.image_processor = DetrImageProcessor.from_pretrained(model_name)
+            else:
+                model, self.image_processor = ModelCache(model_cache_dir).load(model_name)
+            self.model = model.to(device)
+            if self.inference_config.channels_last:
+                self.model = self.model.to(memory_format=torch.channels_last)
             self.id2label = self.model.config.id2label
+            self._restricted_mask = torch.zeros(int(RESTRICTED_CLASS_IDS.max()) + 1, dtype=torch.bool, device=device)
+            self._restricted_mask[torch.from_numpy(RESTRICTED_CLASS_IDS)] = True
         except Exception as e:
             raise RuntimeError(f"Error loading DETR model: {e}")
 
-    def analyze_frame(self, frame):
+    @property
+    def model_id(self):
+        """
+        Identifies the weights and execution settings the detections depend on.
+
+        Returns:
+            str: The model name, and the bf16 and fixed input size settings, which change the detections.
+        """
+        model_id = self.model_name
+        if self.inference_config.bf16:
+            model_id += ":bf16"
+        if self.inference_config.input_size is not None:
+            height, width = self.inference_config.input_size
+            model_id += f":{height}x{width}"
+        return model_id
+
+    def analyze_frame(self, frame, return_scores=False):
         """
         Analyzes a frame to detect objects using the DETR model.
 
         Args:
             frame: The frame to analyze.
+            return_scores (bool): Whether to also return the confidence of each detection.
 
         Returns:
-            A tuple containing the filtered labels and bounding boxes of detected objects.
+            A tuple containing the filtered labels and bounding boxes of detected objects, and their scores if requested.
+        """
+        return self.analyze_frames([frame], return_scores)[0]
+
+    def analyze_frames(self, frames, return_scores=False):
         """
-        img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        inputs = self.image_processor(images=img, return_tensors="pt").to(device)
-        outputs = self.model(**inputs)
+        Analyzes a batch of frames with a single forward pass of the DETR model.
+
+        Args:
+            frames (list): The frames to analyze.
+            return_scores (bool): Whether to also return the confidence of each detection.
 
-        probas = outputs.logits.softmax(-1)[0, :, :-1]
-        keep = probas.max(-1).values > 0.9  # Confidence threshold
-        boxes = outputs.pred_boxes[0, keep].cpu().detach().numpy()
-        labels = probas[keep].argmax(-1).cpu().detach().numpy()
+        Returns:
+            list: A tuple of filtered labels and bounding boxes per frame, followed by their
+            scores if requested, in input order.
+        """
+        inputs = self._preprocess(frames)
+        logits, pred_boxes = self._forward(inputs)
+        return self._postprocess(logits, pred_boxes, return_scores)
 
-        return self._filter_restricted_classes(labels, boxes)
+    def _preprocess(self, frames):
+        """
+        Converts BGR frames into a batch of model inputs.
+
+        Args:
+            frames (list): The frames to convert.
+
+        Returns:
+            The image processor outputs, on the model device.
+        """
+        if self.inference_config.input_size is None:
+            return self.image_processor(images=self._to_images(frames), return_tensors="pt").to(device)
+        # A fixed size skips the aspect-preserving resize and the padding of batches to their largest frame
+        height, width = self.inference_config.input_size
+        return self.image_processor(images=self._to_images(frames), size={"height": height, "width": width},
+                                    return_tensors="pt").to(device)
+
+    @staticmethod
+    def _to_images(frames):
+        """
+        Converts BGR frames into RGB images.
+
+        Args:
+            frames (list): The frames to convert.
+
+        Returns:
+            list: The frames as PIL images.
+        """
+        return [Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in frames]
+
+    def _forward(self, inputs):
+        """
+        Runs the DETR model on a batch of inputs.
+
+        Args:
+            inputs: The image processor outputs.
+
+        Returns:
+            tuple: The class logits and the normalized (cx, cy, w, h) boxes of every query.
+        """
+        if self.inference_config.channels_last:
+            inputs["pixel_values"] = inputs["pixel_values"].contiguous(memory_format=torch.channels_last)
+        with torch.inference_mode(), torch.autocast(device.type, torch.bfloat16, enabled=self.inference_config.bf16):
+            outputs = self.model(**inputs)
+        if self.inference_config.bf16:
+            # Thresholding runs in fp32, so bf16 only changes the scores by its rounding
+            return outputs.logits.float(), outputs.pred_boxes.float()
+        return outputs.logits, outputs.pred_boxes
+
+    def _postprocess(self, logits, pred_boxes, return_scores=False):
+        """
+        Thresholds and filters the detections of a batch as tensor operations.
+
+        The kept detections of the whole batch are copied to the host in a single
+        transfer and only then split per frame.
+
+        Args:
+            logits: The (batch, queries, classes + 1) class logits.
+            pred_boxes: The (batch, queries, 4) normalized (cx, cy, w, h) boxes.
+            return_scores (bool): Whether to also return the confidence of each detection.
+
+        Returns:
+            list: A tuple of filtered labels and bounding boxes per frame, followed by their
+            scores if requested, in input order.
+        """
+        probas = logits.softmax(-1)[..., :-1]
+        scores, labels = probas.max(-1)
+        keep = (scores > self.threshold) & self._is_restricted(labels)
+
+        frame_idx, query_idx = keep.nonzero(as_tuple=True)
+        kept = torch.cat([
+            pred_boxes[frame_idx, query_idx],
+            labels[frame_idx, query_idx].unsqueeze(-1).to(pred_boxes.dtype),
+            frame_idx.unsqueeze(-1).to(pred_boxes.dtype),
+            scores[frame_idx, query_idx].unsqueeze(-1).to(pred_boxes.dtype),
+        ], dim=-1).cpu().numpy()
+
+        splits = np.searchsorted(kept[:, 5], np.arange(1, keep.shape[0]))
+        if return_scores:
+            return [
+                (frame_kept[:, 4].astype(np.int64).tolist(), frame_kept[:, :4], frame_kept[:, 6])
+                for frame_kept in np.split(kept, splits)
+            ]
+        return [
+            (frame_kept[:, 4].astype(np.int64).tolist(), frame_kept[:, :4])
+            for frame_kept in np.split(kept, splits)
+        ]
+
+    def _is_restricted(self, labels):
+        """
+        Checks which labels belong to the restricted classes with a lookup table.
+
+        Args:
+            labels: A tensor of label IDs.
+
+        Returns:
+            A boolean tensor of the same shape as labels.
+        """
+        mask = self._restricted_mask.to(labels.device)
+        in_range = labels < len(mask)
+        return mask[labels.clamp(max=len(mask) - 1)] & in_range
 
     def _filter_restricted_classes(self, labels, boxes):
         """
@@ -67,6 +234,6 @@ class DETRModel(ObjectDetectionModel):
         Returns:
             A tuple containing the filtered labels and bounding boxes.
         """
-        filtered_labels = [label for label in labels if label in RESTRICTED_CLASSES.keys()]
-        filtered_boxes = boxes[[i for i, label in enumerate(labels) if label in RESTRICTED_CLASSES.keys()]]
-        return filtered_labels, filtered_boxes
\ No newline at end of file
+        labels = np.asarray(labels, dtype=np.int64)
+        keep = np.isin(labels, RESTRICTED_CLASS_IDS)
+        return labels[keep].tolist(), boxes[keep]
@@ -0,0 +1,132 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+ModelCache class for fast DETR loading from a local serialized copy.
+
+The first load goes through from_pretrained and serializes the model into a
+single safetensors file next to its config and image processor settings.
+Later loads build the model skeleton on the meta device, so no time is spent
+on random initialization, and assign the memory-mapped weights to it directly.
+
+Attributes:
+    cache_dir: Directory holding one sub-directory per cached model.
+"""
+
+import os
+import re
+import shutil
+
+import torch
+from safetensors.torch import load_file, save_model
+from transformers import DetrConfig, DetrForObjectDetection, DetrImageProcessor
+
+class ModelCache:
+    WEIGHTS_FILE = "model.safetensors"
+
+    def __init__(self, cache_dir):
+        """
+        Initializes the ModelCache.
+
+        Args:
+            cache_dir (str): Directory holding one sub-directory per cached model.
+        """
+        self.cache_dir = cache_dir
+
+    def load(self, model_name):
+        """
+        Loads a DETR model and its image processor, caching them on first use.
+
+        Args:
+            model_name (str): Name or path of the pre-trained DETR model.
+
+        Returns:
+            tuple: The DetrForObjectDetection model and the DetrImageProcessor.
+        """
+        entry_dir = os.path.join(self.cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "--", model_name))
+        cached = self._load_entry(entry_dir)
+        if cached is not None:
+            return cached
+
+        model = DetrForObjectDetection.from_pretrained(model_name)
+        image_processor = DetrImageProcessor.from_pretrained(model_name)
+        self._save(entry_dir, model, image_processor)
+        return model, image_processor
+
+    def _load_entry(self, entry_dir):
+        """
+        Loads a cached model and its image processor.
+
+        Args:
+            entry_dir (str): Directory of the cached model.
+
+        Returns:
+            tuple: The DetrForObjectDetection model and the DetrImageProcessor, or None if
+            the entry is missing, partial or corrupt.
+        """
+        if not os.path.exists(os.path.join(entry_dir, self.WEIGHTS_FILE)):
+            return None
+        try:
+            model = self._load_weights(entry_dir)
+            if model is None:
+                return None
+            return model, DetrImageProcessor.from_pretrained(entry_dir)
+        except Exception as e:
+            print(f"Ignoring the invalid cached model in {entry_dir}: {e}")
+            return None
+
+    def _load_weights(self, entry_dir):
+        """
+        Builds the model on the meta device and assigns the cached weights to it.
+
+        Args:
+            entry_dir (str): Directory of the cached model.
+
+        Returns:
+            DetrForObjectDetection: The loaded model, or None if the cached weights do not cover it.
+        """
+        config = DetrConfig.from_pretrained(entry_dir)
+        # The cached weights already include the backbone, so don't fetch it again
+        config.use_pretrained_backbone = False
+        with torch.device("meta"):
+            model = DetrForObjectDetection(config)
+        model.load_state_dict(load_file(os.path.join(entry_dir, self.WEIGHTS_FILE)), strict=False, assign=True)
+        tensors = list(model.parameters()) + list(model.buffers())
+        if any(tensor.is_meta for tensor in tensors):
+            return None
+        return model.eval()
+
+    def _save(self, entry_dir, model, image_processor):
+        """
+        Serializes a model next to its config and image processor settings.
+
+        The files are written aside and moved into place at once, so concurrent
+        loads never see a partial entry. An invalid entry already in place is
+        replaced, unless another process has just cached a valid copy. Failing
+        to write the cache is reported and otherwise ignored.
+
+        Args:
+            entry_dir (str): Directory of the cached model.
+            model: The DetrForObjectDetection model.
+            image_processor: The DetrImageProcessor.
+        """
+        tmp_dir = f"{entry_dir}.tmp{os.getpid()}"
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+            model.config.save_pretrained(tmp_dir)
+            image_processor.save_pretrained(tmp_dir)
+            save_model(model, os.path.join(tmp_dir, self.WEIGHTS_FILE))
+            try:
+                os.replace(tmp_dir, entry_dir)
+            except OSError:
+                # The entry exists: keep it if another process cached the model first, otherwise repair it
+                if self._load_entry(entry_dir) is not None:
+                    return
+                shutil.rmtree(entry_dir)
+                os.replace(tmp_dir, entry_dir)
+        except OSError as e:
+            print(f"Could not cache the model in {entry_dir}: {e}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
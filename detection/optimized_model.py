@@ -0,0 +1,185 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+import os
+import tempfile
+
+import torch
+from detection.model import DETRModel
+
+class _DETRExportWrapper(torch.nn.Module):
+    def __init__(self, model):
+        """
+        Wraps a DETR model so it takes and returns plain tensors, as export requires.
+
+        Args:
+            model: The eager DetrForObjectDetection model.
+        """
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        outputs = self.model(pixel_values=pixel_values)
+        return outputs.logits, outputs.pred_boxes
+
+class OptimizedDETRModel(DETRModel):
+    BACKENDS = ("torchscript", "onnx")
+
+    def __init__(self, model_name="facebook/detr-resnet-50", threshold=0.9, backend="torchscript", quantize=False,
+                 input_size=(800, 800), export_path=None, model_cache_dir=None):
+        """
+        Initializes the OptimizedDETRModel by exporting the pre-trained DETR model to an inference engine.
+
+        Frames are resized to a fixed input size, which export requires and which
+        avoids padding batches to their largest frame. Boxes stay normalized to the
+        frame, so they need no adjustment. The engine runs on the CPU.
+
+        Args:
+            model_name (str): Name or path of the pre-trained DETR model.
+            threshold (float): Confidence above which a detection is kept.
+            backend (str): One of BACKENDS; "onnx" requires the onnxruntime package.
+            quantize (bool): Whether to apply dynamic int8 quantization to the linear layers.
+            input_size (tuple): The (height, width) frames are resized to.
+            export_path (str): Where to keep the exported ONNX model, by default it is written to a
+                temporary directory removed once the engine is loaded.
+            model_cache_dir (str): Directory of a local serialized copy of the model.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        super().__init__(model_name, threshold, model_cache_dir)
+        self.backend = backend
+        self.quantize = quantize
+        self.input_size = input_size
+
+        try:
+            module = _DETRExportWrapper(self.model.cpu().eval())
+            example = torch.zeros(1, 3, *input_size)
+            if backend == "torchscript":
+                self._engine = self._export_torchscript(module, example, quantize)
+            else:
+                self._engine = self._export_onnx(module, example, quantize, export_path)
+        except ImportError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Error exporting DETR model to {backend}: {e}")
+
+    @property
+    def model_id(self):
+        """
+        Identifies the weights and execution settings the detections depend on.
+
+        Returns:
+            str: The model name, backend, quantization and input size.
+        """
+        height, width = self.input_size
+        return f"{self.model_name}:{self.backend}{':int8' if self.quantize else ''}:{height}x{width}"
+
+    def _preprocess(self, frames):
+        """
+        Converts BGR frames into a batch of model inputs at the fixed input size.
+
+        Args:
+            frames (list): The frames to convert.
+
+        Returns:
+            The image processor outputs.
+        """
+        images = self._to_images(frames)
+        height, width = self.input_size
+        return self.image_processor(images=images, size={"height": height, "width": width}, return_tensors="pt")
+
+    def _forward(self, inputs):
+        """
+        Runs the exported engine on a batch of inputs.
+
+        Args:
+            inputs: The image processor outputs.
+
+        Returns:
+            tuple: The class logits and the normalized (cx, cy, w, h) boxes of every query.
+        """
+        pixel_values = inputs["pixel_values"]
+        if self.backend == "onnx":
+            logits, pred_boxes = self._engine.run(None, {"pixel_values": pixel_values.numpy()})
+            return torch.from_numpy(logits), torch.from_numpy(pred_boxes)
+        with torch.inference_mode():
+            return self._engine(pixel_values)
+
+    @staticmethod
+    def _export_torchscript(module, example, quantize):
+        """
+        Traces the model to a TorchScript module, frozen unless it is quantized.
+
+        Args:
+            module (torch.nn.Module): The wrapped eager model.
+            example (torch.Tensor): An example input at the fixed input size.
+            quantize (bool): Whether to apply dynamic int8 quantization to the linear layers.
+
+        Returns:
+            torch.jit.ScriptModule: The traced module.
+        """
+        if quantize:
+            module = torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+        with torch.no_grad():
+            traced = torch.jit.trace(module, example, strict=False)
+        return torch.jit.freeze(traced.eval()) if not quantize else traced.eval()
+
+    @staticmethod
+    def _export_onnx(module, example, quantize, export_path):
+        """
+        Exports the model to ONNX and opens an ONNX Runtime session on it.
+
+        Args:
+            module (torch.nn.Module): The wrapped eager model.
+            example (torch.Tensor): An example input at the fixed input size.
+            quantize (bool): Whether to apply dynamic int8 quantization to the weights.
+            export_path (str): Where to write the exported model, defaults to a temporary
+                directory removed once the session is created.
+
+        Returns:
+            onnxruntime.InferenceSession: The session running the exported model.
+
+        Raises:
+            ImportError: If onnxruntime is not installed.
+        """
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("The onnx backend requires onnxruntime: pip install onnxruntime")
+
+        if export_path is None:
+            # The session holds the model in memory once created, so the exported files are not kept
+            with tempfile.TemporaryDirectory(prefix="detr_onnx_") as export_dir:
+                return OptimizedDETRModel._open_onnx_session(module, example, quantize,
+                                                             os.path.join(export_dir, "detr.onnx"))
+        return OptimizedDETRModel._open_onnx_session(module, example, quantize, export_path)
+
+    @staticmethod
+    def _open_onnx_session(module, example, quantize, export_path):
+        """
+        Writes the model to an ONNX file, quantized alongside it if requested, and opens a session on it.
+
+        Args:
+            module (torch.nn.Module): The wrapped eager model.
+            example (torch.Tensor): An example input at the fixed input size.
+            quantize (bool): Whether to apply dynamic int8 quantization to the weights.
+            export_path (str): Where to write the exported model.
+
+        Returns:
+            onnxruntime.InferenceSession: The session running the exported model.
+        """
+        import onnxruntime
+
+        dynamic_axes = {name: {0: "batch"} for name in ("pixel_values", "logits", "pred_boxes")}
+        with torch.no_grad():
+            torch.onnx.export(module, (example,), export_path, input_names=["pixel_values"],
+                              output_names=["logits", "pred_boxes"], dynamic_axes=dynamic_axes,
+                              opset_version=17, dynamo=False)
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantized_path = export_path.replace(".onnx", ".int8.onnx")
+            quantize_dynamic(export_path, quantized_path, weight_type=QuantType.QInt8)
+            export_path = quantized_path
+        return onnxruntime.InferenceSession(export_path, providers=["CPUExecutionProvider"])
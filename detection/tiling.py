@@ -0,0 +1,223 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+TiledDetector class for region-of-interest and tiled inference on high-resolution frames.
+
+The image processor resizes every input to the model resolution, so small
+objects in large frames shrink to a few pixels. Cropping a region of interest
+and splitting it into overlapping tiles keeps them at a usable size. The tiles
+of a whole batch of frames go through the wrapped model as one batch, and
+their detections are mapped back to frame coordinates and merged with a
+class-aware batched NMS, which removes the duplicates found in overlaps.
+"""
+
+import numpy as np
+import torch
+from detection.model import ObjectDetectionModel
+
+def batched_nms(boxes, scores, groups, iou_threshold):
+    """
+    Runs non-maximum suppression independently within each group of boxes.
+
+    Boxes of different groups are shifted apart so they never overlap, which
+    suppresses all groups in a single pass.
+
+    Args:
+        boxes (torch.Tensor): The (N, 4) boxes as (x1, y1, x2, y2) corners.
+        scores (torch.Tensor): The (N,) scores of the boxes.
+        groups (torch.Tensor): The (N,) group, such as the label, of every box.
+        iou_threshold (float): IoU above which the lower scoring box of a pair is suppressed.
+
+    Returns:
+        torch.Tensor: The indices of the kept boxes, by decreasing score.
+    """
+    if boxes.numel() == 0:
+        return torch.empty(0, dtype=torch.int64)
+    offsets = groups.to(boxes.dtype) * (boxes.max() - boxes.min() + 1)
+    shifted = boxes + offsets[:, None]
+    order = scores.argsort(descending=True)
+    shifted = shifted[order]
+
+    top_left = torch.maximum(shifted[:, None, :2], shifted[None, :, :2])
+    bottom_right = torch.minimum(shifted[:, None, 2:], shifted[None, :, 2:])
+    intersection = (bottom_right - top_left).clamp(min=0).prod(dim=-1)
+    areas = (shifted[:, 2:] - shifted[:, :2]).clamp(min=0).prod(dim=-1)
+    iou = intersection / (areas[:, None] + areas[None, :] - intersection).clamp(min=1e-12)
+
+    keep = torch.ones(len(order), dtype=torch.bool)
+    for i in range(len(order)):
+        if keep[i]:
+            keep[i + 1:] &= iou[i, i + 1:] <= iou_threshold
+    return order[keep]
+
+def build_tiled_detector(model_factory, roi=None, tiles=(1, 1), overlap=0.2, iou_threshold=0.5):
+    """
+    Builds a model and wraps it in a TiledDetector, so worker processes can create one from a picklable factory.
+
+    Args:
+        model_factory (callable): Creates the wrapped model.
+        roi (tuple): See TiledDetector.
+        tiles (tuple): See TiledDetector.
+        overlap (float): See TiledDetector.
+        iou_threshold (float): See TiledDetector.
+
+    Returns:
+        TiledDetector: The wrapped model.
+    """
+    return TiledDetector(model_factory(), roi, tiles, overlap, iou_threshold)
+
+class TiledDetector(ObjectDetectionModel):
+    def __init__(self, model, roi=None, tiles=(1, 1), overlap=0.2, iou_threshold=0.5):
+        """
+        Initializes the TiledDetector around a model.
+
+        Args:
+            model: The object detection model run on the tiles; it must support return_scores.
+            roi (tuple): The (x, y, width, height) region of the frames to analyze, in pixels;
+                the whole frame by default. It is clipped to the frame.
+            tiles (tuple): The number of (rows, columns) the region is split into.
+            overlap (float): Fraction of a tile shared with its neighbours, so objects on a
+                tile edge are seen whole by at least one tile.
+            iou_threshold (float): IoU above which duplicate detections of the same label are merged.
+        """
+        if tiles[0] < 1 or tiles[1] < 1:
+            raise ValueError("tiles must be at least 1x1")
+        if not 0 <= overlap < 1:
+            raise ValueError("overlap must be in [0, 1)")
+        self.model = model
+        self.roi = roi
+        self.tiles = tiles
+        self.overlap = overlap
+        self.iou_threshold = iou_threshold
+        self.model_name = getattr(model, "model_name", None)
+        self.threshold = model.threshold
+        self.id2label = model.id2label
+
+    @property
+    def model_id(self):
+        """
+        Identifies the weights and execution settings the detections depend on.
+
+        Returns:
+            str: The wrapped model ID, the region of interest and the tiling.
+        """
+        roi = "full" if self.roi is None else ",".join(str(value) for value in self.roi)
+        return f"{self.model.model_id}:roi={roi}:tiles={self.tiles[0]}x{self.tiles[1]}:overlap={self.overlap}"
+
+    def analyze_frame(self, frame, return_scores=False):
+        """
+        Analyzes the region of interest of a frame tile by tile.
+
+        Args:
+            frame: The frame to analyze.
+            return_scores (bool): Whether to also return the confidence of each detection.
+
+        Returns:
+            A tuple containing the labels and bounding boxes of detected objects, and their scores if requested.
+        """
+        return self.analyze_frames([frame], return_scores)[0]
+
+    def analyze_frames(self, frames, return_scores=False):
+        """
+        Analyzes the tiles of a batch of frames with a single call to the wrapped model.
+
+        Args:
+            frames (list): The frames to analyze.
+            return_scores (bool): Whether to also return the confidence of each detection.
+
+        Returns:
+            list: A tuple of labels and normalized (cx, cy, w, h) boxes per frame, relative to the
+            whole frame, followed by their scores if requested, in input order.
+        """
+        crops, origins = [], []
+        for frame_idx, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            for x1, y1, x2, y2 in self.tile_windows(width, height):
+                crops.append(frame[y1:y2, x1:x2])
+                origins.append((frame_idx, x1, y1, x2 - x1, y2 - y1, width, height))
+        analyzed = self.model.analyze_frames(crops, return_scores=True)
+
+        frame_indices, labels, boxes, scores = [], [], [], []
+        for (frame_idx, x, y, tile_width, tile_height, width, height), (tile_labels, tile_boxes, tile_scores) \
+                in zip(origins, analyzed):
+            tile_boxes = np.asarray(tile_boxes, dtype=np.float64).reshape(-1, 4)
+            scale = np.array([tile_width, tile_height, tile_width, tile_height])
+            offset = np.array([x, y, 0, 0])
+            frame_scale = np.array([width, height, width, height])
+            boxes.append((tile_boxes * scale + offset) / frame_scale)
+            labels.extend(int(label) for label in tile_labels)
+            scores.append(np.asarray(tile_scores, dtype=np.float64).reshape(-1))
+            frame_indices.extend([frame_idx] * len(tile_labels))
+        return self._merge(len(frames), np.array(frame_indices, dtype=np.int64), np.array(labels, dtype=np.int64),
+                           np.concatenate(boxes) if boxes else np.empty((0, 4)),
+                           np.concatenate(scores) if scores else np.empty(0), return_scores)
+
+    def tile_windows(self, width, height):
+        """
+        Lays out the overlapping tiles over the region of interest of a frame.
+
+        Args:
+            width (int): Width of the frame in pixels.
+            height (int): Height of the frame in pixels.
+
+        Returns:
+            list: The (x1, y1, x2, y2) pixel window of every tile, row by row.
+
+        Raises:
+            ValueError: If the region of interest does not intersect the frame.
+        """
+        x, y, roi_width, roi_height = self.roi if self.roi is not None else (0, 0, width, height)
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(width, x + roi_width), min(height, y + roi_height)
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError("The region of interest is outside the frame")
+
+        rows, cols = self.tiles
+        ys = self._spans(y1, y2, rows)
+        xs = self._spans(x1, x2, cols)
+        return [(left, top, right, bottom) for top, bottom in ys for left, right in xs]
+
+    def _spans(self, start, end, count):
+        """
+        Splits a range into overlapping spans of equal length.
+
+        Args:
+            start (int): Start of the range.
+            end (int): End of the range.
+            count (int): Number of spans.
+
+        Returns:
+            list: The (start, end) of every span.
+        """
+        length = (end - start) / (count - (count - 1) * self.overlap)
+        step = length * (1 - self.overlap)
+        return [(start + round(i * step), min(end, start + round(i * step + length))) for i in range(count)]
+
+    def _merge(self, frame_count, frame_indices, labels, boxes, scores, return_scores):
+        """
+        Merges the detections of all tiles per frame with class-aware batched NMS.
+
+        Args:
+            frame_count (int): Number of frames in the batch.
+            frame_indices (np.ndarray): The frame of every detection.
+            labels (np.ndarray): The label of every detection.
+            boxes (np.ndarray): The normalized (cx, cy, w, h) box of every detection, relative to its frame.
+            scores (np.ndarray): The score of every detection.
+            return_scores (bool): Whether to also return the scores.
+
+        Returns:
+            list: A tuple of labels and boxes per frame, followed by their scores if requested.
+        """
+        corners = torch.from_numpy(np.concatenate([boxes[:, :2] - boxes[:, 2:] / 2, boxes[:, :2] + boxes[:, 2:] / 2], axis=1))
+        groups = torch.from_numpy(frame_indices * (int(labels.max(initial=0)) + 1) + labels)
+        keep = np.sort(batched_nms(corners, torch.from_numpy(scores), groups, self.iou_threshold).numpy())
+
+        results = []
+        for frame_idx in range(frame_count):
+            frame_keep = keep[frame_indices[keep] == frame_idx]
+            result = (labels[frame_keep].tolist(), boxes[frame_keep])
+            results.append(result + (scores[frame_keep],) if return_scores else result)
+        return results
@@ -4,15 +4,30 @@
 # This software is licensed under the terms of the MIT License.
 # See the LICENSE file in the project root for license terms.
 import argparse
+import functools
 import os
 import platform
 import subprocess
+import time
 
+# Taken before the heavy imports below, so startup cost shows in the time to first detection
+_STARTED_AT = time.perf_counter()
+
+from config.config import INFERENCE_CONFIG_PATH, MODEL_CACHE_DIR
+from config.inference_config import InferenceConfig
 from detection.model import DETRModel
 from detection.drawer import DetectionDrawer
 from processor.frame_processor import FrameProcessor
+from processor.image_writer import AsyncImageWriter
 
-def main(video_path, frame_rate, display_video, image_path, store_video_path):
+def main(video_path, frame_rate, display_video, image_path, store_video_path, batch_size=1, pipelined=False, queue_size=8,
+         sampling="read", workers=1, torch_threads=None, change_threshold=None,
+         cache_dir=None, cache_size_mb=1024, backend="eager", quantize=False, input_size=(800, 800),
+         model_cache_dir=MODEL_CACHE_DIR, image_format="png", png_compression=3, jpeg_quality=95, only_detections=False,
+         image_writers=2, detections_path=None, data_only=False, live=False, realtime=False, duration=None,
+         detect_every=1, track=False, roi=None, tiles=(1, 1), tile_overlap=0.2, metrics_path=None,
+         inference_config_path=None, interop_threads=None, bf16=None, channels_last=None, fixed_input_size=None,
+         preview_scale=None, drop_images_when_full=False):
     """
     Main function to perform object detection on a video.
 
@@ -22,43 +37,346 @@ def main(video_path, frame_rate, display_video, image_path, store_video_path):
         display_video (bool): Whether to display the video.
         image_path (str): Path to save the images
         store_video_path (str): Path to save the video.
+        batch_size (int): Number of frames analyzed per model call.
+        pipelined (bool): Whether to overlap decoding, inference, drawing and encoding on separate threads.
+        queue_size (int): Maximum number of frames queued between two pipeline stages.
+        sampling (str): How frames skipped by the extraction rate are stepped over: read, grab or seek.
+        workers (int): Number of processes the video is sharded across.
+        torch_threads (int): Number of torch threads per process, defaults to sharing the cores between workers.
+        change_threshold (float): Mean thumbnail difference below which a frame reuses the previous detections.
+        cache_dir (str): Directory of the persistent detection cache, disabled when None.
+        cache_size_mb (int): Size of the detection cache above which old entries are evicted.
+        backend (str): Inference backend: eager, or a backend exported by OptimizedDETRModel.
+        quantize (bool): Whether to apply dynamic int8 quantization to an exported backend.
+        input_size (tuple): The (height, width) frames are resized to by an exported backend.
+        model_cache_dir (str): Directory of the local serialized model copies, disabled when None.
+        image_format (str): Format the images are saved in: png, jpg or npy.
+        png_compression (int): PNG compression level, from 0 (fastest) to 9 (smallest).
+        jpeg_quality (int): JPEG quality, from 0 to 100.
+        only_detections (bool): Whether to save only the images with detections.
+        image_writers (int): Number of threads saving the images in the background.
+        detections_path (str): Path of a JSON Lines or Parquet file the detections are streamed to.
+        data_only (bool): Whether to only write the detections, skipping drawing, saving and encoding.
+        live (bool): Whether video_path is a live stream or camera index, always analyzing its freshest frame.
+        realtime (bool): Whether to replay a file at its native speed in live mode.
+        duration (float): Number of seconds after which a live stream stops being read.
+        detect_every (int): Only every detect_every-th frame is sent to the model.
+        track (bool): Whether to track objects, giving them persistent IDs and propagating
+            their boxes over the frames that are not sent to the model.
+        roi (tuple): The (x, y, width, height) region of the frames to analyze, in pixels.
+        tiles (tuple): The number of (rows, columns) of overlapping tiles the region is split into.
+        tile_overlap (float): Fraction of a tile shared with its neighbours.
+        metrics_path (str): Path of a Prometheus text file, or a JSON summary if it ends in .json,
+            the stage metrics are written to.
+        inference_config_path (str): Path of the saved inference settings, such as those written by
+            the autotune command; ignored when the file does not exist.
+        interop_threads (int): Number of torch inter-op threads, overriding the saved settings.
+        bf16 (bool): Whether to run the eager model under bf16 autocast, overriding the saved
+            settings; None keeps them.
+        channels_last (bool): Whether to run the eager model in the channels_last memory format,
+            overriding the saved settings; None keeps them.
+        fixed_input_size (bool): Whether the eager model also resizes frames to input_size,
+            overriding the saved settings; None keeps them.
+        preview_scale (float): Size of the displayed frames relative to the video, to display a
+            downscaled preview while the full-resolution frames are saved and encoded.
+        drop_images_when_full (bool): Whether to drop images instead of waiting when the image writers
+            fall behind, so saving never holds back inference.
     """
-    model = DETRModel()
-    drawer = DetectionDrawer()
-    processor = FrameProcessor(model, drawer)
+    if data_only and detections_path is None:
+        raise ValueError("data_only requires a detections_path")
+    if workers > 1:
+        single_process_options = {
+            "live": live, "pipelined": pipelined, "display_video": display_video, "preview_scale": preview_scale is not None,
+            "change_threshold": change_threshold is not None, "cache_dir": cache_dir is not None,
+            "detect_every": detect_every != 1, "track": track, "metrics_path": metrics_path is not None,
+        }
+        used = [name for name, enabled in single_process_options.items() if enabled]
+        if used:
+            raise ValueError(f"{', '.join(used)} require a single process, not workers")
+    inference_config = load_inference_config(
+        inference_config_path, intra_op_threads=torch_threads, inter_op_threads=interop_threads, bf16=bf16,
+        channels_last=channels_last, input_size=input_size if fixed_input_size else None)
+    if fixed_input_size is False:
+        inference_config = inference_config.replace(input_size=None)
+    model_factory = build_model_factory(backend, quantize, input_size, model_cache_dir, roi, tiles, tile_overlap,
+                                        inference_config)
 
-    fps, frames, audio = processor.extract_video_fragments(video_path, frame_rate)
-    for idx, frame in enumerate(frames):
-        processor.process_frame(frame, idx, display_video, image_path)
+    image_writer_factory = functools.partial(AsyncImageWriter, image_format=image_format, png_compression=png_compression,
+                                             jpeg_quality=jpeg_quality, workers=image_writers,
+                                             only_detections=only_detections, drop_when_full=drop_images_when_full)
 
-    output_video_path, output_video_and_audio_path = processor.compile_video(frames, store_video_path, fps, audio)
+    if workers > 1:
+        # Imported only by the features that use them, so a plain run does not pay for loading them
+        from processor.sharding import ShardedVideoProcessor
+        from processor.sinks import open_detection_sink
+
+        torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+        sharded = ShardedVideoProcessor(model_factory, DetectionDrawer, workers, torch_threads, batch_size,
+                                        image_writer_factory, interop_threads)
+        detection_sink = open_detection_sink(detections_path) if detections_path is not None else None
+        try:
+            (output_video_path, output_video_and_audio_path), _ = sharded.process_video(
+                video_path, frame_rate, None if data_only else store_video_path, None if data_only else image_path,
+                sampling, detection_sink)
+        finally:
+            if detection_sink is not None:
+                detection_sink.close()
+        if detection_sink is not None:
+            print(f"Wrote the detections to {detections_path}")
+    else:
+        inference_config.apply()
+        output_video_path, output_video_and_audio_path = _process_video(
+            video_path, frame_rate, display_video, image_path, store_video_path, batch_size, pipelined, queue_size, sampling,
+            change_threshold, cache_dir, cache_size_mb, model_factory, image_writer_factory, detections_path, data_only, live, realtime, duration, detect_every, track, metrics_path, preview_scale)
 
     if display_video and output_video_path:
         _open_video(output_video_path, output_video_and_audio_path)
 
+def build_model_factory(backend="eager", quantize=False, input_size=(800, 800), model_cache_dir=MODEL_CACHE_DIR,
+                        roi=None, tiles=(1, 1), tile_overlap=0.2, inference_config=None):
+    """
+    Builds a picklable callable creating the object detection model, so worker processes can load their own.
+
+    Args:
+        backend (str): Inference backend, see main.
+        quantize (bool): Whether to apply dynamic int8 quantization, see main.
+        input_size (tuple): The fixed (height, width) frames are resized to by the optimized backends.
+        model_cache_dir (str): Directory the model weights are cached in.
+        roi (tuple): The (x, y, width, height) region of the frames to analyze.
+        tiles (tuple): The number of (rows, columns) the region is split into.
+        tile_overlap (float): Fraction of a tile shared with its neighbours.
+        inference_config (InferenceConfig): The execution settings of the eager model.
+
+    Returns:
+        callable: Creates the model when called.
+    """
+    if backend == "eager":
+        model_factory = functools.partial(DETRModel, model_cache_dir=model_cache_dir, inference_config=inference_config)
+    else:
+        from detection.optimized_model import OptimizedDETRModel
+
+        model_factory = functools.partial(OptimizedDETRModel, backend=backend, quantize=quantize, input_size=input_size,
+                                          model_cache_dir=model_cache_dir)
+    if roi is not None or tuple(tiles) != (1, 1):
+        from detection.tiling import build_tiled_detector
+
+        model_factory = functools.partial(build_tiled_detector, model_factory, roi, tuple(tiles), tile_overlap)
+    return model_factory
+
+def load_inference_config(path=None, **overrides):
+    """
+    Loads the saved inference settings and applies explicit overrides on top.
+
+    Args:
+        path (str): Path of the saved settings; the defaults are used when None or missing.
+        **overrides: Settings to override, ignored when None.
+
+    Returns:
+        InferenceConfig: The inference settings.
+    """
+    inference_config = InferenceConfig()
+    if path and os.path.exists(path):
+        inference_config = InferenceConfig.load(path)
+        print(f"Loaded inference settings from {path}: {inference_config}")
+    return inference_config.replace(**{key: value for key, value in overrides.items() if value is not None})
+
+def _process_video(video_path, frame_rate, display_video, image_path, store_video_path, batch_size, pipelined, queue_size,
+                   sampling, change_threshold, cache_dir, cache_size_mb, model_factory, image_writer_factory,
+                   detections_path, data_only, live, realtime, duration, detect_every, track, metrics_path,
+                   preview_scale=None):
+    model = model_factory()
+    drawer = DetectionDrawer()
+    change_detector = None
+    if change_threshold is not None:
+        from processor.change_detector import FrameChangeDetector
+        change_detector = FrameChangeDetector(change_threshold)
+    detection_cache = None
+    # A live stream has no content to key the cache on
+    if cache_dir is not None and not live:
+        from processor.detection_cache import DetectionCache
+        detection_cache = DetectionCache(cache_dir, cache_size_mb << 20).open(video_path, model.model_id, model.threshold)
+    image_writer = image_writer_factory(image_path) if image_path is not None and not data_only else None
+    detection_sink = None
+    if detections_path is not None:
+        from processor.sinks import open_detection_sink
+        detection_sink = open_detection_sink(detections_path)
+    tracker = None
+    if track:
+        from processor.tracker import IoUTracker
+        tracker = IoUTracker()
+    metrics = None
+    if metrics_path is not None:
+        from processor.metrics import Metrics
+        metrics = Metrics()
+    processor = FrameProcessor(model, drawer, batch_size, change_detector, detection_cache, image_writer, detection_sink,
+                               detect_every, tracker, metrics, preview_scale)
+
+    live_source = None
+    if live:
+        from processor.live_source import LiveFrameSource
+        live_source = LiveFrameSource(video_path, realtime, duration)
+        processor.fps = fps = live_source.fps
+        frames, audio = live_source, None
+    elif data_only:
+        fps, frames = processor.stream_frames(video_path, frame_rate, sampling)
+        audio = None
+    else:
+        # Decode, detect, draw and encode lazily so only one batch of frames is in memory at a time
+        fps, frames, audio = processor.stream_video_fragments(video_path, frame_rate, sampling)
+
+    pipeline = None
+    if data_only:
+        processed_frames = (frame for _, frame, _, _ in processor.detect_frames(frames))
+        store_video_path = None
+    elif pipelined:
+        from processor.pipeline import StagedPipeline
+        pipeline = StagedPipeline(processor, queue_size)
+        processed_frames = pipeline.run(frames, display_video, image_path)
+    else:
+        processed_frames = processor.process_frames(frames, display_video, image_path)
+    if live_source is not None:
+        processed_frames = _mark_processed(processed_frames, live_source)
+
+    started_at = time.perf_counter()
+    try:
+        output_paths = processor.compile_video(processed_frames, store_video_path, fps, audio)
+    finally:
+        if live_source is not None:
+            live_source.stop()
+        if detection_cache is not None:
+            detection_cache.close()
+        if image_writer is not None:
+            image_writer.close()
+        if detection_sink is not None:
+            detection_sink.close()
+
+    processor.metrics.set("run_seconds", time.perf_counter() - started_at)
+    if live_source is not None:
+        processor.metrics.inc("dropped_frames_total", live_source.dropped, {"source": "live"})
+        stats = live_source.stats()
+        print(f"Dropped {stats['dropped']} of {stats['captured']} frames ({stats['drop_rate']:.1%})")
+        if stats["latency_p50_ms"] is not None:
+            print(f"End-to-end latency: p50 {stats['latency_p50_ms']:.0f}ms, p95 {stats['latency_p95_ms']:.0f}ms, "
+                  f"max {stats['latency_max_ms']:.0f}ms")
+    if detection_sink is not None:
+        print(f"Wrote the detections to {detections_path}")
+    if pipeline is not None:
+        print(f"Peak pipeline queue depths: {pipeline.peak_queue_depths()}")
+    if change_detector is not None or detect_every > 1:
+        total = processor.inference_count + processor.skipped_inferences
+        print(f"Skipped {processor.skipped_inferences} of {total} inferences")
+    if detection_cache is not None:
+        print(f"Detection cache hits: {detection_cache.hits}, inferences: {processor.inference_count}")
+    if image_writer is not None:
+        processor.metrics.inc("dropped_frames_total", image_writer.dropped, {"source": "image_writer"})
+        print(f"Saved {image_writer.saved} images")
+        if image_writer.dropped:
+            print(f"Dropped {image_writer.dropped} images while the image writers were busy")
+    if processor.first_detection_at is not None:
+        processor.metrics.set("time_to_first_detection_seconds", processor.first_detection_at - _STARTED_AT)
+        print(f"Time to first detection: {processor.first_detection_at - _STARTED_AT:.2f}s")
+    if metrics is not None:
+        metrics.write(metrics_path)
+        print(f"Metrics written to {metrics_path}")
+    return output_paths
+
+def _mark_processed(frames, live_source):
+    for frame in frames:
+        live_source.mark_processed()
+        yield frame
+
 def _open_video(output_video_path, output_video_and_audio_path):
     print(f"Opening video: {output_video_path} and {output_video_and_audio_path}")
+    # A single-pass encode writes the video and audio to the same file
+    paths = [path for path in dict.fromkeys([output_video_path, output_video_and_audio_path]) if path is not None]
     # Detect the operating system
     if platform.system() == 'Windows':
         print("Windows")
-        os.startfile(output_video_path)  # Windows
-        os.startfile(output_video_and_audio_path)  # Windows
+        for path in paths:
+            os.startfile(path)  # Windows
     elif platform.system() == 'Darwin':  # macOS
         print("macOS")
-        subprocess.run(['open', output_video_path])
-        subprocess.run(['open', output_video_and_audio_path])
+        for path in paths:
+            subprocess.run(['open', path])
     else:  # Assume Linux or other Unix-like OS
         print("Linux")
-        subprocess.run(['xdg-open', output_video_path])
-        subprocess.run(['xdg-open', output_video_and_audio_path])
+        for path in paths:
+            subprocess.run(['xdg-open', path])
 
 if __name__ == "__main__":
+    from detection.optimized_model import OptimizedDETRModel
+
     parser = argparse.ArgumentParser(description="Object Detection in Video")
     parser.add_argument("video_path", type=str, help="Path to the input video file.")
     parser.add_argument("--frame_rate", type=int, default=1, help="Frame extraction rate per ms.")
     parser.add_argument("--display_video", type=bool, default=False, help="Display Video.")
     parser.add_argument("--store_video_path", type=str, default=None, help="Save Final Video.")
     parser.add_argument("--store_image_path", type=str, default=None, help="Save Images.")
+    parser.add_argument("--batch_size", type=int, default=1, help="Frames analyzed per model call.")
+    parser.add_argument("--pipelined", action="store_true", help="Overlap decoding, inference, drawing and encoding.")
+    parser.add_argument("--queue_size", type=int, default=8, help="Frames queued between pipeline stages.")
+    parser.add_argument("--sampling", type=str, default="read", choices=FrameProcessor.SAMPLING_MODES,
+                        help="How skipped frames are stepped over.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes the video is sharded across.")
+    parser.add_argument("--torch_threads", type=int, default=None, help="Torch threads per process.")
+    parser.add_argument("--change_threshold", type=float, default=None,
+                        help="Reuse detections when a frame changed less than this (single process only).")
+    parser.add_argument("--cache_dir", type=str, default=None,
+                        help="Persistent detection cache directory (single process only).")
+    parser.add_argument("--cache_size_mb", type=int, default=1024, help="Detection cache size limit in MB.")
+    parser.add_argument("--backend", type=str, default="eager", choices=("eager",) + OptimizedDETRModel.BACKENDS,
+                        help="Inference backend.")
+    parser.add_argument("--quantize", action="store_true", help="Apply dynamic int8 quantization to the backend.")
+    parser.add_argument("--input_size", type=int, nargs=2, default=(800, 800), metavar=("HEIGHT", "WIDTH"),
+                        help="Fixed input size of the exported backends.")
+    parser.add_argument("--model_cache_dir", type=str, default=MODEL_CACHE_DIR,
+                        help="Local serialized model cache directory, empty to disable.")
+    parser.add_argument("--image_format", type=str, default="png", choices=AsyncImageWriter.FORMATS,
+                        help="Format of the saved images.")
+    parser.add_argument("--png_compression", type=int, default=3, help="PNG compression level, 0-9.")
+    parser.add_argument("--jpeg_quality", type=int, default=95, help="JPEG quality, 0-100.")
+    parser.add_argument("--only_detections", action="store_true",
+                        help="Only save images with detections.")
+    parser.add_argument("--image_writers", type=int, default=2, help="Threads saving the images in the background.")
+    parser.add_argument("--drop_images_when_full", action="store_true",
+                        help="Drop images rather than wait when the image writers fall behind.")
+    parser.add_argument("--detections_path", type=str, default=None,
+                        help="Stream detections to a .jsonl or .parquet file.")
+    parser.add_argument("--data_only", action="store_true",
+                        help="Only write the detections, skipping drawing and encoding.")
+    parser.add_argument("--live", action="store_true",
+                        help="Treat the input as a live stream or camera index, analyzing the freshest frame.")
+    parser.add_argument("--realtime", action="store_true", help="Replay a file at its native speed in live mode.")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds after which a live stream stops.")
+    parser.add_argument("--detect_every", type=int, default=1,
+                        help="Only send every Nth frame to the model (single process only).")
+    parser.add_argument("--track", action="store_true",
+                        help="Track objects across frames with persistent IDs (single process only).")
+    parser.add_argument("--roi", type=int, nargs=4, default=None, metavar=("X", "Y", "WIDTH", "HEIGHT"),
+                        help="Region of the frames to analyze, in pixels.")
+    parser.add_argument("--tiles", type=int, nargs=2, default=(1, 1), metavar=("ROWS", "COLUMNS"),
+                        help="Split the region into overlapping tiles analyzed as one batch.")
+    parser.add_argument("--tile_overlap", type=float, default=0.2, help="Fraction of a tile shared with its neighbours.")
+    parser.add_argument("--metrics_path", type=str, default=None,
+                        help="Write stage metrics to a Prometheus text file, or JSON if it ends in .json (single process only).")
+    parser.add_argument("--inference_config", type=str, default=INFERENCE_CONFIG_PATH,
+                        help="Saved inference settings, such as written by autotune; empty to disable.")
+    parser.add_argument("--interop_threads", type=int, default=None, help="Torch inter-op threads.")
+    parser.add_argument("--bf16", action=argparse.BooleanOptionalAction, default=None,
+                        help="Run the eager model under bf16 autocast; --no-bf16 overrides the saved settings.")
+    parser.add_argument("--channels_last", action=argparse.BooleanOptionalAction, default=None,
+                        help="Run the eager model in channels_last format; --no-channels_last overrides the saved settings.")
+    parser.add_argument("--fixed_input_size", action=argparse.BooleanOptionalAction, default=None,
+                        help="Resize frames to --input_size with the eager model too; --no-fixed_input_size overrides the saved settings.")
+    parser.add_argument("--preview_scale", type=float, default=None,
+                        help="Display a preview downscaled by this factor, keeping full-resolution output.")
     args = parser.parse_args()
 
-    main(args.video_path, args.frame_rate, args.display_video,  args.store_image_path, args.store_video_path)
\ No newline at end of file
+    main(args.video_path, args.frame_rate, args.display_video,  args.store_image_path, args.store_video_path, args.batch_size,
+         args.pipelined, args.queue_size, args.sampling, args.workers, args.torch_threads,
+         args.change_threshold, args.cache_dir, args.cache_size_mb, args.backend, args.quantize, tuple(args.input_size),
+         args.model_cache_dir or None, args.image_format, args.png_compression, args.jpeg_quality, args.only_detections,
+         args.image_writers, args.detections_path, args.data_only, args.live, args.realtime, args.duration,
+         args.detect_every, args.track, args.roi, tuple(args.tiles), args.tile_overlap,
+         args.metrics_path, args.inference_config or None, args.interop_threads, args.bf16, args.channels_last,
+         args.fixed_input_size, args.preview_scale, args.drop_images_when_full)
\ No newline at end of file
@@ -0,0 +1,316 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+BatchJob class for processing many videos with models loaded once per worker.
+
+Clips are scheduled across a pool of worker processes, each of which builds its
+model once when it starts and reuses it for every clip it is given. Every
+finished clip appends one line to summary.jsonl in the output directory, with
+its timings and detection counts. Clips already recorded as done there are
+skipped, so a job interrupted by a crash resumes where it stopped. A worker
+process that dies, for example killed for running out of memory, fails the
+clips it may have been running, and the pool is restarted for the others.
+
+Attributes:
+    model_factory: Picklable callable creating the object detection model in each worker.
+    output_dir: Directory holding the summary and one output directory per clip.
+    num_workers: Number of worker processes; 1 processes the clips in this process.
+    torch_threads: Number of torch intra-op threads per worker.
+    interop_threads: Number of torch inter-op threads per worker.
+"""
+
+import collections
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from processor.frame_processor import FrameProcessor
+from processor.sinks import DetectionSink, JsonlDetectionSink
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v", ".mpg", ".mpeg")
+
+# The model and drawer of the current worker, built once by _init_worker
+_worker = {}
+
+class BatchJob:
+    SUMMARY_FILE = "summary.jsonl"
+
+    def __init__(self, model_factory, output_dir, num_workers=1, torch_threads=None, batch_size=1, frame_rate=1,
+                 sampling="read", store_video=False, write_detections=True, drawer_factory=None, interop_threads=None):
+        """
+        Initializes the BatchJob.
+
+        Args:
+            model_factory: Picklable callable creating the object detection model in each worker.
+            output_dir (str): Directory holding the summary and one output directory per clip, created if missing.
+            num_workers (int): Number of worker processes; 1 processes the clips in this process.
+            torch_threads (int): Number of torch intra-op threads per worker, defaults to sharing the cores.
+            batch_size (int): Number of frames analyzed per model call.
+            frame_rate (int): Frame extraction rate in milliseconds.
+            sampling (str): How skipped frames are stepped over, see FrameProcessor.stream_frames.
+            store_video (bool): Whether to write an annotated video per clip.
+            write_detections (bool): Whether to write the detections of each clip as JSON Lines.
+            drawer_factory: Picklable callable creating the drawer, needed to store videos.
+            interop_threads (int): Number of torch inter-op threads per worker, torch's default when None.
+        """
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        if store_video and drawer_factory is None:
+            raise ValueError("Storing videos requires a drawer_factory")
+        self.model_factory = model_factory
+        self.drawer_factory = drawer_factory
+        self.output_dir = output_dir
+        self.num_workers = num_workers
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // num_workers)
+        self.interop_threads = interop_threads
+        self.options = {
+            "batch_size": batch_size, "frame_rate": frame_rate, "sampling": sampling,
+            "store_video": store_video, "write_detections": write_detections,
+        }
+        os.makedirs(output_dir, exist_ok=True)
+
+    @staticmethod
+    def discover(source):
+        """
+        Lists the videos of a directory, recursively, or of a manifest file.
+
+        Args:
+            source (str): A directory, or a text file with one video path per line. Blank lines
+                and lines starting with # are ignored, and relative paths are relative to the file.
+
+        Returns:
+            list: The paths of the videos, sorted for directories and in manifest order otherwise.
+        """
+        if os.path.isdir(source):
+            return sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(source)
+                for name in names
+                if name.lower().endswith(VIDEO_EXTENSIONS)
+            )
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+        return [os.path.join(base_dir, line) for line in lines if line and not line.startswith("#")]
+
+    def completed(self):
+        """
+        Reads the clips recorded as done by previous runs.
+
+        Returns:
+            set: The absolute paths of the clips processed successfully.
+        """
+        summary_path = os.path.join(self.output_dir, self.SUMMARY_FILE)
+        if not os.path.exists(summary_path):
+            return set()
+        done = set()
+        with open(summary_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a partial last line
+                    continue
+                if record.get("status") == "ok":
+                    done.add(record["video_path"])
+        return done
+
+    def run(self, video_paths):
+        """
+        Processes the clips that are not done yet and records a summary for each.
+
+        Failing clips are recorded with their error and retried on the next run.
+
+        Args:
+            video_paths (list): Paths of the clips to process.
+
+        Returns:
+            list: The summary of every clip processed by this run, in completion order.
+        """
+        done = self.completed()
+        pending = [os.path.abspath(path) for path in dict.fromkeys(video_paths) if os.path.abspath(path) not in done]
+        print(f"Processing {len(pending)} clips, skipping {len(video_paths) - len(pending)} already done")
+        tasks = [(path, self.clip_dir(path), self.options) for path in pending]
+
+        summaries = []
+        with open(os.path.join(self.output_dir, self.SUMMARY_FILE), "a", encoding="utf-8") as summary_file:
+            for summary in self._schedule(tasks):
+                summary_file.write(json.dumps(summary) + "\n")
+                summary_file.flush()
+                os.fsync(summary_file.fileno())
+                summaries.append(summary)
+                status = summary["status"] if summary["status"] != "ok" else (
+                    f"{summary['frames']} frames, {summary['detections']} detections in {summary['seconds']:.2f}s")
+                print(f"[{len(summaries)}/{len(tasks)}] {summary['video_path']}: {status}")
+        return summaries
+
+    def clip_dir(self, video_path):
+        """
+        Returns the output directory of a clip, unique even for clips with the same file name.
+
+        Args:
+            video_path (str): Absolute path of the clip.
+
+        Returns:
+            str: The output directory of the clip.
+        """
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        digest = hashlib.sha1(video_path.encode()).hexdigest()[:8]
+        return os.path.join(self.output_dir, f"{stem}-{digest}")
+
+    def _schedule(self, tasks):
+        """
+        Runs the tasks in this process or across the worker pool.
+
+        Args:
+            tasks (list): The (video_path, clip_dir, options) of every clip.
+
+        Yields:
+            dict: The summary of each clip as it completes.
+        """
+        if self.num_workers == 1:
+            _init_worker(self.model_factory, self.drawer_factory, self.torch_threads, self.interop_threads)
+            for task in tasks:
+                yield _process_clip(task)
+            return
+
+        # Spawn rather than fork, so workers never inherit torch's thread pool state
+        context = multiprocessing.get_context("spawn")
+        pending = collections.deque(tasks)
+        while pending:
+            with ProcessPoolExecutor(self.num_workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(self.model_factory, self.drawer_factory, self.torch_threads,
+                                               self.interop_threads)) as executor:
+                # One clip per worker is in flight, so a dead worker only fails the clips it may have been running
+                running = {}
+                broken = False
+                while (pending or running) and not broken:
+                    while pending and len(running) < self.num_workers:
+                        task = pending.popleft()
+                        running[executor.submit(_process_clip, task)] = (task, time.perf_counter())
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        summary, crashed = self._collect(future, *running.pop(future))
+                        broken = broken or crashed
+                        yield summary
+                # A dead worker breaks the whole pool, failing every clip still in flight
+                for future, (task, submitted_at) in running.items():
+                    yield self._collect(future, task, submitted_at)[0]
+            if broken and pending:
+                print(f"A worker process died, restarting the pool for the {len(pending)} remaining clips")
+
+    @staticmethod
+    def _collect(future, task, submitted_at):
+        """
+        Returns the summary of a finished clip, recording it as failed if its worker process died.
+
+        Args:
+            future (Future): The future of the clip.
+            task (tuple): The (video_path, clip_dir, options) of the clip.
+            submitted_at (float): When the clip was submitted, on the perf_counter clock.
+
+        Returns:
+            tuple: The summary of the clip and whether the pool is broken.
+        """
+        try:
+            return future.result(), False
+        except BrokenProcessPool as e:
+            return {"video_path": task[0], "status": "error", "error": f"{type(e).__name__}: {e}",
+                    "seconds": time.perf_counter() - submitted_at}, True
+
+
+class _CountingSink(DetectionSink):
+    def __init__(self, inner=None):
+        """
+        Counts the detections per label, forwarding the records to another sink.
+
+        Args:
+            inner (DetectionSink): Optional sink the records are forwarded to.
+        """
+        self.inner = inner
+        self.frames = 0
+        self.frames_with_detections = 0
+        self.by_label = collections.Counter()
+
+    def write(self, record):
+        self.frames += 1
+        self.frames_with_detections += bool(record["labels"])
+        self.by_label.update(record["names"])
+        if self.inner is not None:
+            self.inner.write(record)
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
+
+def _init_worker(model_factory, drawer_factory, torch_threads, interop_threads=None):
+    """
+    Builds the model and drawer of a worker, once for all its clips.
+
+    Args:
+        model_factory: Callable creating the object detection model.
+        drawer_factory: Callable creating the drawer, or None.
+        torch_threads (int): Number of torch intra-op threads, or None to leave it unchanged.
+        interop_threads (int): Number of torch inter-op threads, or None to leave it unchanged.
+    """
+    from config.inference_config import InferenceConfig
+    InferenceConfig(torch_threads, interop_threads).apply()
+    _worker["model"] = model_factory()
+    _worker["drawer"] = drawer_factory() if drawer_factory is not None else None
+
+
+def _process_clip(task):
+    """
+    Processes one clip with the model of the current worker.
+
+    Args:
+        task (tuple): The absolute path of the clip, its output directory and the job options.
+
+    Returns:
+        dict: The clip path and status, its frame, inference and detection counts,
+            detections per label, timings and output paths, or the error if it failed.
+    """
+    video_path, clip_dir, options = task
+    started_at = time.perf_counter()
+    try:
+        os.makedirs(clip_dir, exist_ok=True)
+        detections_path = os.path.join(clip_dir, "detections.jsonl") if options["write_detections"] else None
+        sink = _CountingSink(JsonlDetectionSink(detections_path) if detections_path is not None else None)
+        processor = FrameProcessor(_worker["model"], _worker["drawer"], options["batch_size"], detection_sink=sink)
+        output_video_path = None
+        try:
+            if options["store_video"]:
+                fps, frames, audio = processor.stream_video_fragments(video_path, options["frame_rate"], options["sampling"])
+                output_video_path, _ = processor.compile_video(processor.process_frames(frames), clip_dir, fps, audio)
+            else:
+                _, frames = processor.stream_frames(video_path, options["frame_rate"], options["sampling"])
+                for _ in processor.detect_frames(frames):
+                    pass
+        finally:
+            sink.close()
+    except Exception as e:
+        return {"video_path": video_path, "status": "error", "error": f"{type(e).__name__}: {e}",
+                "seconds": time.perf_counter() - started_at}
+
+    seconds = time.perf_counter() - started_at
+    return {
+        "video_path": video_path,
+        "status": "ok",
+        "frames": sink.frames,
+        "frames_with_detections": sink.frames_with_detections,
+        "inferences": processor.inference_count,
+        "detections": sum(sink.by_label.values()),
+        "detections_by_label": dict(sink.by_label),
+        "seconds": seconds,
+        "fps": sink.frames / seconds if seconds else 0.0,
+        "output_video": output_video_path,
+        "detections_path": detections_path,
+    }
@@ -0,0 +1,83 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+FrameChangeDetector class for skipping inference on frames that did not change.
+
+Frames are compared on a small grayscale thumbnail, which is cheap compared to
+a model forward pass and insensitive to sensor noise. A much larger difference
+is reported as a scene cut, so object tracks can be dropped instead of being
+carried into an unrelated scene.
+
+Attributes:
+    threshold: Mean absolute thumbnail difference, in 0-255 intensity levels, above which a frame has changed.
+    size: The (width, height) of the thumbnails frames are compared on.
+    cut_threshold: Mean absolute thumbnail difference above which a frame starts a new scene.
+    scene_cut: Whether the last frame checked started a new scene.
+"""
+
+import cv2
+import numpy as np
+
+class FrameChangeDetector:
+    def __init__(self, threshold=2.0, size=(64, 36), cut_threshold=30.0):
+        """
+        Initializes the FrameChangeDetector.
+
+        Args:
+            threshold (float): Mean absolute thumbnail difference, in 0-255 intensity levels,
+                above which a frame has changed.
+            size (tuple): The (width, height) of the thumbnails frames are compared on.
+            cut_threshold (float): Mean absolute thumbnail difference above which a frame starts
+                a new scene, or None to never report scene cuts.
+        """
+        if threshold < 0:
+            raise ValueError("threshold must not be negative")
+        self.threshold = threshold
+        self.size = size
+        self.cut_threshold = cut_threshold
+        self.scene_cut = False
+        self._reference = None
+
+    def has_changed(self, frame):
+        """
+        Checks whether a frame differs from the last frame that was reported as changed.
+
+        Frames reported as changed become the new reference, so slow drifts still
+        add up to a change instead of being absorbed frame by frame. Sets scene_cut
+        when the difference is above cut_threshold.
+
+        Args:
+            frame: The BGR frame to check.
+
+        Returns:
+            bool: True if the frame changed beyond the threshold, or if there is no reference yet.
+        """
+        thumbnail = self._thumbnail(frame)
+        difference = np.abs(thumbnail - self._reference).mean() if self._reference is not None else None
+        self.scene_cut = difference is not None and self.cut_threshold is not None and difference > self.cut_threshold
+        if difference is not None and difference <= self.threshold:
+            return False
+        self._reference = thumbnail
+        return True
+
+    def reset(self):
+        """
+        Forgets the reference frame, so the next frame is reported as changed.
+        """
+        self._reference = None
+
+    def _thumbnail(self, frame):
+        """
+        Downscales a frame to a grayscale thumbnail.
+
+        Args:
+            frame: The BGR frame to downscale.
+
+        Returns:
+            np.ndarray: The float32 grayscale thumbnail.
+        """
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
@@ -0,0 +1,225 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+DetectionCache class for persisting detections across runs.
+
+Detections are keyed by the content hash of the video, the model name and the
+confidence threshold, so re-rendering the same video with the same model skips
+inference entirely. Each entry is a directory of columnar .npy files that are
+memory-mapped on load:
+
+- frame_idx.npy: the sorted indices of the cached frames.
+- offsets.npy: where each frame's detections start in the columns below, plus the end.
+- labels.npy: the label of every detection.
+- boxes.npy: the (cx, cy, w, h) box of every detection.
+- scores.npy: the confidence of every detection, NaN when it was not recorded.
+
+Entries are evicted least recently used first once the cache outgrows its size limit.
+
+Attributes:
+    cache_dir: Directory holding the cache entries.
+    max_bytes: Total size of the entries above which old ones are evicted.
+"""
+
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+class DetectionCache:
+    COLUMNS = ("frame_idx", "offsets", "labels", "boxes", "scores")
+    # Part of the entry key, so entries written with other columns are never read
+    FORMAT_VERSION = 2
+
+    def __init__(self, cache_dir, max_bytes=1 << 30):
+        """
+        Initializes the DetectionCache.
+
+        Args:
+            cache_dir (str): Directory holding the cache entries, created if missing.
+            max_bytes (int): Total size of the entries above which old ones are evicted.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def open(self, video_path, model_name, threshold):
+        """
+        Opens the cache entry of a video for a given model configuration.
+
+        Args:
+            video_path (str): Path to the input video file.
+            model_name (str): Name of the model producing the detections.
+            threshold (float): Confidence threshold of the model.
+
+        Returns:
+            DetectionCacheEntry: The entry, empty if the video was never cached.
+        """
+        key = hashlib.sha256(f"{self.video_hash(video_path)}:{model_name}:{threshold}:v{self.FORMAT_VERSION}".encode()).hexdigest()[:32]
+        entry_dir = os.path.join(self.cache_dir, key)
+        if os.path.isdir(entry_dir):
+            # Mark the entry as recently used
+            os.utime(entry_dir)
+        return DetectionCacheEntry(self, entry_dir)
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the cache fits its size limit.
+
+        Args:
+            keep (str): Entry directory that must not be evicted.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if os.path.isdir(entry_dir):
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+                entries.append((os.path.getmtime(entry_dir), entry_dir, size))
+
+        total = sum(size for _, _, size in entries)
+        for _, entry_dir, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry_dir == keep:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    @staticmethod
+    def video_hash(video_path, chunk_size=1 << 20):
+        """
+        Hashes the content of a video file.
+
+        Args:
+            video_path (str): Path to the input video file.
+            chunk_size (int): Number of bytes read at a time.
+
+        Returns:
+            str: The hex digest of the file content.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        with open(video_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+class DetectionCacheEntry:
+    def __init__(self, cache, entry_dir):
+        """
+        Initializes the DetectionCacheEntry, memory-mapping its columns if it exists.
+
+        Args:
+            cache (DetectionCache): The cache owning the entry.
+            entry_dir (str): Directory holding the columns of the entry.
+        """
+        self.cache = cache
+        self.entry_dir = entry_dir
+        self.hits = 0
+        self._pending = {}
+        self._index = {}
+        self._labels = None
+        self._boxes = None
+        self._scores = None
+        if os.path.exists(os.path.join(entry_dir, "frame_idx.npy")):
+            columns = {name: np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode="r") for name in DetectionCache.COLUMNS}
+            offsets = columns["offsets"]
+            self._index = dict(zip(columns["frame_idx"].tolist(), zip(offsets[:-1].tolist(), offsets[1:].tolist())))
+            self._labels = columns["labels"]
+            self._boxes = columns["boxes"]
+            self._scores = columns["scores"]
+
+    def __len__(self):
+        return len(self._index.keys() | self._pending.keys())
+
+    def get(self, frame_idx, with_scores=False):
+        """
+        Looks up the cached detections of a frame.
+
+        Args:
+            frame_idx (int): The index of the frame in the video.
+            with_scores (bool): Whether to also return the scores of the detections.
+
+        Returns:
+            tuple: The labels and boxes of the frame, followed by their scores if requested,
+            or None if the frame is not cached.
+        """
+        detections = self._pending.get(frame_idx) or self._read(frame_idx)
+        if detections is None:
+            return None
+        self.hits += 1
+        return detections if with_scores else detections[:2]
+
+    def _read(self, frame_idx):
+        """
+        Reads the detections of a frame from the memory-mapped columns.
+
+        Args:
+            frame_idx (int): The index of the frame in the video.
+
+        Returns:
+            tuple: The labels, boxes and scores of the frame, or None if it is not persisted.
+        """
+        if frame_idx not in self._index:
+            return None
+        start, end = self._index[frame_idx]
+        return self._labels[start:end].tolist(), np.array(self._boxes[start:end]), np.array(self._scores[start:end])
+
+    def put(self, frame_idx, labels, boxes, scores=None):
+        """
+        Adds the detections of a frame, persisted when the entry is closed.
+
+        Args:
+            frame_idx (int): The index of the frame in the video.
+            labels: The labels of the detected objects.
+            boxes: The bounding boxes of the detected objects.
+            scores: The confidence of the detected objects, if known.
+        """
+        if scores is None:
+            scores = np.full(len(labels), np.nan, dtype=np.float32)
+        self._pending[frame_idx] = (list(labels), np.asarray(boxes, dtype=np.float32).reshape(-1, 4),
+                                    np.asarray(scores, dtype=np.float32).reshape(-1))
+
+    def close(self):
+        """
+        Persists the pending detections and evicts old entries if the cache is full.
+        """
+        if not self._pending:
+            return
+        detections = {frame_idx: self._read(frame_idx) for frame_idx in self._index}
+        detections.update(self._pending)
+        frame_indices = sorted(detections)
+        labels = [detections[frame_idx][0] for frame_idx in frame_indices]
+        boxes = [detections[frame_idx][1] for frame_idx in frame_indices]
+        scores = [detections[frame_idx][2] for frame_idx in frame_indices]
+        columns = {
+            "frame_idx": np.array(frame_indices, dtype=np.int64),
+            "offsets": np.concatenate([[0], np.cumsum([len(frame_labels) for frame_labels in labels])]).astype(np.int64),
+            "labels": np.array([label for frame_labels in labels for label in frame_labels], dtype=np.int64),
+            "boxes": np.concatenate(boxes).astype(np.float32) if boxes else np.empty((0, 4), dtype=np.float32),
+            "scores": np.concatenate(scores).astype(np.float32) if scores else np.empty(0, dtype=np.float32),
+        }
+
+        # Write the new columns aside and swap them in, so a crash never leaves a mixed entry
+        tmp_dir = f"{self.entry_dir}.tmp{os.getpid()}"
+        old_dir = f"{self.entry_dir}.old{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name, column in columns.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), column)
+        self._labels = self._boxes = self._scores = None
+        if os.path.isdir(self.entry_dir):
+            os.replace(self.entry_dir, old_dir)
+        os.replace(tmp_dir, self.entry_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        self._index = {frame_idx: (int(start), int(end)) for frame_idx, start, end
+                       in zip(frame_indices, columns["offsets"][:-1], columns["offsets"][1:])}
+        self._labels = columns["labels"]
+        self._boxes = columns["boxes"]
+        self._scores = columns["scores"]
+        self._pending = {}
+        self.cache.evict(keep=self.entry_dir)
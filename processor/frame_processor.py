@@ -14,25 +14,74 @@ Attributes:
 import cv2
 import os
 import datetime
-from pydub import AudioSegment
-from moviepy.editor import VideoFileClip, AudioFileClip
+import itertools
+import time
+import numpy as np
+from detection.drawer import boxes_to_pixels
+from processor.metrics import DEPTH_BUCKETS, NullMetrics
+from processor.video_writer import FFmpegVideoWriter, find_ffmpeg
 
 class FrameProcessor:
-    def __init__(self, model, drawer):
+    SAMPLING_MODES = ("read", "grab", "seek")
+    # Minimum number of frames between two sampled frames before seeking beats grabbing
+    SEEK_MIN_GAP = 30
+
+    def __init__(self, model, drawer, batch_size=1, change_detector=None, detection_cache=None, image_writer=None,
+                 detection_sink=None, detect_every=1, tracker=None, metrics=None, preview_scale=None):
         """
         Initializes the FrameProcessor with a model and a drawer.
 
         Args:
             model: The object detection model to use.
             drawer: The drawer to use for drawing detections on frames.
+            batch_size (int): Number of frames analyzed per model call when processing a stream.
+            change_detector (FrameChangeDetector): Optional pre-filter; frames it reports as
+                unchanged reuse the detections of the last analyzed frame.
+            detection_cache (DetectionCacheEntry): Optional cache of the video's detections;
+                cached frames skip inference and new detections are added to it.
+            image_writer (AsyncImageWriter): Optional background writer; when set, frames are
+                saved through it instead of synchronously to image_path.
+            detection_sink (DetectionSink): Optional sink every analyzed frame's detections are written to.
+            detect_every (int): Only every detect_every-th frame is sent to the model; the others
+                reuse the last detections, or the tracker's predictions when there is a tracker.
+            tracker (IoUTracker): Optional tracker giving detections persistent IDs and propagating
+                them over the frames that are not sent to the model. Its tracks are dropped when the
+                change detector reports a scene cut.
+            metrics (Metrics): Optional registry the stage timings and frame counts are recorded in.
+            preview_scale (float): Optional size of the displayed frames relative to the video; the
+                detections are drawn again on a downscaled copy for display, so large frames display
+                quickly while the full-resolution frames are still saved and encoded.
         """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if detect_every < 1:
+            raise ValueError("detect_every must be at least 1")
         self.model = model
         self.drawer = drawer
+        self.batch_size = batch_size
+        self.change_detector = change_detector
+        self.detection_cache = detection_cache
+        self.image_writer = image_writer
+        self.detection_sink = detection_sink
+        self.detect_every = detect_every
+        self.tracker = tracker
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.preview_scale = preview_scale
+        self.fps = None
+        self._timestamp = None
+        self.inference_count = 0
+        self.skipped_inferences = 0
+        self._last_detections = None
+        self._frames_seen = 0
+        self.first_detection_at = None
 
     def extract_video_fragments(self, video_path, frame_rate=1):
         """
         Extracts frames from a video at a specified frame rate.
 
+        Every extracted frame is held in memory at once; prefer
+        stream_video_fragments for long videos.
+
         Args:
             video_path (str): Path to the input video file.
             frame_rate (int): Frame extraction rate in milliseconds.
@@ -43,27 +92,192 @@ class FrameProcessor:
         Raises:
             IOError: If the video file cannot be opened.
         """
+        fps, frames, audio = self.stream_video_fragments(video_path, frame_rate)
+        return fps, [frame for _, frame in frames], audio
+
+    def stream_video_fragments(self, video_path, frame_rate=1, sampling="read"):
+        """
+        Lazily extracts frames from a video at a specified frame rate.
+
+        The video is opened eagerly so errors surface immediately, but frames are
+        decoded one at a time as the returned generator is consumed.
+
+        Args:
+            video_path (str): Path to the input video file.
+            frame_rate (int): Frame extraction rate in milliseconds.
+            sampling (str): How skipped frames are stepped over, see stream_frames.
+
+        Returns:
+            tuple: The video fps, a generator of (frame_idx, frame) pairs and the audio track.
+
+        Raises:
+            IOError: If the video file cannot be opened.
+        """
+        fps, frames = self.stream_frames(video_path, frame_rate, sampling)
+        audio = self._load_audio(video_path)
+        return fps, frames, audio
+
+    def _load_audio(self, video_path):
+        """
+        Loads the audio track of a video.
+
+        When ffmpeg is available the audio is not decoded at all: the source
+        path is returned and its audio stream is copied when the video is compiled.
+
+        Args:
+            video_path (str): Path to the input video file.
+
+        Returns:
+            str or AudioSegment: The path of the video, or its decoded audio track without ffmpeg.
+        """
+        if find_ffmpeg() is not None:
+            return video_path
+        # pydub is only needed to mux audio, so it is imported on first use
+        from pydub import AudioSegment
+        return AudioSegment.from_file(video_path)
+
+    def stream_frames(self, video_path, frame_rate=1, sampling="read", start_frame=0, end_frame=None):
+        """
+        Lazily extracts the frames of a video, without its audio track.
+
+        All sampling modes select exactly the same frames:
+
+        - "read" decodes and converts every frame, then discards the skipped ones.
+        - "grab" only demuxes and decodes skipped frames, without retrieving them.
+        - "seek" jumps to the next selected frame when it is far enough ahead,
+          letting the decoder restart from the nearest keyframe.
+
+        Args:
+            video_path (str): Path to the input video file.
+            frame_rate (int): Frame extraction rate in milliseconds.
+            sampling (str): One of SAMPLING_MODES.
+            start_frame (int): Index of the first frame to consider.
+            end_frame (int): Index one past the last frame to consider, defaults to the end of the video.
+
+        Returns:
+            tuple: The video fps and a generator of (frame_idx, frame) pairs.
+
+        Raises:
+            IOError: If the video file cannot be opened.
+            ValueError: If the sampling mode is unknown.
+        """
+        if sampling not in self.SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode: {sampling}")
         cap = cv2.VideoCapture(video_path)
-        audio = AudioSegment.from_file(video_path)
         if not cap.isOpened():
             raise IOError("Could not open video")
 
-        frames = []
         fps = cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps
         frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_indices = range(start_frame, frame_count if end_frame is None else min(end_frame, frame_count))
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
 
         print(f"Extracting frames every {frame_rate} milliseconds")
 
-        for frame_count in range(frame_count):
-            ret, frame = cap.read()
-            if not ret:
-                break
-            current_time_ms = frame_count * (1000 / fps)
-            if current_time_ms % frame_rate < (1000 / fps):
-                frames.append(frame)
+        if sampling == "seek":
+            frames = self._seek_frames(cap, fps, frame_indices, frame_rate)
+        else:
+            frames = self._iter_frames(cap, fps, frame_indices, frame_rate, grab_skipped=sampling == "grab")
+        return fps, self._timed_frames(frames) if self.metrics.enabled else frames
 
-        cap.release()
-        return fps, frames, audio
+    def _timed_frames(self, frames):
+        """
+        Records how long each frame of a stream takes to decode, including the skipped frames before it.
+
+        Args:
+            frames: An iterator of (frame_idx, frame) pairs.
+
+        Yields:
+            tuple: The pairs of the stream.
+        """
+        while True:
+            with self.metrics.timer("stage_seconds", {"stage": "decode"}):
+                item = next(frames, None)
+            if item is None:
+                return
+            yield item
+
+    def _iter_frames(self, cap, fps, frame_indices, frame_rate, grab_skipped=False):
+        """
+        Yields the frames of an opened capture that fall on the extraction rate.
+
+        Args:
+            cap (cv2.VideoCapture): The opened video capture, released once exhausted.
+            fps (float): Frames per second of the video.
+            frame_indices (range): Indices of the frames to consider, starting at the capture position.
+            frame_rate (int): Frame extraction rate in milliseconds.
+            grab_skipped (bool): Whether to step over skipped frames without retrieving them.
+
+        Yields:
+            tuple: The index of the frame in the video and the frame itself.
+        """
+        try:
+            for frame_idx in frame_indices:
+                if grab_skipped and not self._is_sampled(frame_idx, fps, frame_rate):
+                    if not cap.grab():
+                        break
+                    continue
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if self._is_sampled(frame_idx, fps, frame_rate):
+                    yield frame_idx, frame
+        finally:
+            cap.release()
+
+    def _seek_frames(self, cap, fps, frame_indices, frame_rate):
+        """
+        Yields the sampled frames of an opened capture by seeking between them.
+
+        Short gaps are stepped over with grab(), since a seek restarts decoding
+        from the previous keyframe and only pays off for larger jumps.
+
+        Args:
+            cap (cv2.VideoCapture): The opened video capture, released once exhausted.
+            fps (float): Frames per second of the video.
+            frame_indices (range): Indices of the frames to consider, starting at the capture position.
+            frame_rate (int): Frame extraction rate in milliseconds.
+
+        Yields:
+            tuple: The index of the frame in the video and the frame itself.
+        """
+        position = frame_indices.start
+        try:
+            for frame_idx in frame_indices:
+                if not self._is_sampled(frame_idx, fps, frame_rate):
+                    continue
+                if frame_idx - position > self.SEEK_MIN_GAP:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+                    position = frame_idx
+                while position < frame_idx:
+                    if not cap.grab():
+                        return
+                    position += 1
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                position += 1
+                yield frame_idx, frame
+        finally:
+            cap.release()
+
+    @staticmethod
+    def _is_sampled(frame_idx, fps, frame_rate):
+        """
+        Checks whether a frame falls on the extraction rate.
+
+        Args:
+            frame_idx (int): The index of the frame in the video.
+            fps (float): Frames per second of the video.
+            frame_rate (int): Frame extraction rate in milliseconds.
+
+        Returns:
+            bool: True if the frame should be extracted.
+        """
+        current_time_ms = frame_idx * (1000 / fps)
+        return current_time_ms % frame_rate < (1000 / fps)
 
     def process_frame(self, frame, frame_idx, display_video=False, image_path=None):
         """
@@ -74,13 +288,252 @@ class FrameProcessor:
             frame_idx (int): The index of the frame.
             display_video (bool): Whether to display the video with detections.
             image_path (str): Path to save the images.
+
+        Returns:
+            The frame with the detections drawn on it.
         """
         labels, boxes = self.model.analyze_frame(frame)
-        frame_with_detections = self.drawer.draw_detections(frame, labels, boxes, self.model.id2label)
-        self._save_frame(frame_with_detections, frame_idx, image_path)
-        self._display_frame(frame_with_detections, display_video)
+        return self._render_frame(frame, frame_idx, labels, boxes, display_video, image_path)
+
+    def process_frames(self, frames, display_video=False, image_path=None):
+        """
+        Lazily processes a stream of frames in batches of batch_size.
+
+        At most batch_size frames are held in flight at any time.
+
+        Args:
+            frames: An iterable of (frame_idx, frame) pairs.
+            display_video (bool): Whether to display the video with detections.
+            image_path (str): Path to save the images.
+
+        Yields:
+            The frames with the detections drawn on them, in input order.
+        """
+        for frame_idx, frame, labels, boxes in self.detect_frames(frames):
+            yield self._render_frame(frame, frame_idx, labels, boxes, display_video, image_path)
+
+    def detect_frames(self, frames):
+        """
+        Lazily runs the model on a stream of frames in batches of batch_size.
+
+        Args:
+            frames: An iterable of (frame_idx, frame) pairs.
+
+        Yields:
+            tuple: The frame index, the frame, and its detected labels and boxes, in input order.
+        """
+        batch = []
+        for frame_idx, frame in frames:
+            batch.append((frame_idx, frame))
+            if len(batch) == self.batch_size:
+                yield from self._detect_batch(batch)
+                batch = []
+        if batch:
+            yield from self._detect_batch(batch)
+
+    def _detect_batch(self, batch):
+        """
+        Analyzes a batch of frames with one model call.
+
+        Args:
+            batch (list): The (frame_idx, frame) pairs to analyze.
+
+        Yields:
+            tuple: The frame index, the frame, and its detected labels and boxes, in input order.
+        """
+        detections = self._analyze_batch(batch)
+        self.metrics.inc("frames_total", len(batch))
+        if self.first_detection_at is None:
+            self.first_detection_at = time.perf_counter()
+        for (frame_idx, frame), (labels, boxes, scores, track_ids) in zip(batch, detections):
+            if self.detection_sink is not None:
+                self.detection_sink.write(self._detection_record(frame_idx, frame, labels, boxes, scores, track_ids))
+            yield frame_idx, frame, labels, boxes
+
+    def _detection_record(self, frame_idx, frame, labels, boxes, scores, track_ids=None):
+        """
+        Builds the structured record of a frame's detections.
+
+        Args:
+            frame_idx (int): The index of the frame in the video.
+            frame: The analyzed frame.
+            labels: The labels of the detected objects.
+            boxes: The normalized (cx, cy, w, h) bounding boxes of the detected objects.
+            scores: The confidence of the detected objects, or None if unknown.
+            track_ids (list): The track ID of each detected object, or None without a tracker.
+
+        Returns:
+            dict: The frame index, its timestamp on the video clock in milliseconds, and the
+            labels, names, scores, pixel (x1, y1, x2, y2) boxes and track IDs of the detections.
+        """
+        height, width = frame.shape[:2]
+        labels = [int(label) for label in labels]
+        if scores is None:
+            scores = np.full(len(labels), np.nan)
+        return {
+            "frame_idx": int(frame_idx),
+            "timestamp_ms": frame_idx * 1000 / self.fps if self.fps else None,
+            "labels": labels,
+            "names": [self.model.id2label.get(label, str(label)) for label in labels],
+            "scores": np.asarray(scores, dtype=np.float64).tolist(),
+            "boxes": boxes_to_pixels(boxes, width, height).tolist(),
+            "track_ids": list(track_ids) if track_ids is not None else [None] * len(labels),
+        }
+
+    def _analyze_batch(self, batch):
+        """
+        Runs the model on a batch of frames.
+
+        Only every detect_every-th frame is considered for inference and, with a
+        change detector, only if it changed. Frames that are not sent to the model
+        reuse the detections of the last analyzed frame, or get the boxes predicted
+        by the tracker when there is one.
+
+        Args:
+            batch (list): The (frame_idx, frame) pairs to analyze.
+
+        Returns:
+            list: A (labels, boxes, scores, track_ids) tuple per frame, in input order;
+            track_ids is None without a tracker.
+        """
+        selections = [self._select(frame) for _, frame in batch]
+        selected = [is_selected for is_selected, _ in selections]
+        selected_batch = [item for item, is_selected in zip(batch, selected) if is_selected]
+        analyzed = iter(self._infer(selected_batch))
+        self.skipped_inferences += len(batch) - len(selected_batch)
+        self.metrics.inc("skipped_inferences_total", len(batch) - len(selected_batch))
+
+        detections = []
+        for (frame_idx, _), (is_selected, is_cut) in zip(batch, selections):
+            if is_selected:
+                self._last_detections = next(analyzed)
+            if self.tracker is None:
+                detections.append((*self._last_detections, None))
+            elif is_selected:
+                if is_cut:
+                    # Tracks of the previous scene would carry stale IDs and velocities into the new one
+                    self.tracker.reset()
+                detections.append(self.tracker.update(frame_idx, *self._last_detections))
+            else:
+                detections.append(self.tracker.predict(frame_idx))
+        return detections
+
+    def _select(self, frame):
+        """
+        Checks whether the next frame of the stream should be sent to the model.
+
+        Args:
+            frame: The frame.
+
+        Returns:
+            tuple: Whether the frame falls on detect_every and, with a change detector, changed,
+            and whether the change detector reported it as a scene cut.
+        """
+        position = self._frames_seen
+        self._frames_seen += 1
+        if position % self.detect_every:
+            return False, False
+        if self.change_detector is None:
+            return True, False
+        return self.change_detector.has_changed(frame), self.change_detector.scene_cut
+
+    def _infer(self, batch):
+        """
+        Runs the model on the frames of a batch that are not in the detection cache.
 
-    def _save_frame(self, frame, frame_idx, image_path):
+        Scores are requested from the model when a detection sink needs them or a detection
+        cache stores them, so cached detections can later be written to a sink. Cached
+        detections recorded without scores are analyzed again when a sink needs them.
+
+        Args:
+            batch (list): The (frame_idx, frame) pairs to analyze.
+
+        Returns:
+            list: A (labels, boxes, scores) tuple per frame, in input order; scores are None when not requested.
+        """
+        if self.detection_cache is None:
+            detections = [None] * len(batch)
+        else:
+            detections = [self.detection_cache.get(frame_idx, with_scores=True) for frame_idx, _ in batch]
+            if self.detection_sink is not None:
+                detections = [None if cached is None or np.isnan(cached[2]).any() else cached for cached in detections]
+
+        misses = [i for i, cached in enumerate(detections) if cached is None]
+        self.metrics.inc("cache_hits_total", len(batch) - len(misses))
+        if misses:
+            self.inference_count += len(misses)
+            self.metrics.inc("inferences_total", len(misses))
+            frames = [batch[i][1] for i in misses]
+            with self.metrics.timer("stage_seconds", {"stage": "analyze"}):
+                if self.detection_sink is not None or self.detection_cache is not None:
+                    analyzed = self.model.analyze_frames(frames, return_scores=True)
+                else:
+                    analyzed = [(labels, boxes, None) for labels, boxes in self.model.analyze_frames(frames)]
+            self.metrics.observe("batch_size", len(frames), buckets=DEPTH_BUCKETS)
+            for i, (labels, boxes, scores) in zip(misses, analyzed):
+                detections[i] = (labels, boxes, scores)
+                if self.detection_cache is not None:
+                    self.detection_cache.put(batch[i][0], labels, boxes, scores)
+        return detections
+
+    def _render_frame(self, frame, frame_idx, labels, boxes, display_video, image_path):
+        """
+        Draws the detections on a frame, then saves and displays it.
+
+        Args:
+            frame: The frame to draw on.
+            frame_idx (int): The index of the frame.
+            labels: The labels of the detected objects.
+            boxes: The bounding boxes of the detected objects.
+            display_video (bool): Whether to display the video with detections.
+            image_path (str): Path to save the images.
+
+        Returns:
+            The frame with the detections drawn on it.
+        """
+        preview = self._preview_frame(frame, labels, boxes, display_video)
+        frame_with_detections = self._annotate_frame(frame, frame_idx, labels, boxes, image_path)
+        self._display_frame(frame_with_detections if preview is None else preview, display_video)
+        return frame_with_detections
+
+    def _preview_frame(self, frame, labels, boxes, display_video):
+        """
+        Draws the detections on a downscaled copy of a frame for display, leaving the frame untouched.
+
+        Args:
+            frame: The frame, before the detections are drawn on it.
+            labels: The labels of the detected objects.
+            boxes: The bounding boxes of the detected objects.
+            display_video (bool): Whether the video is displayed.
+
+        Returns:
+            The preview, or None when the video is not displayed or no preview_scale is set.
+        """
+        if not display_video or self.preview_scale is None:
+            return None
+        with self.metrics.timer("stage_seconds", {"stage": "draw"}):
+            return self.drawer.draw_preview(frame, labels, boxes, self.model.id2label, self.preview_scale)
+
+    def _annotate_frame(self, frame, frame_idx, labels, boxes, image_path):
+        """
+        Draws the detections on a frame and saves it.
+
+        Args:
+            frame: The frame to draw on.
+            frame_idx (int): The index of the frame.
+            labels: The labels of the detected objects.
+            boxes: The bounding boxes of the detected objects.
+            image_path (str): Path to save the images.
+
+        Returns:
+            The frame with the detections drawn on it.
+        """
+        with self.metrics.timer("stage_seconds", {"stage": "draw"}):
+            frame_with_detections = self.drawer.draw_detections(frame, labels, boxes, self.model.id2label)
+        self._save_frame(frame_with_detections, frame_idx, image_path, has_detections=len(labels) > 0)
+        return frame_with_detections
+
+    def _save_frame(self, frame, frame_idx, image_path, has_detections=True):
         """
         Saves a processed frame to the specified directory.
 
@@ -88,11 +541,17 @@ class FrameProcessor:
             frame: The frame to save.
             frame_idx (int): The index of the frame.
             image_path (str): Path to save the images.
+            has_detections (bool): Whether objects were detected on the frame.
         """
-        if image_path is not None:
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = os.path.join(image_path, f"detected_frame_{frame_idx}_{timestamp}.png")
-            cv2.imwrite(output_path, frame)
+        if self.image_writer is not None:
+            with self.metrics.timer("stage_seconds", {"stage": "save"}):
+                self.image_writer.submit(frame, frame_idx, has_detections)
+        elif image_path is not None:
+            if self._timestamp is None:
+                self._timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = os.path.join(image_path, f"detected_frame_{frame_idx}_{self._timestamp}.png")
+            with self.metrics.timer("stage_seconds", {"stage": "save"}):
+                cv2.imwrite(output_path, frame)
 
     def _display_frame(self, frame, display_video):
         """
@@ -106,50 +565,64 @@ class FrameProcessor:
             cv2.imshow("ANALYZING FRAMES...", frame)
             cv2.waitKey(1)
 
-    """
-    Compiles a list of frames into a video and saves it to the specified directory.
-    
-    Args:
-        frames (list): A list of frames to compile into a video.
-        store_video_path (str): Path to save the video.
-        fps (int): Frames per second for the video.
-        audio (AudioSegment): Audio to add to the video.
-    """
     def compile_video(self, frames, store_video_path, fps=20, audio=None):
         """
-        Compiles a list of frames into a video and adds audio if provided.
+        Compiles a stream of frames into a video and adds audio if provided.
+
+        Frames are written as they are produced, so only one frame is held in
+        memory at a time. The stream is drained even when no video is stored.
 
         Args:
-            frames (list): A list of frames to compile into a video.
+            frames (iterable): The frames to compile into a video.
             store_video_path (str): Path to save the video.
             fps (int): Frames per second for the video.
-            audio (AudioSegment): Audio to add to the video.
+            audio (str or AudioSegment): Path of a file whose audio stream is copied into
+                the video in the same encoding pass, or decoded audio to add to it.
         """
         output_video_path = None
         output_video_and_audio_path = None
-        if store_video_path is not None and len(frames) > 0:
+        frames = iter(frames)
+        if store_video_path is None:
+            for _ in frames:
+                pass
+            return output_video_path, output_video_and_audio_path
+
+        first_frame = next(frames, None)
+        if first_frame is not None:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_video_path = os.path.join(store_video_path, f"detected_frames_{timestamp}.mp4")
 
             # Get the dimensions from the first frame
-            h, w, _ = frames[0].shape
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            video_writer = cv2.VideoWriter(output_video_path, fourcc, fps, (w, h))
-
-            # Write each frame into the video file
-            for frame in frames:
-                video_writer.write(frame)
+            h, w, _ = first_frame.shape
+            if isinstance(audio, str):
+                # Encode the frames and copy the source audio stream in a single ffmpeg pass
+                output_video_path = os.path.join(store_video_path, f"detected_frames_with_audio{timestamp}.mp4")
+                output_video_and_audio_path = output_video_path
+                video_writer = FFmpegVideoWriter(output_video_path, fps, (w, h), audio_source=audio)
+            else:
+                output_video_path = os.path.join(store_video_path, f"detected_frames_{timestamp}.mp4")
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                video_writer = cv2.VideoWriter(output_video_path, fourcc, fps, (w, h))
 
-            video_writer.release()
+            # Write each frame into the video file, releasing the writer even if producing the frames fails
+            try:
+                for frame in itertools.chain([first_frame], frames):
+                    with self.metrics.timer("stage_seconds", {"stage": "encode"}):
+                        video_writer.write(frame)
+            finally:
+                with self.metrics.timer("stage_seconds", {"stage": "finalize"}):
+                    video_writer.release()
 
             # Add audio to the video if provided
-            if audio is not None:
+            if isinstance(audio, str):
+                print(f"Video with audio saved to: {output_video_and_audio_path}")
+            elif audio is not None:
                 # Save audio to a temporary file
                 temp_audio_path = os.path.join(store_video_path, f"temp_audio_{timestamp}.mp3")
                 output_video_and_audio_path = os.path.join(store_video_path, f"detected_frames_with_audio{timestamp}.mp4")
                 audio.export(temp_audio_path, format="mp3")
 
-                # Merge the video and audio using moviepy
+                # Merge the video and audio using moviepy, imported here as it is slow to load
+                from moviepy.editor import VideoFileClip, AudioFileClip
                 video_clip = VideoFileClip(output_video_path)
                 audio_clip = AudioFileClip(temp_audio_path)
                 video_with_audio = video_clip.set_audio(audio_clip)
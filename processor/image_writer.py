@@ -0,0 +1,139 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+AsyncImageWriter class for saving processed frames off the processing thread.
+
+Frames are handed to a pool of writer threads through a bounded queue, so
+compression and disk I/O overlap with inference while memory stays bounded.
+
+Attributes:
+    image_path: Directory the frames are saved to.
+    image_format: One of FORMATS.
+    only_detections: Whether frames without detections are skipped.
+    saved: Number of frames written so far.
+    dropped: Number of frames dropped because the queue was full.
+"""
+
+import datetime
+import os
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+_DONE = object()
+
+class AsyncImageWriter:
+    FORMATS = ("png", "jpg", "npy")
+
+    def __init__(self, image_path, image_format="png", png_compression=3, jpeg_quality=95, workers=2, max_queue=64,
+                 only_detections=False, drop_when_full=False):
+        """
+        Initializes the AsyncImageWriter and starts its writer threads.
+
+        Args:
+            image_path (str): Directory the frames are saved to.
+            image_format (str): One of FORMATS; npy stores the raw frame without compression.
+            png_compression (int): PNG compression level, from 0 (fastest) to 9 (smallest).
+            jpeg_quality (int): JPEG quality, from 0 to 100.
+            workers (int): Number of writer threads.
+            max_queue (int): Maximum number of frames waiting to be written.
+            only_detections (bool): Whether frames without detections are skipped.
+            drop_when_full (bool): Whether to drop frames instead of waiting when the queue is full,
+                so saving never holds back processing.
+        """
+        if image_format not in self.FORMATS:
+            raise ValueError(f"Unknown image format: {image_format}")
+        self.image_path = image_path
+        self.image_format = image_format
+        self.only_detections = only_detections
+        self.drop_when_full = drop_when_full
+        self.saved = 0
+        self.dropped = 0
+        if image_format == "png":
+            self._params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+        elif image_format == "jpg":
+            self._params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        else:
+            self._params = []
+        # One timestamp per run, rather than one clock read per frame
+        self._timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._error = None
+        self._workers = [threading.Thread(target=self._run, name=f"image-writer-{i}", daemon=True) for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, frame, frame_idx, has_detections=True):
+        """
+        Queues a frame to be saved.
+
+        Args:
+            frame: The frame to save; it must not be modified afterwards.
+            frame_idx (int): The index of the frame.
+            has_detections (bool): Whether objects were detected on the frame.
+        """
+        if self.only_detections and not has_detections:
+            return
+        try:
+            self._queue.put((frame, frame_idx), block=not self.drop_when_full)
+        except queue.Full:
+            self.dropped += 1
+
+    def queue_depth(self):
+        """
+        Returns the number of frames waiting to be written.
+
+        Returns:
+            int: The current depth of the queue.
+        """
+        return self._queue.qsize()
+
+    def close(self):
+        """
+        Waits for the queued frames to be written and stops the writer threads.
+
+        Raises:
+            IOError: If a frame could not be written.
+        """
+        for _ in self._workers:
+            self._queue.put(_DONE)
+        for worker in self._workers:
+            worker.join()
+        if self._error is not None:
+            raise IOError(f"Could not save frame: {self._error}")
+
+    def _run(self):
+        """
+        Writes queued frames until the writer is closed.
+        """
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            frame, frame_idx = item
+            try:
+                self._write(frame, frame_idx)
+            except Exception as e:
+                self._error = self._error or e
+
+    def _write(self, frame, frame_idx):
+        """
+        Encodes and writes a single frame.
+
+        Args:
+            frame: The frame to save.
+            frame_idx (int): The index of the frame.
+        """
+        output_path = os.path.join(self.image_path, f"detected_frame_{frame_idx}_{self._timestamp}.{self.image_format}")
+        if self.image_format == "npy":
+            np.save(output_path, frame)
+        elif not cv2.imwrite(output_path, frame, self._params):
+            raise IOError(output_path)
+        with self._lock:
+            self.saved += 1
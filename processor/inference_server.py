@@ -0,0 +1,320 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+InferenceServer class for sharing one warm model across many local callers.
+
+The server accepts encoded frames and video paths over HTTP. Every frame, from
+any request, goes through a DynamicBatcher, which runs the model on a single
+thread and groups the frames waiting for it into batches: a batch closes when
+it reaches the maximum size or when the first frame in it has waited for the
+maximum wait window, so a lone request pays at most that window in latency.
+Frames of different sizes in a batch are analyzed in separate model calls, as
+the model would pad them to the largest and change their detections.
+
+Endpoints:
+
+- POST /detect: the body is an encoded image (PNG, JPEG, ...). Returns the labels,
+  names, normalized (cx, cy, w, h) boxes and scores, as analyze_frame does.
+- POST /detect_video: the body is a JSON object with a video_path, and optionally a
+  frame_rate and sampling mode. Returns the fps and the detections of every sampled frame.
+- GET /stats: request, batch and frame counts, throughput and latency percentiles.
+"""
+
+import collections
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+from processor.frame_processor import FrameProcessor
+
+_STOP = object()
+
+class DynamicBatcher:
+    def __init__(self, model, max_batch_size=8, max_wait_ms=10, latency_window=10000):
+        """
+        Initializes the DynamicBatcher and starts its inference thread.
+
+        Args:
+            model: The object detection model; it is only ever called from the inference thread.
+            max_batch_size (int): Maximum number of frames analyzed per model call.
+            max_wait_ms (float): Maximum time the first frame of a batch waits for more frames.
+            latency_window (int): Number of recent frames the latency percentiles are computed over.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.frames = 0
+        self.batches = 0
+        self.errors = 0
+        self._queue = queue.Queue()
+        self._latencies = collections.deque(maxlen=latency_window)
+        self._batch_sizes = collections.Counter()
+        self._started_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame):
+        """
+        Queues a frame for the next batch.
+
+        Args:
+            frame: The frame to analyze.
+
+        Returns:
+            Future: Resolves to the labels, boxes and scores of the frame.
+        """
+        future = Future()
+        self._queue.put((frame, future, time.perf_counter()))
+        return future
+
+    def analyze_frame(self, frame, timeout=None):
+        """
+        Analyzes a frame as part of whichever batch it joins.
+
+        Args:
+            frame: The frame to analyze.
+            timeout (float): Seconds to wait for the result, or None to wait indefinitely.
+
+        Returns:
+            tuple: The labels, boxes and scores of the detected objects.
+        """
+        return self.submit(frame).result(timeout)
+
+    def close(self):
+        """
+        Analyzes the frames already queued and stops the inference thread.
+        """
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        """
+        Summarizes the throughput and latency so far.
+
+        Returns:
+            dict: The frame, batch and error counts, the mean batch size and batch size counts,
+            the frames per second since start, the queue depth, and the p50, p95 and max
+            latency in milliseconds from submission to result.
+        """
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            frames, batches, errors = self.frames, self.batches, self.errors
+        elapsed = time.perf_counter() - self._started_at
+        return {
+            "frames": frames,
+            "batches": batches,
+            "errors": errors,
+            "mean_batch_size": frames / batches if batches else 0.0,
+            "batch_sizes": batch_sizes,
+            "frames_per_second": frames / elapsed if elapsed else 0.0,
+            "queue_depth": self._queue.qsize(),
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "latency_p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            "latency_max_ms": float(latencies.max()) if len(latencies) else None,
+        }
+
+    def _run(self):
+        """
+        Collects batches from the queue and analyzes them until the batcher is closed.
+        """
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            # DETR pads a batch to its largest frame, so only frames of one size share a model call
+            by_shape = collections.defaultdict(list)
+            for item in batch:
+                by_shape[np.shape(item[0])].append(item)
+            for group in by_shape.values():
+                self._analyze(group)
+
+    def _analyze(self, batch):
+        """
+        Runs the model on a batch and resolves the futures of its frames.
+
+        Args:
+            batch (list): The (frame, future, submitted_at) of every frame in the batch.
+        """
+        try:
+            results = self.model.analyze_frames([frame for frame, _, _ in batch], return_scores=True)
+        except Exception as e:
+            with self._lock:
+                self.errors += len(batch)
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        finished_at = time.perf_counter()
+        with self._lock:
+            self.frames += len(batch)
+            self.batches += 1
+            self._batch_sizes[len(batch)] += 1
+            self._latencies.extend(finished_at - submitted_at for _, _, submitted_at in batch)
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, batcher, host="127.0.0.1", port=8000, log_requests=False):
+        """
+        Initializes the InferenceServer and binds it to a local address.
+
+        Args:
+            batcher (DynamicBatcher): The batcher every frame is analyzed through.
+            host (str): The address to listen on.
+            port (int): The port to listen on, 0 for any free port.
+            log_requests (bool): Whether to log every request to stderr.
+        """
+        super().__init__((host, port), _RequestHandler)
+        self.batcher = batcher
+        self.log_requests = log_requests
+        self.requests = collections.Counter()
+        self.lock = threading.Lock()
+
+    def detection_result(self, labels, boxes, scores):
+        """
+        Builds the JSON result of a frame's detections.
+
+        Args:
+            labels: The labels of the detected objects.
+            boxes: The normalized (cx, cy, w, h) bounding boxes of the detected objects.
+            scores: The confidence of the detected objects.
+
+        Returns:
+            dict: The labels, names, boxes and scores, with unknown scores as null.
+        """
+        labels = [int(label) for label in labels]
+        id2label = self.batcher.model.id2label
+        return {
+            "labels": labels,
+            "names": [id2label.get(label, str(label)) for label in labels],
+            "boxes": np.asarray(boxes, dtype=np.float64).reshape(-1, 4).tolist(),
+            "scores": [None if math.isnan(score) else score for score in np.asarray(scores, dtype=np.float64).tolist()],
+        }
+
+    def detect_video(self, video_path, frame_rate=1, sampling="read"):
+        """
+        Analyzes the sampled frames of a video, keeping a bounded number of them in flight.
+
+        Args:
+            video_path (str): Path to the video file, on the server's file system.
+            frame_rate (int): Frame extraction rate in milliseconds.
+            sampling (str): How skipped frames are stepped over, see FrameProcessor.stream_frames.
+
+        Returns:
+            dict: The fps of the video and the frame index and detections of every sampled frame.
+
+        Raises:
+            IOError: If the video file cannot be opened.
+        """
+        fps, frames = FrameProcessor(None, None).stream_frames(video_path, frame_rate, sampling)
+        max_in_flight = 2 * self.batcher.max_batch_size
+        in_flight = collections.deque()
+        results = []
+        for frame_idx, frame in frames:
+            in_flight.append((frame_idx, self.batcher.submit(frame)))
+            if len(in_flight) >= max_in_flight:
+                results.append(self._frame_result(*in_flight.popleft()))
+        results.extend(self._frame_result(*item) for item in in_flight)
+        return {"video_path": video_path, "fps": fps, "frames": results}
+
+    def _frame_result(self, frame_idx, future):
+        return {"frame_idx": frame_idx, **self.detection_result(*future.result())}
+
+    def stats(self):
+        """
+        Summarizes the requests served and the batcher throughput and latency.
+
+        Returns:
+            dict: The request counts by endpoint and the batcher stats.
+        """
+        with self.lock:
+            requests = dict(self.requests)
+        return {"requests": requests, **self.batcher.stats()}
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/stats":
+            self._send_json(200, self.server.stats())
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {path}"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        handlers = {"/detect": self._detect, "/detect_video": self._detect_video}
+        if path not in handlers:
+            self._send_json(404, {"error": f"Unknown endpoint {path}"})
+            return
+        with self.server.lock:
+            self.server.requests[path] += 1
+        try:
+            handlers[path](body)
+        except Exception as e:
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _detect(self, body):
+        frame = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            self._send_json(400, {"error": "The body is not an encoded image"})
+            return
+        self._send_json(200, self.server.detection_result(*self.server.batcher.analyze_frame(frame)))
+
+    def _detect_video(self, body):
+        try:
+            request = json.loads(body)
+            video_path = request["video_path"]
+            frame_rate = int(request.get("frame_rate", 1))
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {"error": "The body must be a JSON object with a video_path"})
+            return
+        try:
+            result = self.server.detect_video(video_path, frame_rate, request.get("sampling", "read"))
+        except IOError as e:
+            self._send_json(404, {"error": str(e)})
+            return
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(200, result)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.log_requests:
+            super().log_message(format, *args)
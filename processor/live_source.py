@@ -0,0 +1,145 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+LiveFrameSource class for analyzing unbounded streams such as cameras and RTSP feeds.
+
+A reader thread keeps decoding the source at its own pace and only holds on to
+the latest frame. Consumers always get the freshest frame; frames that were
+overwritten before being consumed are dropped, so inference falling behind
+shows up as drops instead of growing latency.
+
+Attributes:
+    source: The path, URL or camera index being read.
+    fps: Frames per second reported by the source, 30 when it reports none.
+    captured: Number of frames read from the source.
+    delivered: Number of frames handed to the consumer.
+    dropped: Number of frames overwritten before being consumed.
+"""
+
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+class LiveFrameSource:
+    DEFAULT_FPS = 30
+
+    def __init__(self, source, realtime=False, duration=None, latency_window=10000):
+        """
+        Opens a live source and starts reading it in the background.
+
+        Args:
+            source: A path, stream URL, or camera index; digit strings are treated as camera indices.
+            realtime (bool): Whether to pace reading at the source fps, to replay a file like a live stream.
+            duration (float): Number of seconds after which reading stops, unbounded by default.
+            latency_window (int): Number of recent latencies the percentiles are computed on.
+
+        Raises:
+            IOError: If the source cannot be opened.
+        """
+        self.source = int(source) if str(source).isdigit() else source
+        self.realtime = realtime
+        self.duration = duration
+        self._cap = cv2.VideoCapture(self.source)
+        if not self._cap.isOpened():
+            raise IOError("Could not open video")
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or self.DEFAULT_FPS
+        self.captured = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._latest = None
+        self._ended = False
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._in_flight = collections.deque()
+        self._latencies = collections.deque(maxlen=latency_window)
+        self._reader = threading.Thread(target=self._read, name="live-reader", daemon=True)
+        self._reader.start()
+
+    def __iter__(self):
+        """
+        Yields the freshest frame each time the consumer is ready for one.
+
+        Yields:
+            tuple: The index of the frame in the stream and the frame itself.
+        """
+        while True:
+            with self._condition:
+                while self._latest is None and not self._ended:
+                    self._condition.wait()
+                if self._latest is None:
+                    return
+                frame_idx, frame, captured_at = self._latest
+                self._latest = None
+            self.delivered += 1
+            self._in_flight.append(captured_at)
+            yield frame_idx, frame
+
+    def mark_processed(self):
+        """
+        Records the end-to-end latency of the oldest delivered frame that was not yet marked.
+
+        Frames must be marked in the order they were delivered, which every
+        processing path preserves.
+        """
+        captured_at = self._in_flight.popleft()
+        self._latencies.append(time.perf_counter() - captured_at)
+
+    def stop(self):
+        """
+        Stops reading the source and releases it.
+        """
+        self._stop.set()
+        self._reader.join()
+
+    def stats(self):
+        """
+        Summarizes the drops and end-to-end latencies so far.
+
+        Returns:
+            dict: The captured, delivered and dropped frame counts, the drop rate,
+            and the p50, p95 and max latency in milliseconds.
+        """
+        latencies = np.array(self._latencies) * 1000
+        return {
+            "captured": self.captured,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "drop_rate": self.dropped / self.captured if self.captured else 0.0,
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "latency_p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            "latency_max_ms": float(latencies.max()) if len(latencies) else None,
+        }
+
+    def _read(self):
+        """
+        Reads frames into the latest-frame slot until the source ends or reading is stopped.
+        """
+        started_at = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                if self.duration is not None and time.perf_counter() - started_at >= self.duration:
+                    break
+                if self.realtime:
+                    delay = started_at + self.captured / self.fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                ret, frame = self._cap.read()
+                if not ret:
+                    break
+                with self._condition:
+                    if self._latest is not None:
+                        self.dropped += 1
+                    self._latest = (self.captured, frame, time.perf_counter())
+                    self.captured += 1
+                    self._condition.notify()
+        finally:
+            self._cap.release()
+            with self._condition:
+                self._ended = True
+                self._condition.notify_all()
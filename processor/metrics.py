@@ -0,0 +1,241 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+Metrics classes for instrumenting the processing stages.
+
+Metrics records counters, gauges and histograms, keyed by a name and optional
+labels, and exports them as a Prometheus text file or a JSON summary.
+NullMetrics has the same interface and records nothing, so instrumented code
+costs next to nothing when metrics are disabled.
+"""
+
+import bisect
+import json
+import math
+import os
+import threading
+import time
+
+# Upper bounds, in seconds, of the stage duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the queue depth histogram buckets
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+class _Histogram:
+    def __init__(self, buckets):
+        """
+        Initializes an empty histogram.
+
+        Args:
+            buckets (tuple): The sorted upper bounds of the buckets, without +Inf.
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+class _Timer:
+    def __init__(self, metrics, name, labels):
+        self._metrics = metrics
+        self._name = name
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._metrics.observe(self._name, time.perf_counter() - self._start, self._labels)
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+class NullMetrics:
+    """
+    Metrics that record nothing, used when instrumentation is disabled.
+    """
+    enabled = False
+
+    def timer(self, name, labels=None):
+        return _NULL_TIMER
+
+    def observe(self, name, value, labels=None, buckets=DURATION_BUCKETS):
+        pass
+
+    def inc(self, name, value=1, labels=None):
+        pass
+
+    def set(self, name, value, labels=None):
+        pass
+
+class Metrics(NullMetrics):
+    enabled = True
+
+    def __init__(self, prefix="object_detection"):
+        """
+        Initializes an empty metrics registry.
+
+        Args:
+            prefix (str): Prefix of every exported metric name.
+        """
+        self.prefix = prefix
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def timer(self, name, labels=None):
+        """
+        Times a block of code into a histogram.
+
+        Args:
+            name (str): Name of the histogram.
+            labels (dict): Labels of the series.
+
+        Returns:
+            A context manager observing the duration of its block, in seconds.
+        """
+        return _Timer(self, name, labels)
+
+    def observe(self, name, value, labels=None, buckets=DURATION_BUCKETS):
+        """
+        Adds a value to a histogram.
+
+        Args:
+            name (str): Name of the histogram.
+            value (float): The observed value.
+            labels (dict): Labels of the series.
+            buckets (tuple): Upper bounds of the buckets, used when the series is created.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, value=1, labels=None):
+        """
+        Increments a counter.
+
+        Args:
+            name (str): Name of the counter.
+            value (float): The increment.
+            labels (dict): Labels of the series.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        """
+        Sets a gauge.
+
+        Args:
+            name (str): Name of the gauge.
+            value (float): The current value.
+            labels (dict): Labels of the series.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def to_prometheus(self):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        lines = []
+        with self._lock:
+            for kind, series in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted({name for name, _ in series}):
+                    lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+                    for (series_name, labels), value in sorted(series.items()):
+                        if series_name == name:
+                            lines.append(f"{self.prefix}_{name}{self._format_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {self.prefix}_{name} histogram")
+                for (series_name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if series_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (math.inf,), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else repr(float(bound))
+                        lines.append(f"{self.prefix}_{name}_bucket{self._format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{self.prefix}_{name}_sum{self._format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{self.prefix}_{name}_count{self._format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """
+        Summarizes the metrics.
+
+        Returns:
+            dict: The counters and gauges by series, and the count, sum, mean, min and max of every histogram.
+        """
+        with self._lock:
+            return {
+                "counters": {self._series_name(key): value for key, value in sorted(self._counters.items())},
+                "gauges": {self._series_name(key): value for key, value in sorted(self._gauges.items())},
+                "histograms": {
+                    self._series_name(key): {
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "mean": histogram.sum / histogram.count,
+                        "min": histogram.min,
+                        "max": histogram.max,
+                    }
+                    for key, histogram in sorted(self._histograms.items(), key=lambda item: item[0])
+                },
+            }
+
+    def write(self, path):
+        """
+        Writes the metrics to a file, replacing it atomically so scrapers never read a partial file.
+
+        Args:
+            path (str): Path of the file; .json writes the JSON summary, anything else the Prometheus text format.
+        """
+        if os.path.splitext(path)[1].lower() == ".json":
+            content = json.dumps(self.to_dict(), indent=2)
+        else:
+            content = self.to_prometheus()
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+    def _series_name(self, key):
+        name, labels = key
+        return f"{self.prefix}_{name}{self._format_labels(labels)}"
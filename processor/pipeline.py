@@ -0,0 +1,242 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+StagedPipeline class for overlapping decode, inference, drawing and encoding.
+
+Each stage runs on its own thread and hands frames to the next one through a
+bounded queue, so wall-clock time approaches that of the slowest stage rather
+than the sum of all stages. Every stage has a single worker, which keeps the
+frames in their original order.
+
+Attributes:
+    processor: The FrameProcessor whose model, drawer and helpers run the stages.
+    queue_size: Maximum number of items held between two stages.
+"""
+
+import queue
+import threading
+
+from processor.metrics import DEPTH_BUCKETS
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, error):
+        """
+        Wraps an exception raised by a stage so it can be re-raised downstream.
+
+        Args:
+            error (Exception): The exception raised by the stage.
+        """
+        self.error = error
+
+
+class StagedPipeline:
+    STAGES = ("decoded", "analyzed", "drawn")
+
+    def __init__(self, processor, queue_size=8):
+        """
+        Initializes the StagedPipeline with a frame processor.
+
+        Args:
+            processor: The FrameProcessor whose model, drawer and helpers run the stages.
+            queue_size (int): Maximum number of items held between two stages.
+        """
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.processor = processor
+        self.queue_size = queue_size
+        self._queues = {}
+        self._peak_depths = {}
+        self._stop = threading.Event()
+
+    def queue_depths(self):
+        """
+        Returns the number of items currently waiting in front of each stage.
+
+        A queue that stays full points at the stage consuming it as the bottleneck.
+
+        Returns:
+            dict: The current depth of each inter-stage queue.
+        """
+        return {name: q.qsize() for name, q in self._queues.items()}
+
+    def peak_queue_depths(self):
+        """
+        Returns the highest depth observed on each inter-stage queue.
+
+        Returns:
+            dict: The peak depth of each inter-stage queue.
+        """
+        return dict(self._peak_depths)
+
+    def run(self, frames, display_video=False, image_path=None):
+        """
+        Runs the stream through the decode, inference and drawing threads.
+
+        The returned generator is meant to be consumed by the encoder, e.g.
+        FrameProcessor.compile_video, which acts as the final stage. Frames are
+        displayed on the consuming thread since GUI calls are not thread safe.
+
+        Args:
+            frames: An iterable of (frame_idx, frame) pairs.
+            display_video (bool): Whether to display the video with detections.
+            image_path (str): Path to save the images.
+
+        Yields:
+            The frames with the detections drawn on them, in input order.
+        """
+        self._stop.clear()
+        self._queues = {name: queue.Queue(self.queue_size) for name in self.STAGES}
+        self._peak_depths = {name: 0 for name in self.STAGES}
+        decoded, analyzed, drawn = (self._queues[name] for name in self.STAGES)
+
+        workers = [
+            threading.Thread(target=self._decode, args=(frames, decoded), name="decoder", daemon=True),
+            threading.Thread(target=self._analyze, args=(decoded, analyzed), name="inference", daemon=True),
+            threading.Thread(target=self._draw, args=(analyzed, drawn, image_path, display_video), name="drawer",
+                             daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            for frame, preview in self._drain(drawn):
+                self.processor._display_frame(frame if preview is None else preview, display_video)
+                yield frame
+        finally:
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+
+    def _decode(self, frames, output):
+        """
+        Pulls frames from the source stream.
+
+        Args:
+            frames: An iterable of (frame_idx, frame) pairs.
+            output (queue.Queue): The queue feeding the inference stage.
+        """
+        try:
+            for item in frames:
+                if not self._put(output, "decoded", item):
+                    return
+        except Exception as e:
+            self._put(output, "decoded", _StageError(e))
+            return
+        finally:
+            # Runs the cleanup of a generator source, such as releasing its VideoCapture, when stopped early
+            if hasattr(frames, "close"):
+                frames.close()
+        self._put(output, "decoded", _DONE)
+
+    def _analyze(self, source, output):
+        """
+        Runs the model on batches of decoded frames.
+
+        Args:
+            source (queue.Queue): The queue of decoded (frame_idx, frame) pairs.
+            output (queue.Queue): The queue feeding the drawing stage.
+        """
+        try:
+            batch = []
+            for item in self._drain(source):
+                batch.append(item)
+                if len(batch) == self.processor.batch_size:
+                    if not self._forward_batch(batch, output):
+                        return
+                    batch = []
+            if batch and not self._forward_batch(batch, output):
+                return
+        except Exception as e:
+            self._put(output, "analyzed", _StageError(e))
+            return
+        self._put(output, "analyzed", _DONE)
+
+    def _forward_batch(self, batch, output):
+        """
+        Analyzes a batch and hands each frame with its detections downstream.
+
+        Args:
+            batch (list): The (frame_idx, frame) pairs to analyze.
+            output (queue.Queue): The queue feeding the drawing stage.
+
+        Returns:
+            bool: False if the pipeline was stopped.
+        """
+        for item in self.processor._detect_batch(batch):
+            if not self._put(output, "analyzed", item):
+                return False
+        return True
+
+    def _draw(self, source, output, image_path, display_video=False):
+        """
+        Draws the detections on each frame and saves it.
+
+        Args:
+            source (queue.Queue): The queue of analyzed frames.
+            output (queue.Queue): The queue consumed by the encoder.
+            image_path (str): Path to save the images.
+            display_video (bool): Whether the video is displayed, to draw its preview.
+        """
+        try:
+            for frame_idx, frame, labels, boxes in self._drain(source):
+                preview = self.processor._preview_frame(frame, labels, boxes, display_video)
+                frame_with_detections = self.processor._annotate_frame(frame, frame_idx, labels, boxes, image_path)
+                if not self._put(output, "drawn", (frame_with_detections, preview)):
+                    return
+        except Exception as e:
+            self._put(output, "drawn", _StageError(e))
+            return
+        self._put(output, "drawn", _DONE)
+
+    def _put(self, output, name, item):
+        """
+        Puts an item on a queue, giving up if the pipeline is stopped.
+
+        Args:
+            output (queue.Queue): The queue to put the item on.
+            name (str): The name of the queue, used to track its peak depth.
+            item: The item to put.
+
+        Returns:
+            bool: False if the pipeline was stopped before the item was queued.
+        """
+        while not self._stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            depth = output.qsize()
+            self._peak_depths[name] = max(self._peak_depths[name], depth)
+            self.processor.metrics.observe("queue_depth", depth, {"queue": name}, DEPTH_BUCKETS)
+            return True
+        return False
+
+    def _drain(self, source):
+        """
+        Yields items from a queue until the upstream stage is done.
+
+        Args:
+            source (queue.Queue): The queue to read from.
+
+        Yields:
+            The queued items, in order.
+
+        Raises:
+            Exception: Any exception raised by an upstream stage.
+        """
+        while not self._stop.is_set():
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
@@ -0,0 +1,270 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+ShardedVideoProcessor class for processing a single video across several processes.
+
+The video is split into contiguous frame ranges. Each range is processed by a
+worker process with its own model, which writes an annotated segment. The
+segments and detections are then stitched back together in order. Frame
+selection uses the absolute frame index, so shard boundaries neither duplicate
+nor drop frames. With ffmpeg, segments are encoded with the codec of the final
+video and concatenated by copying their streams, so frames are only compressed
+once; otherwise they are written losslessly and encoded when stitched.
+
+Attributes:
+    model_factory: Picklable callable creating the object detection model in each worker.
+    drawer_factory: Picklable callable creating the drawer in each worker.
+    image_writer_factory: Optional picklable callable creating the image writer of each worker.
+    num_workers: Number of worker processes, and of shards.
+    torch_threads: Number of torch intra-op threads per worker.
+    interop_threads: Number of torch inter-op threads per worker.
+    batch_size: Number of frames analyzed per model call in each worker.
+"""
+
+import datetime
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from processor.frame_processor import FrameProcessor
+from processor.sinks import DetectionSink
+from processor.video_writer import FFmpegVideoWriter, concat_videos, find_ffmpeg
+
+
+class ShardedVideoProcessor:
+    def __init__(self, model_factory, drawer_factory, num_workers=2, torch_threads=1, batch_size=1,
+                 image_writer_factory=None, interop_threads=None):
+        """
+        Initializes the ShardedVideoProcessor.
+
+        Args:
+            model_factory: Picklable callable creating the object detection model in each worker.
+            drawer_factory: Picklable callable creating the drawer in each worker.
+            num_workers (int): Number of worker processes, and of shards.
+            torch_threads (int): Number of torch intra-op threads per worker. Keep
+                num_workers * torch_threads at or below the number of cores.
+            batch_size (int): Number of frames analyzed per model call in each worker.
+            image_writer_factory: Optional picklable callable creating, from the image path, the
+                image writer each worker saves its frames with; frames are saved as PNG otherwise.
+            interop_threads (int): Number of torch inter-op threads per worker, torch's default when None.
+        """
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self.model_factory = model_factory
+        self.drawer_factory = drawer_factory
+        self.num_workers = num_workers
+        self.torch_threads = torch_threads
+        self.interop_threads = interop_threads
+        self.batch_size = batch_size
+        self.image_writer_factory = image_writer_factory
+
+    def process_video(self, video_path, frame_rate=1, store_video_path=None, image_path=None, sampling="read",
+                      detection_sink=None):
+        """
+        Processes a video across the worker processes and stitches the results.
+
+        Args:
+            video_path (str): Path to the input video file.
+            frame_rate (int): Frame extraction rate in milliseconds.
+            store_video_path (str): Path to save the video.
+            image_path (str): Path to save the images.
+            sampling (str): How skipped frames are stepped over, see FrameProcessor.stream_frames.
+            detection_sink (DetectionSink): Optional sink the detection records of every shard are
+                written to, in frame order, once all shards are done.
+
+        Returns:
+            tuple: The output video paths, as returned by FrameProcessor.compile_video,
+                and a list of (frame_idx, labels, boxes) for every sampled frame, in order.
+
+        Raises:
+            IOError: If the video file cannot be opened.
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError("Could not open video")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        ffmpeg = find_ffmpeg() if store_video_path is not None else None
+        segment_dir = tempfile.mkdtemp(prefix="shards_")
+        try:
+            tasks = [
+                (shard_idx, video_path, frame_rate, sampling, start_frame, end_frame,
+                 segment_dir if store_video_path is not None else None, ffmpeg is not None, image_path,
+                 self.model_factory, self.drawer_factory, self.image_writer_factory, self.torch_threads,
+                 self.interop_threads, self.batch_size, detection_sink is not None)
+                for shard_idx, (start_frame, end_frame) in enumerate(self.split_frame_ranges(frame_count, self.num_workers))
+            ]
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=len(tasks), mp_context=context) as executor:
+                shards = list(executor.map(_process_shard, tasks))
+
+            detections = [detection for _, detections, _ in shards for detection in detections]
+            segment_paths = [segment_path for segment_path, _, _ in shards if segment_path is not None]
+            if detection_sink is not None:
+                for _, _, records in shards:
+                    for record in records:
+                        detection_sink.write(record)
+
+            if ffmpeg is not None:
+                output_paths = self._concat_segments(segment_paths, store_video_path, fps, len(detections),
+                                                     video_path, ffmpeg)
+            else:
+                # Stitching goes through FrameProcessor.compile_video so the output is named
+                # and muxed with the audio exactly as in the single-process path
+                processor = FrameProcessor(None, None)
+                audio = processor._load_audio(video_path) if store_video_path is not None else None
+                output_paths = processor.compile_video(self._read_segments(segment_paths), store_video_path, fps, audio)
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+        return output_paths, detections
+
+    @staticmethod
+    def split_frame_ranges(frame_count, num_shards):
+        """
+        Splits the frames of a video into contiguous, non-overlapping ranges.
+
+        The last range is open-ended so frames beyond an underestimated frame
+        count are still processed.
+
+        Args:
+            frame_count (int): Number of frames in the video.
+            num_shards (int): Number of ranges to split into.
+
+        Returns:
+            list: A (start_frame, end_frame) tuple per non-empty range, end_frame being exclusive.
+        """
+        num_shards = max(1, min(num_shards, frame_count))
+        bounds = [frame_count * shard_idx // num_shards for shard_idx in range(num_shards + 1)]
+        ranges = list(zip(bounds[:-1], bounds[1:]))
+        ranges[-1] = (ranges[-1][0], None)
+        return ranges
+
+    @staticmethod
+    def _concat_segments(segment_paths, store_video_path, fps, frame_count, audio_source, ffmpeg):
+        """
+        Joins the segments into the final video with the source audio, without encoding them again.
+
+        Args:
+            segment_paths (list): Paths of the segments, in shard order.
+            store_video_path (str): Path to save the video.
+            fps (float): Frames per second of the segments.
+            frame_count (int): Number of frames in all segments, which sets the length of the video.
+            audio_source (str): Path of the file whose audio stream is copied into the video.
+            ffmpeg (str): Path of the ffmpeg executable.
+
+        Returns:
+            tuple: The output video paths, as returned by FrameProcessor.compile_video.
+        """
+        if not segment_paths:
+            return None, None
+        # Named like the single-pass output of FrameProcessor.compile_video
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_video_path = os.path.join(store_video_path, f"detected_frames_with_audio{timestamp}.mp4")
+        concat_videos(segment_paths, output_video_path, audio_source, frame_count / fps if fps else None, ffmpeg)
+        print(f"Video with audio saved to: {output_video_path}")
+        return output_video_path, output_video_path
+
+    @staticmethod
+    def _read_segments(segment_paths):
+        """
+        Yields the frames of the shard segments, one segment after the other.
+
+        Args:
+            segment_paths (list): Paths of the segments, in shard order.
+
+        Yields:
+            The frames of every segment, in order.
+        """
+        for segment_path in segment_paths:
+            cap = cv2.VideoCapture(segment_path)
+            try:
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    yield frame
+            finally:
+                cap.release()
+
+
+def _process_shard(task):
+    """
+    Processes one frame range of a video in a worker process.
+
+    Args:
+        task (tuple): The shard index, video path, frame rate, sampling mode, frame range,
+            segment directory, whether to encode the segment with ffmpeg, image path, model, drawer
+            and image writer factories, torch intra-op and inter-op thread counts, batch size and
+            whether to record the detection records.
+
+    Returns:
+        tuple: The path of the annotated segment, or None when no video is stored, a list of
+            (frame_idx, labels, boxes) for every sampled frame of the range, and the detection
+            records of those frames, empty unless requested.
+    """
+    (shard_idx, video_path, frame_rate, sampling, start_frame, end_frame,
+     segment_dir, use_ffmpeg, image_path, model_factory, drawer_factory, image_writer_factory, torch_threads,
+     interop_threads, batch_size, record_detections) = task
+
+    from config.inference_config import InferenceConfig
+    InferenceConfig(torch_threads, interop_threads).apply()
+
+    records = _RecordingSink()
+    image_writer = None
+    if image_writer_factory is not None and image_path is not None:
+        image_writer = image_writer_factory(image_path)
+    processor = FrameProcessor(model_factory(), drawer_factory(), batch_size, image_writer=image_writer,
+                               detection_sink=records if record_detections else None)
+    fps, frames = processor.stream_frames(video_path, frame_rate, sampling, start_frame, end_frame)
+
+    segment_path = None
+    video_writer = None
+    detections = []
+    try:
+        for frame_idx, frame, labels, boxes in processor.detect_frames(frames):
+            detections.append((frame_idx, labels, boxes))
+            if segment_dir is None and image_path is None:
+                continue
+            frame_with_detections = processor._annotate_frame(frame, frame_idx, labels, boxes, image_path)
+            if segment_dir is None:
+                continue
+            if video_writer is None:
+                h, w, _ = frame_with_detections.shape
+                if use_ffmpeg:
+                    # Encoded like the final video, so the segments are joined without encoding them again
+                    segment_path = os.path.join(segment_dir, f"segment_{shard_idx:04d}.mp4")
+                    video_writer = FFmpegVideoWriter(segment_path, fps, (w, h))
+                else:
+                    # Lossless, so the frames are only compressed once, when the segments are stitched
+                    segment_path = os.path.join(segment_dir, f"segment_{shard_idx:04d}.avi")
+                    video_writer = cv2.VideoWriter(segment_path, cv2.VideoWriter_fourcc(*'FFV1'), fps, (w, h))
+            video_writer.write(frame_with_detections)
+    finally:
+        if video_writer is not None:
+            video_writer.release()
+        if image_writer is not None:
+            image_writer.close()
+    return segment_path, detections, records.records
+
+
+class _RecordingSink(DetectionSink):
+    def __init__(self):
+        """
+        Keeps the detection records of a shard in memory, to send them back to the parent process.
+        """
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
@@ -0,0 +1,130 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+Detection sinks for streaming structured detections out of the FrameProcessor.
+
+Every analyzed frame produces one record:
+
+- frame_idx: the index of the frame in the video.
+- timestamp_ms: the position of the frame on the video clock.
+- labels: the label ID of every detection.
+- names: the label name of every detection.
+- scores: the confidence of every detection, NaN (null in JSON Lines) when it is unknown.
+- boxes: the pixel (x1, y1, x2, y2) corners of every detection.
+- track_ids: the persistent track ID of every detection, None without a tracker.
+"""
+
+import json
+import math
+import os
+from abc import ABC, abstractmethod
+
+def open_detection_sink(path):
+    """
+    Opens the sink matching the extension of a path.
+
+    Args:
+        path (str): Path of the output file; .parquet selects Parquet, anything else JSON Lines.
+
+    Returns:
+        DetectionSink: The opened sink.
+    """
+    if os.path.splitext(path)[1].lower() == ".parquet":
+        return ParquetDetectionSink(path)
+    return JsonlDetectionSink(path)
+
+class DetectionSink(ABC):
+    @abstractmethod
+    def write(self, record):
+        """
+        Writes the detections of a frame.
+
+        Args:
+            record (dict): The detection record of the frame.
+        """
+        pass
+
+    @abstractmethod
+    def close(self):
+        """
+        Flushes the pending records and closes the output.
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class JsonlDetectionSink(DetectionSink):
+    def __init__(self, path):
+        """
+        Opens a JSON Lines file, written one record per line.
+
+        Args:
+            path (str): Path of the output file.
+        """
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, record):
+        # NaN is not valid JSON, so unknown scores are written as null
+        scores = [None if score is None or math.isnan(score) else score for score in record["scores"]]
+        self._file.write(json.dumps({**record, "scores": scores}) + "\n")
+
+    def close(self):
+        self._file.close()
+
+class ParquetDetectionSink(DetectionSink):
+    def __init__(self, path, batch_size=1024):
+        """
+        Opens a Parquet file, written one row group per batch of records.
+
+        Args:
+            path (str): Path of the output file.
+            batch_size (int): Number of records buffered per row group.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow")
+
+        self.path = path
+        self.batch_size = batch_size
+        self._pa = pa
+        self._schema = pa.schema([
+            ("frame_idx", pa.int64()),
+            ("timestamp_ms", pa.float64()),
+            ("labels", pa.list_(pa.int64())),
+            ("names", pa.list_(pa.string())),
+            ("scores", pa.list_(pa.float32())),
+            ("boxes", pa.list_(pa.list_(pa.int64(), 4))),
+            ("track_ids", pa.list_(pa.int64())),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._rows = []
+
+    def write(self, record):
+        self._rows.append(record)
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+    def _flush(self):
+        """
+        Writes the buffered records as one row group.
+        """
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
@@ -0,0 +1,189 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+IoUTracker class for giving detections persistent IDs and carrying them across frames.
+
+Detections are associated with tracks by greedy IoU matching between boxes of
+the same label. Every track follows a constant-velocity model smoothed as an
+alpha-beta filter, which is enough to propagate boxes over the frames that are
+not sent to the model.
+
+Attributes:
+    iou_threshold: Minimum IoU between a detection and a predicted track box to match them.
+    max_misses: Number of consecutive analyzed frames a track may go unmatched before it is dropped.
+    smoothing: Weight of the latest observed velocity against the previous estimate.
+"""
+
+import numpy as np
+
+def box_iou(boxes1, boxes2):
+    """
+    Computes the pairwise IoU of two sets of (cx, cy, w, h) boxes.
+
+    Args:
+        boxes1: An (N, 4) array of boxes.
+        boxes2: An (M, 4) array of boxes.
+
+    Returns:
+        np.ndarray: The (N, M) IoU matrix.
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+    corners1 = np.concatenate([boxes1[:, :2] - boxes1[:, 2:] / 2, boxes1[:, :2] + boxes1[:, 2:] / 2], axis=1)
+    corners2 = np.concatenate([boxes2[:, :2] - boxes2[:, 2:] / 2, boxes2[:, :2] + boxes2[:, 2:] / 2], axis=1)
+    top_left = np.maximum(corners1[:, None, :2], corners2[None, :, :2])
+    bottom_right = np.minimum(corners1[:, None, 2:], corners2[None, :, 2:])
+    intersection = np.clip(bottom_right - top_left, 0, None).prod(axis=-1)
+    areas1 = boxes1[:, 2] * boxes1[:, 3]
+    areas2 = boxes2[:, 2] * boxes2[:, 3]
+    union = areas1[:, None] + areas2[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+class _Track:
+    def __init__(self, track_id, label, box, score, frame_idx):
+        """
+        Starts a track at a detection.
+
+        Args:
+            track_id (int): The persistent ID of the track.
+            label (int): The label of the tracked object.
+            box (np.ndarray): The (cx, cy, w, h) box of the detection.
+            score (float): The confidence of the detection.
+            frame_idx (int): The index of the frame of the detection.
+        """
+        self.track_id = track_id
+        self.label = label
+        self.box = box
+        self.velocity = np.zeros(4)
+        self.score = score
+        self.frame_idx = frame_idx
+        self.misses = 0
+
+    def predict(self, frame_idx):
+        """
+        Extrapolates the box of the track to a frame.
+
+        Args:
+            frame_idx (int): The index of the frame.
+
+        Returns:
+            np.ndarray: The predicted (cx, cy, w, h) box.
+        """
+        box = self.box + self.velocity * (frame_idx - self.frame_idx)
+        box[2:] = np.maximum(box[2:], 0)
+        return box
+
+    def correct(self, box, score, frame_idx, smoothing):
+        """
+        Moves the track to a matched detection and updates its velocity.
+
+        Args:
+            box (np.ndarray): The (cx, cy, w, h) box of the detection.
+            score (float): The confidence of the detection.
+            frame_idx (int): The index of the frame of the detection.
+            smoothing (float): Weight of the observed velocity against the previous estimate.
+        """
+        elapsed = frame_idx - self.frame_idx
+        if elapsed > 0:
+            observed = (box - self.box) / elapsed
+            self.velocity = smoothing * observed + (1 - smoothing) * self.velocity
+        self.box = box
+        self.score = score
+        self.frame_idx = frame_idx
+        self.misses = 0
+
+class IoUTracker:
+    def __init__(self, iou_threshold=0.3, max_misses=2, smoothing=0.5):
+        """
+        Initializes the IoUTracker.
+
+        Args:
+            iou_threshold (float): Minimum IoU between a detection and a predicted track box to match them.
+            max_misses (int): Number of consecutive analyzed frames a track may go unmatched before it is dropped.
+            smoothing (float): Weight of the latest observed velocity against the previous estimate.
+        """
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.smoothing = smoothing
+        self._tracks = []
+        self._next_id = 1
+
+    def update(self, frame_idx, labels, boxes, scores=None):
+        """
+        Associates the detections of an analyzed frame with the tracks.
+
+        Matched tracks follow their detection, unmatched detections start new
+        tracks, and tracks unmatched for more than max_misses frames are dropped.
+
+        Args:
+            frame_idx (int): The index of the frame.
+            labels: The labels of the detected objects.
+            boxes: The normalized (cx, cy, w, h) boxes of the detected objects.
+            scores: The confidence of the detected objects, if known.
+
+        Returns:
+            tuple: The labels, boxes and scores of the detections, and the track ID of each.
+        """
+        labels = [int(label) for label in labels]
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        scores = np.full(len(labels), np.nan) if scores is None else np.asarray(scores, dtype=np.float64)
+
+        predicted = np.array([track.predict(frame_idx) for track in self._tracks]).reshape(-1, 4)
+        iou = box_iou(boxes, predicted)
+        track_labels = np.array([track.label for track in self._tracks], dtype=np.int64)
+        iou[np.array(labels, dtype=np.int64)[:, None] != track_labels[None, :]] = 0
+
+        track_ids = [None] * len(labels)
+        matched_tracks = set()
+        for det_idx, track_idx in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+            if iou[det_idx, track_idx] < self.iou_threshold:
+                break
+            if track_ids[det_idx] is not None or track_idx in matched_tracks:
+                continue
+            track = self._tracks[track_idx]
+            track.correct(boxes[det_idx], scores[det_idx], frame_idx, self.smoothing)
+            track_ids[det_idx] = track.track_id
+            matched_tracks.add(track_idx)
+
+        tracks = []
+        for track_idx, track in enumerate(self._tracks):
+            if track_idx not in matched_tracks:
+                track.misses += 1
+            if track.misses <= self.max_misses:
+                tracks.append(track)
+        for det_idx, track_id in enumerate(track_ids):
+            if track_id is None:
+                tracks.append(_Track(self._next_id, labels[det_idx], boxes[det_idx], scores[det_idx], frame_idx))
+                track_ids[det_idx] = self._next_id
+                self._next_id += 1
+        self._tracks = tracks
+        return labels, boxes, scores, track_ids
+
+    def predict(self, frame_idx):
+        """
+        Propagates the tracks to a frame that was not analyzed.
+
+        Only tracks matched on the last analyzed frame are reported.
+
+        Args:
+            frame_idx (int): The index of the frame.
+
+        Returns:
+            tuple: The labels, predicted boxes and last scores of the tracks, and their track IDs.
+        """
+        tracks = [track for track in self._tracks if track.misses == 0]
+        return (
+            [track.label for track in tracks],
+            np.array([track.predict(frame_idx) for track in tracks]).reshape(-1, 4),
+            np.array([track.score for track in tracks], dtype=np.float64),
+            [track.track_id for track in tracks],
+        )
+
+    def reset(self):
+        """
+        Drops every track, as FrameProcessor does when its change detector reports a scene cut.
+        """
+        self._tracks = []
@@ -0,0 +1,225 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+"""
+FFmpegVideoWriter class for encoding frames and muxing audio in a single pass.
+
+Frames are piped raw into one ffmpeg process, which encodes them and copies the
+audio stream of the source video through without transcoding it, when its codec
+can be stored in an mp4 container, or encodes it to AAC otherwise. The frames
+set the length of the video: audio shorter than them ends early, and audio
+longer than them is cut with a stream-copy remux once they are all written.
+It mirrors the write/release interface of cv2.VideoWriter. concat_videos joins
+videos written with the same settings, such as the segments of a sharded run,
+without encoding them again.
+
+Attributes:
+    output_path: Path of the video to write.
+    process: The ffmpeg subprocess frames are piped into.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+# Audio codecs an mp4 container can store, which are copied without transcoding
+MP4_AUDIO_CODECS = ("aac", "mp3", "alac")
+
+def find_ffmpeg():
+    """
+    Locates an ffmpeg executable, preferring the one on the PATH.
+
+    Falls back to the binary bundled with imageio-ffmpeg, which moviepy depends on.
+
+    Returns:
+        str: The path of the ffmpeg executable, or None if none is available.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is not None:
+        return ffmpeg
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return None
+
+def probe_audio(source, ffmpeg=None):
+    """
+    Finds the codec of the first audio stream of a file and the duration of the file.
+
+    Parses the listing ffmpeg prints for its input, as ffprobe is not bundled
+    with imageio-ffmpeg.
+
+    Args:
+        source (str): Path of the file.
+        ffmpeg (str): Path of the ffmpeg executable, located with find_ffmpeg by default.
+
+    Returns:
+        tuple: The codec name, or None if the file has no audio stream, and the duration
+        in seconds, or None if it is unknown.
+    """
+    ffmpeg = ffmpeg or find_ffmpeg()
+    result = subprocess.run([ffmpeg, "-hide_banner", "-i", source], capture_output=True, text=True, errors="replace")
+    codec = re.search(r"Stream #\S+.*?: Audio: (\w+)", result.stderr)
+    duration = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr)
+    if duration is not None:
+        hours, minutes, seconds = duration.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    return codec.group(1) if codec else None, duration
+
+def probe_audio_codec(source, ffmpeg=None):
+    """
+    Finds the codec of the first audio stream of a file.
+
+    Args:
+        source (str): Path of the file.
+        ffmpeg (str): Path of the ffmpeg executable, located with find_ffmpeg by default.
+
+    Returns:
+        str: The codec name, or None if the file has no audio stream.
+    """
+    return probe_audio(source, ffmpeg)[0]
+
+def concat_videos(video_paths, output_path, audio_source=None, duration=None, ffmpeg=None):
+    """
+    Joins videos encoded with the same settings into one, copying their streams.
+
+    Args:
+        video_paths (list): Paths of the videos, in order.
+        output_path (str): Path of the video to write.
+        audio_source (str): Path of a file whose audio stream is added to the video, if any.
+        duration (float): Length the output is cut to, in seconds, so longer audio does not extend it.
+        ffmpeg (str): Path of the ffmpeg executable, located with find_ffmpeg by default.
+
+    Raises:
+        RuntimeError: If ffmpeg failed to write the video.
+    """
+    ffmpeg = ffmpeg or find_ffmpeg()
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        for video_path in video_paths:
+            escaped = os.path.abspath(video_path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_path = f.name
+    command = [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_source is not None:
+        audio_codec = probe_audio_codec(audio_source, ffmpeg)
+        command += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?",
+                    "-c:a", "copy" if audio_codec in MP4_AUDIO_CODECS else "aac"]
+    command += ["-c:v", "copy"]
+    if duration is not None:
+        command += ["-t", f"{duration:.6f}"]
+    try:
+        result = subprocess.run(command + [output_path], capture_output=True)
+    finally:
+        os.remove(list_path)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to write {output_path}: {result.stderr.decode(errors='replace').strip()}")
+
+class FFmpegVideoWriter:
+    def __init__(self, output_path, fps, frame_size, audio_source=None, ffmpeg=None):
+        """
+        Starts an ffmpeg process encoding frames into a video.
+
+        Args:
+            output_path (str): Path of the video to write.
+            fps (float): Frames per second of the video.
+            frame_size (tuple): The (width, height) of the frames.
+            audio_source (str): Path of a file whose audio stream, if any, is added to the video,
+                copied when the mp4 container supports its codec and encoded to AAC otherwise.
+            ffmpeg (str): Path of the ffmpeg executable, located with find_ffmpeg by default.
+
+        Raises:
+            RuntimeError: If no ffmpeg executable is available.
+        """
+        ffmpeg = ffmpeg or find_ffmpeg()
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg is not available")
+        self.output_path = output_path
+        self.fps = fps
+        self.frames = 0
+        self._ffmpeg = ffmpeg
+        self._frame_bytes = frame_size[0] * frame_size[1] * 3
+        self._audio_duration = None
+        self._encode_path = output_path
+
+        command = [
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{frame_size[0]}x{frame_size[1]}", "-r", str(fps), "-i", "pipe:0",
+        ]
+        if audio_source is not None:
+            audio_codec, self._audio_duration = probe_audio(audio_source, ffmpeg)
+            # The frame count is only known once every frame is written, so longer audio is cut afterwards
+            root, ext = os.path.splitext(output_path)
+            self._encode_path = f"{root}.partial{ext}"
+            # The trailing "?" keeps sources without an audio stream working
+            command += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?",
+                        "-c:a", "copy" if audio_codec in MP4_AUDIO_CODECS else "aac"]
+        command += ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", self._encode_path]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, frame):
+        """
+        Pipes a BGR frame into the encoder.
+
+        Args:
+            frame: The frame to write, matching the frame size of the writer.
+
+        Raises:
+            RuntimeError: If ffmpeg exited before reading the frame.
+        """
+        data = frame.tobytes()
+        if len(data) != self._frame_bytes:
+            raise ValueError("Frame size does not match the size of the video")
+        try:
+            self.process.stdin.write(data)
+        except BrokenPipeError:
+            self._fail()
+        self.frames += 1
+
+    def release(self):
+        """
+        Flushes the encoder and waits for ffmpeg to finish writing the video.
+
+        Raises:
+            RuntimeError: If ffmpeg failed to write the video.
+        """
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        stderr = self.process.stderr.read()
+        if self.process.wait() != 0:
+            self._fail(stderr)
+        if self._encode_path == self.output_path:
+            return
+        duration = self.frames / self.fps if self.fps else None
+        if self._audio_duration is None or duration is None or self._audio_duration <= duration:
+            os.replace(self._encode_path, self.output_path)
+            return
+        try:
+            result = subprocess.run([self._ffmpeg, "-y", "-loglevel", "error", "-i", self._encode_path, "-map", "0",
+                                     "-c", "copy", "-t", f"{duration:.6f}", self.output_path], capture_output=True)
+        finally:
+            os.remove(self._encode_path)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to write {self.output_path}: "
+                               f"{result.stderr.decode(errors='replace').strip()}")
+
+    def _fail(self, stderr=None):
+        """
+        Raises the error ffmpeg reported after exiting.
+
+        Args:
+            stderr (bytes): What ffmpeg wrote to stderr, read from the process when None.
+
+        Raises:
+            RuntimeError: Always.
+        """
+        if stderr is None:
+            stderr = self.process.stderr.read()
+            self.process.wait()
+        raise RuntimeError(f"ffmpeg failed to write {self.output_path}: {stderr.decode(errors='replace').strip()}")
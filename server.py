@@ -0,0 +1,77 @@
+# Copyright (c) 2024 Kinn Coelho Juliao <kinncj@gmail.com>
+# All rights reserved.
+#
+# This software is licensed under the terms of the MIT License.
+# See the LICENSE file in the project root for license terms.
+import argparse
+
+from config.config import INFERENCE_CONFIG_PATH, MODEL_CACHE_DIR
+from detection.optimized_model import OptimizedDETRModel
+from main import build_model_factory, load_inference_config
+from processor.inference_server import DynamicBatcher, InferenceServer
+
+def main(host="127.0.0.1", port=8000, max_batch_size=8, max_wait_ms=10, torch_threads=None, backend="eager",
+         quantize=False, input_size=(800, 800), model_cache_dir=MODEL_CACHE_DIR, roi=None, tiles=(1, 1), tile_overlap=0.2,
+         log_requests=False, inference_config_path=None):
+    """
+    Loads the model once and serves detections over HTTP until interrupted.
+
+    Args:
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+        max_batch_size (int): Maximum number of frames, across all requests, analyzed per model call.
+        max_wait_ms (float): Maximum time the first frame of a batch waits for more frames.
+        torch_threads (int): Number of torch intra-op threads.
+        backend (str): Inference backend, see main.main.
+        quantize (bool): Whether to apply dynamic int8 quantization to the backend.
+        input_size (tuple): Fixed (height, width) input size of the exported backends.
+        model_cache_dir (str): Local serialized model cache directory, or None to disable it.
+        roi (tuple): The (x, y, width, height) region of the frames to analyze, in pixels.
+        tiles (tuple): The number of (rows, columns) the region is split into.
+        tile_overlap (float): Fraction of a tile shared with its neighbours.
+        log_requests (bool): Whether to log every request to stderr.
+        inference_config_path (str): Path of the saved inference settings, ignored when the file does not exist.
+    """
+    inference_config = load_inference_config(inference_config_path, intra_op_threads=torch_threads)
+    inference_config.apply()
+    model = build_model_factory(backend, quantize, input_size, model_cache_dir, roi, tiles, tile_overlap,
+                                inference_config)()
+    batcher = DynamicBatcher(model, max_batch_size, max_wait_ms)
+    server = InferenceServer(batcher, host, port, log_requests)
+    print(f"Serving detections on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        print(f"Stats: {batcher.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Object Detection Service")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on.")
+    parser.add_argument("--max_batch_size", type=int, default=8, help="Frames analyzed per model call, at most.")
+    parser.add_argument("--max_wait_ms", type=float, default=10, help="Time a batch waits to fill, at most.")
+    parser.add_argument("--torch_threads", type=int, default=None, help="Torch threads.")
+    parser.add_argument("--backend", type=str, default="eager", choices=("eager",) + OptimizedDETRModel.BACKENDS,
+                        help="Inference backend.")
+    parser.add_argument("--quantize", action="store_true", help="Apply dynamic int8 quantization to the backend.")
+    parser.add_argument("--input_size", type=int, nargs=2, default=(800, 800), metavar=("HEIGHT", "WIDTH"),
+                        help="Fixed input size of the exported backends.")
+    parser.add_argument("--model_cache_dir", type=str, default=MODEL_CACHE_DIR,
+                        help="Local serialized model cache directory, empty to disable.")
+    parser.add_argument("--roi", type=int, nargs=4, default=None, metavar=("X", "Y", "WIDTH", "HEIGHT"),
+                        help="Region of the frames to analyze, in pixels.")
+    parser.add_argument("--tiles", type=int, nargs=2, default=(1, 1), metavar=("ROWS", "COLUMNS"),
+                        help="Split the region into overlapping tiles analyzed as one batch.")
+    parser.add_argument("--tile_overlap", type=float, default=0.2, help="Fraction of a tile shared with its neighbours.")
+    parser.add_argument("--log_requests", action="store_true", help="Log every request.")
+    parser.add_argument("--inference_config", type=str, default=INFERENCE_CONFIG_PATH,
+                        help="Saved inference settings, such as written by autotune; empty to disable.")
+    args = parser.parse_args()
+
+    main(args.host, args.port, args.max_batch_size, args.max_wait_ms, args.torch_threads, args.backend, args.quantize,
+         tuple(args.input_size), args.model_cache_dir or None, args.roi, tuple(args.tiles), args.tile_overlap,
+         args.log_requests, args.inference_config or None)
@@ -0,0 +1,15 @@
+import torch
+from transformers import DetrConfig, DetrForObjectDetection, ResNetConfig
+
+def tiny_detr():
+    """Builds a small randomly initialized DETR, so the tests need no network."""
+    torch.manual_seed(0)
+    backbone_config = ResNetConfig(embedding_size=8, hidden_sizes=[8, 16, 16, 32], depths=[1, 1, 1, 1], out_features=["stage4"])
+    config = DetrConfig(use_timm_backbone=False, backbone_config=backbone_config, use_pretrained_backbone=False,
+                        num_queries=10, d_model=32, encoder_layers=1, decoder_layers=1, encoder_attention_heads=2,
+                        decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32, num_labels=91)
+    model = DetrForObjectDetection(config).eval()
+    # Favour two restricted classes so the random model yields detections to compare
+    with torch.no_grad():
+        model.class_labels_classifier.bias[[1, 77]] += 5
+    return model
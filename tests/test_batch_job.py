@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import cv2
+import numpy as np
+from processor.batch_job import BatchJob
+
+class StubModel:
+    model_id = "stub"
+    id2label = {1: "person"}
+
+    def analyze_frames(self, frames, return_scores=False):
+        detection = ([1], np.array([[0.5, 0.5, 0.2, 0.2]]), np.array([0.9]))
+        return [detection if return_scores else detection[:2] for _ in frames]
+
+class CrashingStubModel(StubModel):
+    def analyze_frames(self, frames, return_scores=False):
+        # White frames kill the worker process, as running out of memory would
+        if frames[0].mean() > 250:
+            os._exit(1)
+        return super().analyze_frames(frames, return_scores)
+
+def write_video(path, frame_count=10, value=None):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 48))
+    for idx in range(frame_count):
+        writer.write(np.full((48, 64, 3), idx * 5 if value is None else value, dtype=np.uint8))
+    writer.release()
+
+def read_summary(output_dir):
+    with open(os.path.join(output_dir, BatchJob.SUMMARY_FILE)) as f:
+        return [json.loads(line) for line in f]
+
+class TestBatchJob(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+        self.video_dir = os.path.join(self.tmp_dir, "videos")
+        os.makedirs(os.path.join(self.video_dir, "nested"))
+        self.video_paths = [os.path.join(self.video_dir, "a.mp4"), os.path.join(self.video_dir, "nested", "b.mp4")]
+        for path in self.video_paths:
+            write_video(path)
+        self.output_dir = os.path.join(self.tmp_dir, "output")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_discovers_videos_in_directories_recursively(self):
+        open(os.path.join(self.video_dir, "notes.txt"), "w").close()
+
+        self.assertEqual(BatchJob.discover(self.video_dir), self.video_paths)
+
+    def test_discovers_videos_in_manifests(self):
+        manifest_path = os.path.join(self.tmp_dir, "manifest.txt")
+        with open(manifest_path, "w") as f:
+            f.write("# clips\nvideos/nested/b.mp4\n\nvideos/a.mp4\n")
+
+        self.assertEqual(BatchJob.discover(manifest_path), self.video_paths[::-1])
+
+    def test_summarizes_every_clip(self):
+        job = BatchJob(StubModel, self.output_dir)
+        summaries = job.run(self.video_paths)
+
+        self.assertEqual([summary["status"] for summary in summaries], ["ok", "ok"])
+        self.assertEqual(summaries[0]["frames"], 10)
+        self.assertEqual(summaries[0]["detections_by_label"], {"person": 10})
+        self.assertEqual(read_summary(self.output_dir), summaries)
+        with open(summaries[0]["detections_path"]) as f:
+            self.assertEqual(len(f.readlines()), 10)
+
+    def test_resumes_after_the_clips_already_done(self):
+        BatchJob(StubModel, self.output_dir).run(self.video_paths[:1])
+        with open(os.path.join(self.output_dir, BatchJob.SUMMARY_FILE), "a") as f:
+            f.write('{"video_path": "trunc')
+
+        summaries = BatchJob(StubModel, self.output_dir).run(self.video_paths)
+
+        self.assertEqual([summary["video_path"] for summary in summaries], [self.video_paths[1]])
+
+    def test_records_failing_clips_for_retry(self):
+        missing_path = os.path.join(self.video_dir, "missing.mp4")
+        job = BatchJob(StubModel, self.output_dir)
+        summaries = job.run([missing_path])
+
+        self.assertEqual(summaries[0]["status"], "error")
+        self.assertNotIn(missing_path, job.completed())
+
+    @patch('config.inference_config.torch')
+    def test_applies_thread_settings_in_a_single_process(self, mock_torch):
+        BatchJob(StubModel, self.output_dir, torch_threads=3, interop_threads=2).run(self.video_paths[:1])
+
+        mock_torch.set_num_threads.assert_called_once_with(3)
+        mock_torch.set_num_interop_threads.assert_called_once_with(2)
+
+    def test_schedules_clips_across_workers(self):
+        summaries = BatchJob(StubModel, self.output_dir, num_workers=2, torch_threads=1).run(self.video_paths)
+
+        self.assertEqual(sorted(summary["video_path"] for summary in summaries), self.video_paths)
+        self.assertTrue(all(summary["frames"] == 10 for summary in summaries))
+
+    def test_records_clips_of_dead_workers_and_continues(self):
+        crash_path = os.path.join(self.video_dir, "crash.mp4")
+        write_video(crash_path, value=255)
+        summaries = BatchJob(CrashingStubModel, self.output_dir, num_workers=2, torch_threads=1).run(
+            [crash_path] + self.video_paths)
+
+        by_path = {summary["video_path"]: summary for summary in summaries}
+        self.assertEqual(sorted(by_path), sorted([crash_path] + self.video_paths))
+        self.assertEqual(by_path[crash_path]["status"], "error")
+        self.assertIn("BrokenProcessPool", by_path[crash_path]["error"])
+        self.assertEqual(read_summary(self.output_dir), summaries)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+from processor.change_detector import FrameChangeDetector
+
+class TestFrameChangeDetector(unittest.TestCase):
+    def test_first_frame_has_changed(self):
+        detector = FrameChangeDetector(threshold=2.0)
+
+        self.assertTrue(detector.has_changed(np.zeros((480, 640, 3), dtype=np.uint8)))
+
+    def test_static_frames_have_not_changed(self):
+        detector = FrameChangeDetector(threshold=2.0)
+        frame = np.full((480, 640, 3), 100, dtype=np.uint8)
+        detector.has_changed(frame)
+
+        self.assertFalse(detector.has_changed(frame.copy()))
+        self.assertFalse(detector.has_changed(frame + 1))
+
+    def test_detects_changes_beyond_threshold(self):
+        detector = FrameChangeDetector(threshold=2.0)
+        frame = np.full((480, 640, 3), 100, dtype=np.uint8)
+        detector.has_changed(frame)
+        changed = frame.copy()
+        changed[:240] = 255
+
+        self.assertTrue(detector.has_changed(changed))
+
+    def test_slow_drift_adds_up_to_a_change(self):
+        detector = FrameChangeDetector(threshold=2.0)
+        detector.has_changed(np.full((48, 64, 3), 100, dtype=np.uint8))
+
+        results = [detector.has_changed(np.full((48, 64, 3), 100 + step, dtype=np.uint8)) for step in range(1, 5)]
+
+        self.assertEqual(results, [False, False, True, False])
+
+    def test_reports_scene_cuts(self):
+        detector = FrameChangeDetector(threshold=2.0, cut_threshold=30.0)
+        detector.has_changed(np.full((48, 64, 3), 50, dtype=np.uint8))
+
+        detector.has_changed(np.full((48, 64, 3), 60, dtype=np.uint8))
+        self.assertFalse(detector.scene_cut)
+        detector.has_changed(np.full((48, 64, 3), 200, dtype=np.uint8))
+        self.assertTrue(detector.scene_cut)
+
+    def test_reset_forgets_reference(self):
+        detector = FrameChangeDetector()
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        detector.has_changed(frame)
+        detector.reset()
+
+        self.assertTrue(detector.has_changed(frame))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+from processor.detection_cache import DetectionCache
+from processor.frame_processor import FrameProcessor
+
+def analyze_frames(frames, return_scores=False):
+    detections = ([1], np.array([[0.5, 0.5, 0.2, 0.2]]), np.array([0.97]))
+    return [detections if return_scores else detections[:2]] * len(frames)
+
+class TestDetectionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.tmp_dir.name, "video.mp4")
+        with open(self.video_path, "wb") as f:
+            f.write(b"video content")
+        self.cache_dir = os.path.join(self.tmp_dir.name, "cache")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_persists_detections_across_runs(self):
+        cache = DetectionCache(self.cache_dir)
+        entry = cache.open(self.video_path, "detr", 0.9)
+        self.assertIsNone(entry.get(0))
+        entry.put(0, [1, 77], np.array([[0.5, 0.5, 0.2, 0.2], [0.7, 0.7, 0.3, 0.3]]))
+        entry.put(5, [], np.empty((0, 4)))
+        entry.close()
+
+        entry = DetectionCache(self.cache_dir).open(self.video_path, "detr", 0.9)
+        labels, boxes = entry.get(0)
+
+        self.assertEqual(labels, [1, 77])
+        self.assertTrue(np.allclose(boxes, [[0.5, 0.5, 0.2, 0.2], [0.7, 0.7, 0.3, 0.3]]))
+        self.assertEqual(entry.get(5)[0], [])
+        self.assertIsNone(entry.get(1))
+        self.assertEqual(entry.hits, 2)
+
+    def test_keys_on_model_configuration(self):
+        cache = DetectionCache(self.cache_dir)
+        entry = cache.open(self.video_path, "detr", 0.9)
+        entry.put(0, [1], np.array([[0.5, 0.5, 0.2, 0.2]]))
+        entry.close()
+
+        self.assertIsNone(cache.open(self.video_path, "detr", 0.5).get(0))
+        self.assertIsNone(cache.open(self.video_path, "other", 0.9).get(0))
+
+    def test_merges_new_detections_into_existing_entry(self):
+        cache = DetectionCache(self.cache_dir)
+        entry = cache.open(self.video_path, "detr", 0.9)
+        entry.put(2, [1], np.array([[0.5, 0.5, 0.2, 0.2]]))
+        entry.close()
+        entry = cache.open(self.video_path, "detr", 0.9)
+        entry.put(1, [77], np.array([[0.1, 0.1, 0.1, 0.1]]))
+        entry.close()
+
+        entry = cache.open(self.video_path, "detr", 0.9)
+
+        self.assertEqual(len(entry), 2)
+        self.assertEqual(entry.get(1)[0], [77])
+        self.assertEqual(entry.get(2)[0], [1])
+
+    def test_evicts_least_recently_used_entries(self):
+        cache = DetectionCache(self.cache_dir, max_bytes=0)
+        other_video_path = os.path.join(self.tmp_dir.name, "other.mp4")
+        with open(other_video_path, "wb") as f:
+            f.write(b"other content")
+
+        entry = cache.open(self.video_path, "detr", 0.9)
+        entry.put(0, [1], np.array([[0.5, 0.5, 0.2, 0.2]]))
+        entry.close()
+        other_entry = cache.open(other_video_path, "detr", 0.9)
+        other_entry.put(0, [1], np.array([[0.5, 0.5, 0.2, 0.2]]))
+        other_entry.close()
+
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(other_entry.entry_dir)])
+
+    def test_persists_scores(self):
+        cache = DetectionCache(self.cache_dir)
+        entry = cache.open(self.video_path, "detr", 0.9)
+        entry.put(0, [1], np.array([[0.5, 0.5, 0.2, 0.2]]), np.array([0.97]))
+        entry.put(1, [77], np.array([[0.1, 0.1, 0.1, 0.1]]))
+        entry.close()
+
+        entry = cache.open(self.video_path, "detr", 0.9)
+        _, _, scores = entry.get(0, with_scores=True)
+        self.assertTrue(np.allclose(scores, [0.97]))
+        self.assertTrue(np.isnan(entry.get(1, with_scores=True)[2]).all())
+
+    def test_frame_processor_skips_cached_frames(self):
+        model = MagicMock()
+        model.analyze_frames.side_effect = analyze_frames
+        frames = [(idx, np.zeros((4, 4, 3), dtype=np.uint8)) for idx in range(4)]
+
+        entry = DetectionCache(self.cache_dir).open(self.video_path, "detr", 0.9)
+        list(FrameProcessor(model, MagicMock(), batch_size=2, detection_cache=entry).detect_frames(frames))
+        entry.close()
+        model.analyze_frames.reset_mock()
+
+        entry = DetectionCache(self.cache_dir).open(self.video_path, "detr", 0.9)
+        processor = FrameProcessor(model, MagicMock(), batch_size=2, detection_cache=entry)
+        detections = list(processor.detect_frames(frames))
+
+        self.assertFalse(model.analyze_frames.called)
+        self.assertEqual(processor.inference_count, 0)
+        self.assertEqual([labels for _, _, labels, _ in detections], [[1]] * 4)
+
+    def test_cached_detections_keep_scores_for_a_later_sink(self):
+        model = MagicMock()
+        model.analyze_frames.side_effect = analyze_frames
+        frames = [(idx, np.zeros((4, 4, 3), dtype=np.uint8)) for idx in range(2)]
+
+        entry = DetectionCache(self.cache_dir).open(self.video_path, "detr", 0.9)
+        list(FrameProcessor(model, MagicMock(), detection_cache=entry).detect_frames(frames))
+        entry.close()
+        model.analyze_frames.reset_mock()
+
+        sink = MagicMock()
+        entry = DetectionCache(self.cache_dir).open(self.video_path, "detr", 0.9)
+        list(FrameProcessor(model, MagicMock(), detection_cache=entry, detection_sink=sink).detect_frames(frames))
+
+        self.assertFalse(model.analyze_frames.called)
+        scores = [call.args[0]["scores"] for call in sink.write.call_args_list]
+        self.assertEqual(len(scores), 2)
+        self.assertTrue(all(np.allclose(frame_scores, [0.97]) for frame_scores in scores))
+
+    def test_reanalyzes_cached_detections_without_scores_for_a_sink(self):
+        entry = DetectionCache(self.cache_dir).open(self.video_path, "detr", 0.9)
+        entry.put(0, [1], np.array([[0.5, 0.5, 0.2, 0.2]]))
+        entry.close()
+        model = MagicMock()
+        model.analyze_frames.side_effect = analyze_frames
+
+        entry = DetectionCache(self.cache_dir).open(self.video_path, "detr", 0.9)
+        processor = FrameProcessor(model, MagicMock(), detection_cache=entry, detection_sink=MagicMock())
+        list(processor.detect_frames([(0, np.zeros((4, 4, 3), dtype=np.uint8))]))
+
+        self.assertEqual(processor.inference_count, 1)
+        self.assertTrue(np.allclose(entry.get(0, with_scores=True)[2], [0.97]))
+
+if __name__ == '__main__':
+    unittest.main()
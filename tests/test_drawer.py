@@ -1,7 +1,7 @@
 import unittest
 import numpy as np
 import cv2
-from detection.drawer import DetectionDrawer
+from detection.drawer import DetectionDrawer, boxes_to_pixels
 
 class TestDetectionDrawer(unittest.TestCase):
     def test_draws_detections_correctly(self):
@@ -40,5 +40,53 @@ class TestDetectionDrawer(unittest.TestCase):
         self.assertIsNotNone(result_frame)
         self.assertEqual(result_frame.shape, (480, 640, 3))
 
+    def test_matches_drawing_each_label_with_put_text(self):
+        frame = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+        labels = [1, 77, 2]
+        # The last box overflows the top-left corner, so its label is clipped
+        boxes = np.array([[0.3, 0.5, 0.2, 0.2], [0.75, 0.7, 0.3, 0.3], [0.02, 0.03, 0.1, 0.1]])
+        id2label = {1: "person", 77: "cell phone", 2: "bicycle"}
+        expected = frame.copy()
+        for label_id, (x1, y1, x2, y2) in zip(labels, boxes_to_pixels(boxes, 640, 480).tolist()):
+            color = {1: (0, 0, 255), 77: (0, 255, 0)}.get(label_id, (255, 255, 255))
+            cv2.rectangle(expected, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(expected, id2label[label_id], (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+            cv2.putText(expected, str(label_id), (x1, y1 - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+
+        result_frame = DetectionDrawer().draw_detections(frame.copy(), labels, boxes, id2label)
+
+        np.testing.assert_array_equal(result_frame, expected)
+
+    def test_reuses_label_sprites(self):
+        drawer = DetectionDrawer()
+        for _ in range(3):
+            drawer.draw_detections(np.zeros((480, 640, 3), dtype=np.uint8), [1, 1],
+                                   np.array([[0.3, 0.5, 0.2, 0.2], [0.7, 0.5, 0.2, 0.2]]), {1: "person"})
+
+        self.assertEqual(len(drawer._sprites), 1)
+
+    def test_draws_previews_without_touching_the_frame(self):
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        preview = DetectionDrawer().draw_preview(frame, [1], np.array([[0.5, 0.5, 0.4, 0.4]]), {1: "person"}, scale=0.5)
+
+        self.assertEqual(preview.shape, (240, 320, 3))
+        self.assertTrue(preview.any())
+        self.assertFalse(frame.any())
+
+    def test_converts_boxes_to_pixels(self):
+        boxes = np.array([[0.5, 0.5, 0.2, 0.2], [0.7, 0.7, 0.3, 0.3]], dtype=np.float32)
+
+        corners = boxes_to_pixels(boxes, 640, 480)
+
+        expected = [
+            [int((x - bw / 2) * 640), int((y - bh / 2) * 480), int((x + bw / 2) * 640), int((y + bh / 2) * 480)]
+            for x, y, bw, bh in boxes.tolist()
+        ]
+        self.assertEqual(corners.tolist(), expected)
+
+    def test_converts_empty_boxes_to_pixels(self):
+        self.assertEqual(boxes_to_pixels(np.array([]), 640, 480).shape, (0, 4))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
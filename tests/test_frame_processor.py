@@ -2,6 +2,8 @@ import unittest
 from unittest.mock import MagicMock, patch
 import cv2
 import os
+import tempfile
+import numpy as np
 from processor.frame_processor import FrameProcessor
 
 class TestFrameProcessor(unittest.TestCase):
@@ -55,5 +57,129 @@ class TestFrameProcessor(unittest.TestCase):
 
         self.assertTrue(mock_imwrite.called)
 
+    @patch('processor.frame_processor.FrameProcessor._load_audio')
+    @patch('cv2.VideoCapture')
+    def test_streams_frames_lazily(self, mock_video_capture, mock_load_audio):
+        mock_cap = MagicMock()
+        mock_video_capture.return_value = mock_cap
+        mock_cap.isOpened.return_value = True
+        mock_cap.get.side_effect = lambda prop: 10 if prop == cv2.CAP_PROP_FPS else 3
+        mock_cap.read.side_effect = [(True, "frame0"), (True, "frame1"), (True, "frame2")]
+
+        processor = FrameProcessor(MagicMock(), MagicMock())
+        fps, frames, audio = processor.stream_video_fragments("dummy_path", frame_rate=1)
+
+        self.assertFalse(mock_cap.read.called)
+        self.assertEqual(next(frames), (0, "frame0"))
+        self.assertEqual(mock_cap.read.call_count, 1)
+        self.assertEqual(list(frames), [(1, "frame1"), (2, "frame2")])
+        self.assertTrue(mock_cap.release.called)
+
+    @patch('cv2.VideoWriter')
+    def test_compiles_video_from_generator(self, mock_video_writer):
+        processor = FrameProcessor(MagicMock(), MagicMock())
+        frames = (np.zeros((4, 4, 3), dtype=np.uint8) for _ in range(3))
+
+        output_video_path, _ = processor.compile_video(frames, "/tmp", fps=10)
+
+        self.assertIsNotNone(output_video_path)
+        self.assertEqual(mock_video_writer.return_value.write.call_count, 3)
+
+    def test_drains_frames_when_not_storing_video(self):
+        processor = FrameProcessor(MagicMock(), MagicMock())
+        consumed = []
+        frames = (consumed.append(i) for i in range(3))
+
+        self.assertEqual(processor.compile_video(frames, None), (None, None))
+        self.assertEqual(consumed, [0, 1, 2])
+
+    @patch('cv2.imwrite')
+    def test_processes_frames_in_batches(self, mock_imwrite):
+        model = MagicMock()
+        drawer = MagicMock()
+        model.analyze_frames.side_effect = lambda frames: [([1], [[0.1, 0.1, 0.2, 0.2]])] * len(frames)
+        drawer.draw_detections.side_effect = lambda frame, labels, boxes, id2label: frame
+        processor = FrameProcessor(model, drawer, batch_size=2)
+
+        frames = [(idx, f"frame{idx}") for idx in range(5)]
+        processed = list(processor.process_frames(frames))
+
+        self.assertEqual(processed, [f"frame{idx}" for idx in range(5)])
+        batch_sizes = [len(call.args[0]) for call in model.analyze_frames.call_args_list]
+        self.assertEqual(batch_sizes, [2, 2, 1])
+
+    def test_rejects_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            FrameProcessor(MagicMock(), MagicMock(), batch_size=0)
+
+    def test_sampling_modes_select_same_frames(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            video_path = os.path.join(tmp_dir, "synthetic.mp4")
+            writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 48))
+            for idx in range(120):
+                writer.write(np.full((48, 64, 3), idx * 2, dtype=np.uint8))
+            writer.release()
+
+            processor = FrameProcessor(MagicMock(), MagicMock())
+            processor.SEEK_MIN_GAP = 5
+            results = {}
+            for sampling in FrameProcessor.SAMPLING_MODES:
+                _, frames = processor.stream_frames(video_path, frame_rate=500, sampling=sampling)
+                results[sampling] = list(frames)
+
+        expected_indices = [idx for idx, _ in results["read"]]
+        self.assertGreater(len(expected_indices), 1)
+        for sampling, frames in results.items():
+            self.assertEqual([idx for idx, _ in frames], expected_indices)
+            for (_, frame), (_, expected) in zip(frames, results["read"]):
+                self.assertLess(np.abs(frame.astype(int) - expected.astype(int)).mean(), 2)
+
+    def test_rejects_unknown_sampling_mode(self):
+        processor = FrameProcessor(MagicMock(), MagicMock())
+
+        with self.assertRaises(ValueError):
+            processor.stream_frames("dummy_path", sampling="skip")
+
+    def test_reuses_detections_for_unchanged_frames(self):
+        model = MagicMock()
+        model.analyze_frames.side_effect = lambda frames: [([1], f"boxes{len(model.analyze_frames.call_args_list)}")] * len(frames)
+        change_detector = MagicMock()
+        change_detector.has_changed.side_effect = [True, False, False, True, False]
+        processor = FrameProcessor(model, MagicMock(), batch_size=5, change_detector=change_detector)
+
+        frames = [(idx, f"frame{idx}") for idx in range(5)]
+        detections = [boxes for _, _, _, boxes in processor.detect_frames(frames)]
+
+        self.assertEqual(model.analyze_frames.call_args.args[0], ["frame0", "frame3"])
+        self.assertEqual(detections, ["boxes1"] * 5)
+        self.assertEqual(processor.inference_count, 2)
+        self.assertEqual(processor.skipped_inferences, 3)
+
+    def test_skips_model_call_when_batch_is_unchanged(self):
+        model = MagicMock()
+        model.analyze_frames.side_effect = lambda frames: [([1], "boxes")] * len(frames)
+        change_detector = MagicMock()
+        change_detector.has_changed.side_effect = [True, False, False]
+        processor = FrameProcessor(model, MagicMock(), batch_size=1, change_detector=change_detector)
+
+        detections = list(processor.detect_frames([(idx, f"frame{idx}") for idx in range(3)]))
+
+        self.assertEqual(model.analyze_frames.call_count, 1)
+        self.assertEqual([boxes for _, _, _, boxes in detections], ["boxes"] * 3)
+
+    @patch('processor.frame_processor.FrameProcessor._display_frame')
+    def test_displays_preview_and_keeps_full_resolution_frame(self, mock_display_frame):
+        model = MagicMock()
+        model.analyze_frames.side_effect = lambda frames: [([1], [[0.5, 0.5, 0.2, 0.2]])] * len(frames)
+        drawer = MagicMock()
+        drawer.draw_detections.side_effect = lambda frame, labels, boxes, id2label: "full"
+        drawer.draw_preview.side_effect = lambda frame, labels, boxes, id2label, scale: f"preview_{scale}"
+        processor = FrameProcessor(model, drawer, preview_scale=0.25)
+
+        processed = list(processor.process_frames([(0, "frame0")], display_video=True))
+
+        self.assertEqual(processed, ["full"])
+        mock_display_frame.assert_called_once_with("preview_0.25", True)
+
 if __name__ == '__main__':
     unittest.main()
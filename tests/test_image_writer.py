@@ -0,0 +1,77 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+import cv2
+import numpy as np
+from processor.frame_processor import FrameProcessor
+from processor.image_writer import AsyncImageWriter
+
+class TestAsyncImageWriter(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.full((24, 32, 3), 128, dtype=np.uint8)
+
+    def test_writes_frames_in_each_format(self):
+        for image_format in AsyncImageWriter.FORMATS:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                writer = AsyncImageWriter(tmp_dir, image_format)
+                for frame_idx in range(3):
+                    writer.submit(self.frame, frame_idx)
+                writer.close()
+
+                files = sorted(os.listdir(tmp_dir))
+                self.assertEqual(writer.saved, 3)
+                self.assertEqual(len(files), 3)
+                self.assertTrue(all(name.endswith(f".{image_format}") for name in files))
+                if image_format == "npy":
+                    saved = np.load(os.path.join(tmp_dir, files[0]))
+                else:
+                    saved = cv2.imread(os.path.join(tmp_dir, files[0]))
+                self.assertEqual(saved.shape, self.frame.shape)
+
+    def test_skips_frames_without_detections(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            writer = AsyncImageWriter(tmp_dir, "npy", only_detections=True)
+            writer.submit(self.frame, 0, has_detections=False)
+            writer.submit(self.frame, 1, has_detections=True)
+            writer.close()
+
+            self.assertEqual(len(os.listdir(tmp_dir)), 1)
+
+    def test_drops_frames_when_full(self):
+        release = threading.Event()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch.object(AsyncImageWriter, '_write', side_effect=lambda *args: release.wait()):
+                writer = AsyncImageWriter(tmp_dir, workers=1, max_queue=1, drop_when_full=True)
+                for frame_idx in range(5):
+                    writer.submit(self.frame, frame_idx)
+                release.set()
+                writer.close()
+
+        self.assertGreater(writer.dropped, 0)
+
+    def test_raises_write_errors_on_close(self):
+        writer = AsyncImageWriter("/nonexistent/directory", "png")
+        writer.submit(self.frame, 0)
+
+        with self.assertRaises(IOError):
+            writer.close()
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            AsyncImageWriter("/tmp", "bmp")
+
+    @patch('cv2.imwrite')
+    def test_processor_saves_through_writer(self, mock_imwrite):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            writer = AsyncImageWriter(tmp_dir, "npy")
+            processor = FrameProcessor(None, None, image_writer=writer)
+            processor._save_frame(self.frame, 1, image_path=None)
+            writer.close()
+
+            self.assertEqual(len(os.listdir(tmp_dir)), 1)
+        mock_imwrite.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from transformers import DetrImageProcessor
+from benchmarks.autotune import tune
+from config.inference_config import InferenceConfig
+from detection.model import DETRModel
+from main import load_inference_config
+from tests.fixtures import tiny_detr
+
+class TestInferenceConfig(unittest.TestCase):
+    def test_saves_and_loads_settings(self):
+        inference_config = InferenceConfig(intra_op_threads=8, inter_op_threads=1, bf16=True, input_size=(640, 640))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "nested", "inference.json")
+            inference_config.save(path, autotune={"runs": []})
+
+            self.assertEqual(InferenceConfig.load(path), inference_config)
+
+    def test_explicit_overrides_turn_saved_settings_off(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "inference.json")
+            InferenceConfig(bf16=True, channels_last=True).save(path)
+
+            inference_config = load_inference_config(path, bf16=False, channels_last=None)
+
+        self.assertEqual(inference_config, InferenceConfig(channels_last=True))
+
+    def test_rejects_unknown_settings(self):
+        with self.assertRaises(ValueError):
+            InferenceConfig.from_dict({"bf16": True, "fp8": True})
+
+    @patch('config.inference_config.torch.set_num_interop_threads')
+    @patch('config.inference_config.torch.set_num_threads')
+    def test_applies_thread_settings(self, mock_set_num_threads, mock_set_num_interop_threads):
+        mock_set_num_interop_threads.side_effect = RuntimeError("already started")
+
+        InferenceConfig(intra_op_threads=4, inter_op_threads=2).apply()
+
+        mock_set_num_threads.assert_called_once_with(4)
+        mock_set_num_interop_threads.assert_called_once_with(2)
+
+@patch('detection.model.DetrImageProcessor.from_pretrained', lambda name: DetrImageProcessor())
+@patch('detection.model.DetrForObjectDetection.from_pretrained', lambda name: tiny_detr())
+class TestDETRModelInferenceConfig(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.frames = [rng.integers(0, 256, (96, 128, 3), dtype=np.uint8) for _ in range(2)]
+
+    def test_channels_last_keeps_detections(self):
+        expected = DETRModel(threshold=0.0).analyze_frames(self.frames)
+
+        detections = DETRModel(threshold=0.0, inference_config=InferenceConfig(channels_last=True)).analyze_frames(self.frames)
+
+        for (labels, boxes), (expected_labels, expected_boxes) in zip(detections, expected):
+            self.assertEqual(labels, expected_labels)
+            self.assertTrue(np.allclose(boxes, expected_boxes, atol=1e-4))
+
+    def test_bf16_and_fixed_input_size(self):
+        model = DETRModel(threshold=0.0, inference_config=InferenceConfig(bf16=True, input_size=(64, 64)))
+
+        detections = model.analyze_frames(self.frames, return_scores=True)
+
+        self.assertEqual(model._preprocess(self.frames)["pixel_values"].shape[-2:], (64, 64))
+        self.assertGreater(sum(len(labels) for labels, _, _ in detections), 0)
+        self.assertEqual(detections[0][1].dtype, np.float32)
+        self.assertTrue(model.model_id.endswith(":bf16:64x64"))
+
+class TestAutotune(unittest.TestCase):
+    def test_keeps_the_fastest_value_of_each_setting(self):
+        def measure_config(inference_config):
+            fps = 10 + (inference_config.intra_op_threads or 0) + 5 * inference_config.channels_last
+            # bf16 is fastest but changes the detections, so it must be rejected
+            labels = [1] if inference_config.bf16 else [1, 77]
+            return fps + 100 * inference_config.bf16, [(labels, [[0.5, 0.5, 0.2, 0.2]] * len(labels))]
+
+        best, runs = tune(measure_config, [("intra_op_threads", [None, 4, 2]), ("bf16", [False, True]),
+                                           ("channels_last", [False, True])])
+
+        self.assertEqual(best, InferenceConfig(intra_op_threads=4, channels_last=True))
+        self.assertEqual(len(runs), 5)
+        self.assertEqual([run["rejected"] for run in runs], [False, False, False, True, False])
+
+    def test_rejects_moved_boxes(self):
+        def measure_config(inference_config):
+            shift = 0.05 if inference_config.input_size else 0.001 * inference_config.channels_last
+            return 10 + 5 * (inference_config != InferenceConfig()), [([1], [[0.5 + shift, 0.5, 0.2, 0.2]])]
+
+        best, runs = tune(measure_config, [("channels_last", [False, True]), ("input_size", [None, (64, 64)])])
+
+        self.assertEqual(best, InferenceConfig(channels_last=True))
+        self.assertEqual([run["rejected"] for run in runs], [False, False, True])
+
+    def test_keeps_accuracy_settings_without_detections(self):
+        def measure_config(inference_config):
+            return 10 + 100 * inference_config.bf16 + 5 * inference_config.channels_last, [([], [])]
+
+        best, runs = tune(measure_config, [("bf16", [False, True]), ("channels_last", [False, True])])
+
+        self.assertEqual(best, InferenceConfig(channels_last=True))
+        self.assertEqual(len(runs), 2)
+
+if __name__ == '__main__':
+    unittest.main()
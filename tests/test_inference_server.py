@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import cv2
+import numpy as np
+from transformers import DetrImageProcessor
+from detection.model import DETRModel
+from processor.inference_server import DynamicBatcher, InferenceServer
+from tests.fixtures import tiny_detr
+
+class StubModel:
+    id2label = {1: "person", 2: "car"}
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def analyze_frame(self, frame, return_scores=False):
+        return self.analyze_frames([frame], return_scores)[0]
+
+    def analyze_frames(self, frames, return_scores=False):
+        self.batch_sizes.append(len(frames))
+        # The detections depend on the frame, so results cannot be mixed up between requests
+        results = []
+        for frame in frames:
+            brightness = float(frame.mean()) / 255
+            detection = ([1, 2], np.array([[brightness, 0.5, 0.2, 0.2], [0.3, 0.3, 0.1, 0.1]]), np.array([0.9, 0.8]))
+            results.append(detection if return_scores else detection[:2])
+        return results
+
+class TestDynamicBatcher(unittest.TestCase):
+    def test_groups_concurrent_frames_into_batches(self):
+        model = StubModel()
+        batcher = DynamicBatcher(model, max_batch_size=4, max_wait_ms=200)
+        futures = [batcher.submit(np.zeros((8, 8, 3), dtype=np.uint8)) for _ in range(6)]
+        for future in futures:
+            future.result(5)
+        batcher.close()
+
+        self.assertEqual(model.batch_sizes, [4, 2])
+        self.assertEqual(batcher.stats()["frames"], 6)
+        self.assertEqual(batcher.stats()["batch_sizes"], {2: 1, 4: 1})
+
+    @patch('detection.model.DetrImageProcessor.from_pretrained', lambda name: DetrImageProcessor())
+    @patch('detection.model.DetrForObjectDetection.from_pretrained', lambda name: tiny_detr())
+    def test_batches_frames_of_different_sizes_like_single_frames(self):
+        model = DETRModel(threshold=0.0, model_cache_dir=None)
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, shape, dtype=np.uint8) for shape in [(96, 128, 3), (64, 160, 3), (96, 128, 3)]]
+        expected = [model.analyze_frame(frame, return_scores=True) for frame in frames]
+
+        batcher = DynamicBatcher(model, max_batch_size=4, max_wait_ms=200)
+        futures = [batcher.submit(frame) for frame in frames]
+        results = [future.result(30) for future in futures]
+        batcher.close()
+
+        self.assertEqual(batcher.stats()["batch_sizes"], {1: 1, 2: 1})
+        for (labels, boxes, scores), (expected_labels, expected_boxes, expected_scores) in zip(results, expected):
+            self.assertEqual(list(labels), list(expected_labels))
+            self.assertTrue(np.allclose(boxes, expected_boxes, atol=1e-4))
+            self.assertTrue(np.allclose(scores, expected_scores, atol=1e-4))
+
+    def test_propagates_model_errors(self):
+        model = StubModel()
+        model.analyze_frames = lambda frames, return_scores=False: 1 / 0
+        batcher = DynamicBatcher(model, max_wait_ms=0)
+
+        with self.assertRaises(ZeroDivisionError):
+            batcher.analyze_frame(np.zeros((8, 8, 3), dtype=np.uint8), timeout=5)
+        batcher.close()
+        self.assertEqual(batcher.stats()["errors"], 1)
+
+class TestInferenceServer(unittest.TestCase):
+    def setUp(self):
+        self.model = StubModel()
+        self.batcher = DynamicBatcher(self.model, max_batch_size=8, max_wait_ms=50)
+        self.server = InferenceServer(self.batcher, port=0)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.batcher.close()
+
+    def request(self, path, body=None):
+        request = urllib.request.Request(self.url + path, data=body)
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.loads(response.read())
+
+    def test_returns_the_same_detections_as_analyze_frame(self):
+        frame = np.full((48, 64, 3), 128, dtype=np.uint8)
+        labels, boxes = self.model.analyze_frame(frame)
+
+        result = self.request("/detect", cv2.imencode(".png", frame)[1].tobytes())
+
+        self.assertEqual(result["labels"], labels)
+        self.assertEqual(result["names"], ["person", "car"])
+        np.testing.assert_allclose(result["boxes"], boxes)
+        self.assertEqual(result["scores"], [0.9, 0.8])
+
+    def test_batches_concurrent_requests(self):
+        frames = [np.full((48, 64, 3), value, dtype=np.uint8) for value in range(0, 250, 50)]
+        bodies = [cv2.imencode(".png", frame)[1].tobytes() for frame in frames]
+
+        with ThreadPoolExecutor(len(bodies)) as executor:
+            results = list(executor.map(lambda body: self.request("/detect", body), bodies))
+
+        for frame, result in zip(frames, results):
+            self.assertAlmostEqual(result["boxes"][0][0], frame.mean() / 255)
+        self.assertLess(len(self.model.batch_sizes), len(frames))
+        stats = self.request("/stats")
+        self.assertEqual(stats["frames"], len(frames))
+        self.assertEqual(stats["requests"], {"/detect": len(frames)})
+        self.assertIsNotNone(stats["latency_p95_ms"])
+
+    def test_detects_the_frames_of_a_video(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            video_path = os.path.join(tmp_dir, "synthetic.mp4")
+            writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 48))
+            for idx in range(20):
+                writer.write(np.full((48, 64, 3), idx * 10, dtype=np.uint8))
+            writer.release()
+
+            result = self.request("/detect_video", json.dumps({"video_path": video_path}).encode())
+
+        self.assertEqual([frame["frame_idx"] for frame in result["frames"]], list(range(20)))
+        self.assertEqual(result["frames"][0]["names"], ["person", "car"])
+
+    def test_rejects_invalid_requests(self):
+        for path, body, status in (("/detect", b"not an image", 400),
+                                   ("/detect_video", b"{}", 400),
+                                   ("/detect_video", json.dumps({"video_path": "missing.mp4"}).encode(), 404),
+                                   ("/unknown", b"", 404)):
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                self.request(path, body)
+            self.assertEqual(context.exception.code, status)
+            context.exception.close()
+
+if __name__ == '__main__':
+    unittest.main()
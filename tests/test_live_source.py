@@ -0,0 +1,54 @@
+import os
+import tempfile
+import time
+import unittest
+import cv2
+import numpy as np
+from processor.live_source import LiveFrameSource
+
+class TestLiveFrameSource(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.video_path = os.path.join(cls.tmp_dir.name, "synthetic.avi")
+        writer = cv2.VideoWriter(cls.video_path, cv2.VideoWriter_fourcc(*'MJPG'), 100, (32, 24))
+        for idx in range(50):
+            writer.write(np.full((24, 32, 3), idx * 5, dtype=np.uint8))
+        writer.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_delivers_every_frame_to_a_fast_consumer(self):
+        source = LiveFrameSource(self.video_path, realtime=True)
+        frame_indices = []
+        for frame_idx, _ in source:
+            frame_indices.append(frame_idx)
+            source.mark_processed()
+        stats = source.stats()
+
+        self.assertEqual(frame_indices, list(range(50)))
+        self.assertEqual(stats["dropped"], 0)
+        self.assertIsNotNone(stats["latency_p95_ms"])
+
+    def test_drops_stale_frames_for_a_slow_consumer(self):
+        source = LiveFrameSource(self.video_path, realtime=True)
+        frame_indices = []
+        for frame_idx, _ in source:
+            frame_indices.append(frame_idx)
+            time.sleep(0.05)
+            source.mark_processed()
+        stats = source.stats()
+
+        self.assertEqual(frame_indices, sorted(frame_indices))
+        self.assertGreater(stats["dropped"], 0)
+        self.assertEqual(stats["delivered"] + stats["dropped"], stats["captured"])
+        self.assertGreater(stats["drop_rate"], 0.5)
+
+    def test_raises_error_if_source_cannot_be_opened(self):
+        with self.assertRaises(IOError):
+            LiveFrameSource(os.path.join(self.tmp_dir.name, "missing.mp4"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+from processor.frame_processor import FrameProcessor
+from processor.metrics import Metrics, NullMetrics
+
+class TestMetrics(unittest.TestCase):
+    def test_exports_prometheus_text(self):
+        metrics = Metrics()
+        metrics.inc("frames_total", 3)
+        metrics.set("queue_depth", 2, {"queue": "decoded"})
+        metrics.observe("stage_seconds", 0.004, {"stage": "draw"})
+        metrics.observe("stage_seconds", 0.2, {"stage": "draw"})
+
+        text = metrics.to_prometheus()
+
+        self.assertIn("# TYPE object_detection_frames_total counter\nobject_detection_frames_total 3\n", text)
+        self.assertIn('object_detection_queue_depth{queue="decoded"} 2', text)
+        self.assertIn('object_detection_stage_seconds_bucket{stage="draw",le="0.005"} 1', text)
+        self.assertIn('object_detection_stage_seconds_bucket{stage="draw",le="+Inf"} 2', text)
+        self.assertIn('object_detection_stage_seconds_count{stage="draw"} 2', text)
+
+    def test_writes_json_summary(self):
+        metrics = Metrics()
+        with metrics.timer("stage_seconds", {"stage": "decode"}):
+            pass
+        metrics.inc("inferences_total")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "metrics.json")
+            metrics.write(path)
+            with open(path) as f:
+                summary = json.load(f)
+
+        self.assertEqual(summary["counters"]["object_detection_inferences_total"], 1)
+        self.assertEqual(summary["histograms"]['object_detection_stage_seconds{stage="decode"}']["count"], 1)
+
+    def test_null_metrics_record_nothing(self):
+        metrics = NullMetrics()
+        with metrics.timer("stage_seconds"):
+            metrics.inc("frames_total")
+
+        self.assertFalse(metrics.enabled)
+
+    @patch('cv2.imwrite')
+    def test_frame_processor_records_stages(self, mock_imwrite):
+        model = MagicMock()
+        model.analyze_frames.side_effect = lambda frames: [([1], np.array([[0.5, 0.5, 0.2, 0.2]]))] * len(frames)
+        metrics = Metrics()
+        processor = FrameProcessor(model, MagicMock(), batch_size=2, metrics=metrics)
+
+        frames = [(idx, np.zeros((4, 4, 3), dtype=np.uint8)) for idx in range(3)]
+        list(processor.process_frames(frames, image_path="/tmp"))
+        summary = metrics.to_dict()
+
+        self.assertEqual(summary["counters"]["object_detection_frames_total"], 3)
+        self.assertEqual(summary["counters"]["object_detection_inferences_total"], 3)
+        self.assertEqual(summary["histograms"]['object_detection_stage_seconds{stage="analyze"}']["count"], 2)
+        self.assertEqual(summary["histograms"]['object_detection_stage_seconds{stage="draw"}']["count"], 3)
+        self.assertEqual(summary["histograms"]['object_detection_stage_seconds{stage="save"}']["count"], 3)
+
+if __name__ == '__main__':
+    unittest.main()
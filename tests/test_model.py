@@ -57,6 +57,60 @@ class TestDETRModel(unittest.TestCase):
         self.assertEqual(filtered_labels, [1, 77])
         self.assertTrue((filtered_boxes == np.array([[0.5, 0.5, 0.2, 0.2], [0.7, 0.7, 0.4, 0.4]])).all())
 
+    @patch('detection.model.DetrForObjectDetection.from_pretrained')
+    @patch('detection.model.DetrImageProcessor.from_pretrained')
+    def test_analyzes_frames_in_one_forward_pass(self, mock_image_processor, mock_model):
+        mock_model.return_value = MagicMock()
+        mock_image_processor.return_value = MagicMock()
+        model = DETRModel()
+
+        frames = [np.zeros((480, 640, 3), dtype=np.uint8), np.zeros((480, 640, 3), dtype=np.uint8)]
+        model.model.return_value.logits.softmax.return_value = torch.tensor([
+            [[0.01, 0.95, 0.04], [0.5, 0.2, 0.3]],
+            [[0.02, 0.02, 0.96], [0.97, 0.01, 0.02]],
+        ])
+        model.model.return_value.pred_boxes = torch.tensor([
+            [[0.5, 0.5, 0.2, 0.2], [0.1, 0.1, 0.1, 0.1]],
+            [[0.6, 0.6, 0.3, 0.3], [0.4, 0.4, 0.2, 0.2]],
+        ])
+
+        results = model.analyze_frames(frames)
+
+        self.assertEqual(model.model.call_count, 1)
+        self.assertEqual(len(model.image_processor.call_args.kwargs["images"]), 2)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][0], [1])
+        self.assertTrue(np.allclose(results[0][1], [[0.5, 0.5, 0.2, 0.2]]))
+        self.assertEqual(results[1][0], [])
+        self.assertEqual(len(results[1][1]), 0)
+
+    @patch('detection.model.DetrForObjectDetection.from_pretrained')
+    @patch('detection.model.DetrImageProcessor.from_pretrained')
+    def test_returns_scores_when_requested(self, mock_image_processor, mock_model):
+        mock_model.return_value = MagicMock()
+        mock_image_processor.return_value = MagicMock()
+        model = DETRModel()
+
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        model.model.return_value.logits.softmax.return_value = torch.tensor([[[0.01, 0.95, 0.04]]])
+        model.model.return_value.pred_boxes = torch.tensor([[[0.5, 0.5, 0.2, 0.2]]])
+
+        labels, boxes, scores = model.analyze_frame(frame, return_scores=True)
+
+        self.assertEqual(labels, [1])
+        self.assertTrue(np.allclose(scores, [0.95]))
+
+    @patch('detection.model.DetrForObjectDetection.from_pretrained')
+    @patch('detection.model.DetrImageProcessor.from_pretrained')
+    def test_masks_restricted_classes_as_tensor(self, mock_image_processor, mock_model):
+        mock_model.return_value = MagicMock()
+        mock_image_processor.return_value = MagicMock()
+        model = DETRModel()
+
+        mask = model._is_restricted(torch.tensor([[1, 2, 77], [90, 0, 85]]))
+
+        self.assertEqual(mask.tolist(), [[True, False, True], [False, False, True]])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import torch
+from transformers import DetrImageProcessor
+from detection.model_cache import ModelCache
+from tests.fixtures import tiny_detr
+
+class TestModelCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch('detection.model_cache.DetrImageProcessor.from_pretrained')
+    @patch('detection.model_cache.DetrForObjectDetection.from_pretrained')
+    def test_loads_cached_weights_without_from_pretrained(self, mock_model, mock_image_processor):
+        model = tiny_detr()
+        mock_model.return_value = model
+        mock_image_processor.return_value = DetrImageProcessor()
+        cache = ModelCache(self.tmp_dir.name)
+
+        cache.load("facebook/detr-resnet-50")
+        cached_model, cached_image_processor = cache.load("facebook/detr-resnet-50")
+
+        self.assertEqual(mock_model.call_count, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, "facebook--detr-resnet-50", ModelCache.WEIGHTS_FILE)))
+        self.assertIsNotNone(cached_image_processor)
+        pixel_values = torch.randn(1, 3, 64, 64)
+        with torch.no_grad():
+            expected = model(pixel_values=pixel_values).logits
+            logits = cached_model(pixel_values=pixel_values).logits
+        self.assertTrue(torch.equal(logits, expected))
+
+    @patch('detection.model_cache.DetrImageProcessor.from_pretrained')
+    @patch('detection.model_cache.DetrForObjectDetection.from_pretrained')
+    def test_repairs_corrupt_entries(self, mock_model, mock_image_processor):
+        mock_model.return_value = tiny_detr()
+        mock_image_processor.return_value = DetrImageProcessor()
+        entry_dir = os.path.join(self.tmp_dir.name, "facebook--detr-resnet-50")
+        os.makedirs(entry_dir)
+        with open(os.path.join(entry_dir, ModelCache.WEIGHTS_FILE), "wb") as f:
+            f.write(b"partial")
+        cache = ModelCache(self.tmp_dir.name)
+
+        cache.load("facebook/detr-resnet-50")
+        cached_model, _ = cache.load("facebook/detr-resnet-50")
+
+        self.assertEqual(mock_model.call_count, 1)
+        self.assertIsNotNone(cached_model)
+
+    @patch('detection.model_cache.DetrImageProcessor.from_pretrained')
+    @patch('detection.model_cache.DetrForObjectDetection.from_pretrained')
+    def test_ignores_cache_directories_it_cannot_create(self, mock_model, mock_image_processor):
+        model = tiny_detr()
+        mock_model.return_value = model
+        mock_image_processor.return_value = DetrImageProcessor()
+        cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        with open(cache_dir, "w") as f:
+            f.write("not a directory")
+
+        cached_model, _ = ModelCache(cache_dir).load("facebook/detr-resnet-50")
+
+        self.assertIs(cached_model, model)
+        self.assertTrue(os.path.isfile(cache_dir))
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["cache"])
+
+    @patch('detection.model_cache.DetrImageProcessor.from_pretrained')
+    @patch('detection.model_cache.DetrForObjectDetection.from_pretrained')
+    def test_propagates_loading_errors(self, mock_model, mock_image_processor):
+        mock_model.side_effect = OSError("no network")
+
+        with self.assertRaises(OSError):
+            ModelCache(self.tmp_dir.name).load("facebook/detr-resnet-50")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import torch
+from transformers import DetrImageProcessor
+from detection.model import DETRModel
+from detection.optimized_model import OptimizedDETRModel
+from tests.fixtures import tiny_detr
+
+@patch('detection.model.DetrImageProcessor.from_pretrained', lambda name: DetrImageProcessor())
+@patch('detection.model.DetrForObjectDetection.from_pretrained', lambda name: tiny_detr())
+class TestOptimizedDETRModel(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.frames = [rng.integers(0, 256, (96, 128, 3), dtype=np.uint8) for _ in range(2)]
+
+    def _eager_detections(self, optimized):
+        eager = DETRModel(threshold=optimized.threshold)
+        inputs = optimized._preprocess(self.frames)
+        return eager._forward(inputs), eager._postprocess(*eager._forward(inputs))
+
+    def assert_same_detections(self, detections, expected):
+        self.assertEqual(len(detections), len(expected))
+        for (labels, boxes), (expected_labels, expected_boxes) in zip(detections, expected):
+            self.assertEqual(labels, expected_labels)
+            self.assertTrue(np.allclose(boxes, expected_boxes, atol=1e-4))
+
+    def test_torchscript_matches_eager_detections(self):
+        model = OptimizedDETRModel(threshold=0.0, backend="torchscript", input_size=(64, 64))
+        _, expected = self._eager_detections(model)
+
+        detections = model.analyze_frames(self.frames)
+
+        self.assertGreater(sum(len(labels) for labels, _ in detections), 0)
+        self.assert_same_detections(detections, expected)
+
+    def test_quantized_torchscript_stays_close_to_eager(self):
+        model = OptimizedDETRModel(threshold=0.0, backend="torchscript", quantize=True, input_size=(64, 64))
+        (expected_logits, expected_boxes), _ = self._eager_detections(model)
+
+        logits, pred_boxes = model._forward(model._preprocess(self.frames))
+
+        self.assertTrue(torch.allclose(logits, expected_logits, atol=0.05))
+        self.assertTrue(torch.allclose(pred_boxes, expected_boxes, atol=0.05))
+
+    @unittest.skipIf(importlib.util.find_spec("onnxruntime") is None, "onnxruntime is not installed")
+    def test_onnx_matches_eager_detections(self):
+        model = OptimizedDETRModel(threshold=0.0, backend="onnx", input_size=(64, 64))
+        _, expected = self._eager_detections(model)
+
+        self.assert_same_detections(model.analyze_frames(self.frames), expected)
+
+    @unittest.skipIf(importlib.util.find_spec("onnxruntime") is None, "onnxruntime is not installed")
+    def test_onnx_export_leaves_no_temporary_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, patch('tempfile.tempdir', tmp_dir):
+            model = OptimizedDETRModel(threshold=0.0, backend="onnx", quantize=True, input_size=(64, 64))
+
+            self.assertEqual(os.listdir(tmp_dir), [])
+        self.assertEqual(len(model.analyze_frames(self.frames)), 2)
+
+    def test_rejects_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            OptimizedDETRModel(backend="tensorrt")
+
+if __name__ == '__main__':
+    unittest.main()
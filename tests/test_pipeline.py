@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import MagicMock
+from processor.frame_processor import FrameProcessor
+from processor.pipeline import StagedPipeline
+
+class TestStagedPipeline(unittest.TestCase):
+    def _make_processor(self, batch_size=1):
+        model = MagicMock()
+        drawer = MagicMock()
+        model.analyze_frames.side_effect = lambda frames: [([1], [[0.1, 0.1, 0.2, 0.2]])] * len(frames)
+        drawer.draw_detections.side_effect = lambda frame, labels, boxes, id2label: f"drawn_{frame}"
+        return FrameProcessor(model, drawer, batch_size=batch_size)
+
+    def test_keeps_frame_order(self):
+        pipeline = StagedPipeline(self._make_processor(batch_size=3), queue_size=2)
+        frames = [(idx, f"frame{idx}") for idx in range(20)]
+
+        processed = list(pipeline.run(frames))
+
+        self.assertEqual(processed, [f"drawn_frame{idx}" for idx in range(20)])
+
+    def test_exposes_queue_depths(self):
+        pipeline = StagedPipeline(self._make_processor(), queue_size=2)
+        frames = [(idx, f"frame{idx}") for idx in range(10)]
+
+        list(pipeline.run(frames))
+
+        self.assertEqual(set(pipeline.queue_depths()), set(StagedPipeline.STAGES))
+        peaks = pipeline.peak_queue_depths()
+        self.assertTrue(all(0 <= depth <= 2 for depth in peaks.values()))
+
+    def test_propagates_stage_errors(self):
+        processor = self._make_processor()
+        processor.model.analyze_frames.side_effect = RuntimeError("inference failed")
+        pipeline = StagedPipeline(processor)
+
+        with self.assertRaises(RuntimeError):
+            list(pipeline.run([(0, "frame0")]))
+
+    def test_stops_workers_when_consumer_stops_early(self):
+        pipeline = StagedPipeline(self._make_processor(), queue_size=1)
+        frames = ((idx, f"frame{idx}") for idx in range(1000))
+
+        processed = pipeline.run(frames)
+        self.assertEqual(next(processed), "drawn_frame0")
+        processed.close()
+
+        self.assertLess(pipeline.processor.model.analyze_frames.call_count, 1000)
+
+    def test_closes_the_source_when_consumer_stops_early(self):
+        released = []
+
+        def frames():
+            try:
+                for idx in range(1000):
+                    yield idx, f"frame{idx}"
+            finally:
+                released.append(True)
+
+        source = frames()
+        processed = StagedPipeline(self._make_processor(), queue_size=1).run(source)
+        next(processed)
+        processed.close()
+
+        self.assertEqual(released, [True])
+
+if __name__ == '__main__':
+    unittest.main()
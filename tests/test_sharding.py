@@ -0,0 +1,144 @@
+import functools
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import cv2
+import numpy as np
+from processor.image_writer import AsyncImageWriter
+from processor.sharding import ShardedVideoProcessor
+from processor.video_writer import find_ffmpeg
+
+class StubModel:
+    id2label = {1: "person"}
+
+    def analyze_frames(self, frames):
+        return [([1], np.array([[0.5, 0.5, 0.2, 0.2]])) for _ in frames]
+
+class ScoringStubModel(StubModel):
+    def analyze_frames(self, frames, return_scores=False):
+        return [([1], np.array([[0.5, 0.5, 0.2, 0.2]]), np.array([0.97])) for _ in frames]
+
+class StubDrawer:
+    def draw_detections(self, frame, labels, boxes, id2label):
+        return frame
+
+class TestShardedVideoProcessor(unittest.TestCase):
+    def test_splits_frame_ranges_without_gaps(self):
+        ranges = ShardedVideoProcessor.split_frame_ranges(10, 3)
+
+        self.assertEqual(ranges, [(0, 3), (3, 6), (6, None)])
+
+    def test_splits_short_videos_into_fewer_shards(self):
+        self.assertEqual(ShardedVideoProcessor.split_frame_ranges(2, 4), [(0, 1), (1, None)])
+
+    def _write_video(self, video_path, frame_count=45):
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 48))
+        for idx in range(frame_count):
+            writer.write(np.full((48, 64, 3), idx * 5, dtype=np.uint8))
+        writer.release()
+
+    @patch('processor.frame_processor.FrameProcessor._load_audio')
+    def test_stitches_shards_in_order(self, mock_load_audio):
+        mock_load_audio.return_value = None
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            video_path = os.path.join(tmp_dir, "synthetic.mp4")
+            self._write_video(video_path)
+
+            sharded = ShardedVideoProcessor(StubModel, StubDrawer, num_workers=2)
+            (output_video_path, _), detections = sharded.process_video(
+                video_path, frame_rate=1, store_video_path=tmp_dir)
+
+            cap = cv2.VideoCapture(output_video_path)
+            output_frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+
+        self.assertEqual([frame_idx for frame_idx, _, _ in detections], list(range(45)))
+        self.assertEqual(output_frame_count, 45)
+
+    @unittest.skipIf(find_ffmpeg() is None, "ffmpeg is not available")
+    @patch('processor.frame_processor.FrameProcessor.compile_video')
+    def test_concatenates_segments_with_the_source_audio_without_reencoding(self, mock_compile_video):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            video_path = os.path.join(tmp_dir, "synthetic.mp4")
+            subprocess.run([
+                find_ffmpeg(), "-y", "-loglevel", "error",
+                "-f", "lavfi", "-i", "testsrc=size=64x48:rate=30:duration=1.5",
+                "-f", "lavfi", "-i", "sine=frequency=440:duration=3",
+                "-c:v", "libx264", "-c:a", "aac", video_path,
+            ], check=True)
+
+            sharded = ShardedVideoProcessor(StubModel, StubDrawer, num_workers=2)
+            (output_video_path, _), _ = sharded.process_video(video_path, frame_rate=1, store_video_path=tmp_dir)
+
+            cap = cv2.VideoCapture(output_video_path)
+            output_frame_count = 0
+            while cap.read()[0]:
+                output_frame_count += 1
+            cap.release()
+            listing = subprocess.run([find_ffmpeg(), "-hide_banner", "-i", output_video_path],
+                                     capture_output=True, text=True).stderr
+
+        self.assertFalse(mock_compile_video.called)
+        self.assertEqual(output_frame_count, 45)
+        self.assertIn("Audio: aac", listing)
+        self.assertIn("Duration: 00:00:01.5", listing)
+
+    @patch('processor.sharding.find_ffmpeg', return_value=None)
+    @patch('processor.frame_processor.FrameProcessor._load_audio', return_value=None)
+    @patch('processor.frame_processor.FrameProcessor.compile_video')
+    def test_writes_lossless_segments_without_ffmpeg(self, mock_compile_video, mock_load_audio, mock_find_ffmpeg):
+        stitched = []
+        mock_compile_video.side_effect = lambda frames, *args: (stitched.extend(frames), (None, None))[1]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            video_path = os.path.join(tmp_dir, "synthetic.mp4")
+            self._write_video(video_path)
+            cap = cv2.VideoCapture(video_path)
+            source_frames = []
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                source_frames.append(frame)
+            cap.release()
+
+            sharded = ShardedVideoProcessor(StubModel, StubDrawer, num_workers=2)
+            sharded.process_video(video_path, frame_rate=1, store_video_path=tmp_dir)
+
+        self.assertEqual(len(stitched), 45)
+        for frame, source_frame in zip(stitched, source_frames):
+            self.assertTrue(np.array_equal(frame, source_frame))
+
+    def test_writes_detection_records_of_every_shard_in_order(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            video_path = os.path.join(tmp_dir, "synthetic.mp4")
+            self._write_video(video_path)
+            sink = MagicMock()
+
+            sharded = ShardedVideoProcessor(ScoringStubModel, StubDrawer, num_workers=2)
+            sharded.process_video(video_path, frame_rate=1, detection_sink=sink)
+
+        records = [call.args[0] for call in sink.write.call_args_list]
+        self.assertEqual([record["frame_idx"] for record in records], list(range(45)))
+        self.assertEqual(records[30]["timestamp_ms"], 1000)
+        self.assertEqual(records[0]["names"], ["person"])
+        self.assertEqual(records[0]["scores"], [0.97])
+
+    def test_saves_images_with_the_image_writer_of_each_worker(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            video_path = os.path.join(tmp_dir, "synthetic.mp4")
+            self._write_video(video_path, frame_count=10)
+            image_path = os.path.join(tmp_dir, "images")
+            os.makedirs(image_path)
+
+            sharded = ShardedVideoProcessor(StubModel, StubDrawer, num_workers=2,
+                                            image_writer_factory=functools.partial(AsyncImageWriter, image_format="jpg"))
+            sharded.process_video(video_path, frame_rate=1, image_path=image_path)
+
+            names = os.listdir(image_path)
+        self.assertEqual(len(names), 10)
+        self.assertTrue(all(name.endswith(".jpg") for name in names))
+
+if __name__ == '__main__':
+    unittest.main()
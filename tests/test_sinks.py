@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+from processor.frame_processor import FrameProcessor
+from processor.sinks import JsonlDetectionSink, open_detection_sink
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+class StubModel:
+    id2label = {1: "person"}
+
+    def analyze_frames(self, frames, return_scores=False):
+        return [([1], np.array([[0.5, 0.5, 0.5, 0.5]]), np.array([0.95])) for _ in frames]
+
+class TestDetectionSinks(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.frames = [(idx * 10, np.zeros((40, 80, 3), dtype=np.uint8)) for idx in range(3)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_writes_detections_as_json_lines(self):
+        path = os.path.join(self.tmp_dir.name, "detections.jsonl")
+        drawer = MagicMock()
+        processor = FrameProcessor(StubModel(), drawer, batch_size=2, detection_sink=JsonlDetectionSink(path))
+        processor.fps = 20
+
+        self.assertEqual(len(list(processor.detect_frames(self.frames))), 3)
+        processor.detection_sink.close()
+
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record["frame_idx"] for record in records], [0, 10, 20])
+        self.assertEqual([record["timestamp_ms"] for record in records], [0.0, 500.0, 1000.0])
+        self.assertEqual(records[0]["names"], ["person"])
+        self.assertAlmostEqual(records[0]["scores"][0], 0.95, places=5)
+        self.assertEqual(records[0]["boxes"], [[20, 10, 60, 30]])
+        self.assertFalse(drawer.draw_detections.called)
+
+    def test_writes_unknown_scores_as_null(self):
+        path = os.path.join(self.tmp_dir.name, "detections.jsonl")
+        with JsonlDetectionSink(path) as sink:
+            sink.write({"frame_idx": 0, "timestamp_ms": 0.0, "labels": [1], "names": ["person"],
+                        "scores": [float("nan")], "boxes": [[0, 0, 1, 1]]})
+
+        with open(path) as f:
+            self.assertIsNone(json.loads(f.readline())["scores"][0])
+
+    @unittest.skipIf(pq is None, "pyarrow is not installed")
+    def test_writes_detections_as_parquet(self):
+        path = os.path.join(self.tmp_dir.name, "detections.parquet")
+        processor = FrameProcessor(StubModel(), MagicMock(), detection_sink=open_detection_sink(path))
+        processor.fps = 20
+
+        list(processor.detect_frames(self.frames))
+        processor.detection_sink.close()
+
+        table = pq.read_table(path)
+        self.assertEqual(table.column("frame_idx").to_pylist(), [0, 10, 20])
+        self.assertEqual(table.column("boxes").to_pylist()[0], [[20, 10, 60, 30]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+import torch
+from detection.tiling import TiledDetector, batched_nms
+
+class TestBatchedNMS(unittest.TestCase):
+    def test_suppresses_overlaps_within_groups_only(self):
+        boxes = torch.tensor([[0, 0, 10, 10], [1, 1, 10, 10], [0, 0, 10, 10], [20, 20, 30, 30]], dtype=torch.float64)
+        scores = torch.tensor([0.9, 0.95, 0.8, 0.7], dtype=torch.float64)
+        groups = torch.tensor([0, 0, 1, 0])
+
+        keep = batched_nms(boxes, scores, groups, 0.5)
+
+        self.assertEqual(keep.tolist(), [1, 2, 3])
+
+    def test_handles_no_boxes(self):
+        keep = batched_nms(torch.empty((0, 4)), torch.empty(0), torch.empty(0, dtype=torch.int64), 0.5)
+
+        self.assertEqual(len(keep), 0)
+
+class TestTiledDetector(unittest.TestCase):
+    def setUp(self):
+        self.model = MagicMock()
+        self.model.threshold = 0.9
+        self.model.model_id = "detr"
+
+    def test_lays_out_overlapping_tiles_over_the_roi(self):
+        detector = TiledDetector(self.model, roi=(100, 50, 300, 200), tiles=(2, 2), overlap=0.5)
+
+        windows = detector.tile_windows(1920, 1080)
+
+        self.assertEqual(windows, [(100, 50, 300, 183), (200, 50, 400, 183),
+                                   (100, 117, 300, 250), (200, 117, 400, 250)])
+
+    def test_clips_roi_to_frame(self):
+        detector = TiledDetector(self.model, roi=(-10, -10, 50, 5000))
+
+        self.assertEqual(detector.tile_windows(100, 80), [(0, 0, 40, 80)])
+
+    def test_analyzes_all_tiles_in_one_batch_and_merges_duplicates(self):
+        # Each tile sees the same object at the middle of the frame, in tile coordinates
+        def analyze_frames(crops, return_scores=False):
+            results = []
+            for i, crop in enumerate(crops):
+                left = 0 if i % 2 == 0 else 44
+                box = np.array([[(50 - left) / crop.shape[1], 0.5, 10 / crop.shape[1], 0.5]])
+                results.append(([1], box, np.array([0.9 + 0.01 * i])))
+            return results
+        self.model.analyze_frames.side_effect = analyze_frames
+        detector = TiledDetector(self.model, tiles=(1, 2), overlap=0.2)
+
+        frames = [np.zeros((40, 100, 3), dtype=np.uint8), np.zeros((40, 100, 3), dtype=np.uint8)]
+        results = detector.analyze_frames(frames, return_scores=True)
+
+        self.assertEqual(self.model.analyze_frames.call_count, 1)
+        self.assertEqual(len(self.model.analyze_frames.call_args.args[0]), 4)
+        for labels, boxes, scores in results:
+            self.assertEqual(labels, [1])
+            self.assertTrue(np.allclose(boxes, [[0.5, 0.5, 0.1, 0.5]]))
+        self.assertTrue(np.allclose([scores[0] for _, _, scores in results], [0.91, 0.93]))
+
+    def test_model_id_depends_on_tiling(self):
+        full = TiledDetector(self.model)
+        tiled = TiledDetector(self.model, tiles=(2, 2))
+
+        self.assertNotEqual(full.model_id, tiled.model_id)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+from processor.change_detector import FrameChangeDetector
+from processor.frame_processor import FrameProcessor
+from processor.tracker import IoUTracker, box_iou
+
+class TestIoUTracker(unittest.TestCase):
+    def test_computes_iou_of_boxes(self):
+        iou = box_iou([[0.5, 0.5, 0.2, 0.2]], [[0.5, 0.5, 0.2, 0.2], [0.6, 0.5, 0.2, 0.2], [0.9, 0.9, 0.1, 0.1]])
+
+        self.assertTrue(np.allclose(iou, [[1.0, 1 / 3, 0.0]]))
+
+    def test_keeps_ids_of_moving_objects(self):
+        tracker = IoUTracker()
+        _, _, _, first_ids = tracker.update(0, [1, 77], [[0.2, 0.2, 0.1, 0.1], [0.7, 0.7, 0.2, 0.2]])
+        _, _, _, second_ids = tracker.update(2, [77, 1], [[0.72, 0.7, 0.2, 0.2], [0.22, 0.2, 0.1, 0.1]])
+
+        self.assertEqual(len(set(first_ids)), 2)
+        self.assertEqual(second_ids, first_ids[::-1])
+
+    def test_does_not_match_different_labels(self):
+        tracker = IoUTracker()
+        _, _, _, first_ids = tracker.update(0, [1], [[0.5, 0.5, 0.2, 0.2]])
+        _, _, _, second_ids = tracker.update(1, [77], [[0.5, 0.5, 0.2, 0.2]])
+
+        self.assertNotEqual(first_ids, second_ids)
+
+    def test_predicts_boxes_with_constant_velocity(self):
+        tracker = IoUTracker(smoothing=1.0)
+        tracker.update(0, [1], [[0.20, 0.5, 0.1, 0.1]])
+        tracker.update(4, [1], [[0.24, 0.5, 0.1, 0.1]])
+
+        labels, boxes, _, track_ids = tracker.predict(6)
+
+        self.assertEqual(labels, [1])
+        self.assertEqual(track_ids, [1])
+        self.assertTrue(np.allclose(boxes, [[0.26, 0.5, 0.1, 0.1]]))
+
+    def test_drops_tracks_after_max_misses(self):
+        tracker = IoUTracker(max_misses=1)
+        tracker.update(0, [1], [[0.5, 0.5, 0.2, 0.2]])
+        tracker.update(1, [], np.empty((0, 4)))
+
+        self.assertEqual(tracker.predict(2)[0], [])
+        _, _, _, track_ids = tracker.update(2, [1], [[0.5, 0.5, 0.2, 0.2]])
+        self.assertEqual(track_ids, [1])
+
+        tracker.update(3, [], np.empty((0, 4)))
+        tracker.update(4, [], np.empty((0, 4)))
+        _, _, _, track_ids = tracker.update(5, [1], [[0.5, 0.5, 0.2, 0.2]])
+        self.assertEqual(track_ids, [2])
+
+    def test_frame_processor_tracks_between_analyzed_frames(self):
+        model = MagicMock()
+        model.analyze_frames.side_effect = lambda frames: [
+            ([1], np.array([[0.2 + 0.1 * model.analyze_frames.call_count, 0.5, 0.4, 0.4]])) for _ in frames]
+        processor = FrameProcessor(model, MagicMock(), batch_size=1, detect_every=3, tracker=IoUTracker(smoothing=1.0))
+
+        frames = [(idx, np.zeros((4, 4, 3), dtype=np.uint8)) for idx in range(7)]
+        detections = list(processor.detect_frames(frames))
+
+        self.assertEqual(processor.inference_count, 3)
+        self.assertEqual(processor.skipped_inferences, 4)
+        self.assertEqual([labels for _, _, labels, _ in detections], [[1]] * 7)
+        centers = [float(boxes[0][0]) for _, _, _, boxes in detections]
+        self.assertTrue(np.allclose(centers, [0.3, 0.3, 0.3, 0.4, 0.4333, 0.4667, 0.5], atol=1e-3))
+
+    def test_frame_processor_drops_tracks_on_scene_cuts(self):
+        model = MagicMock()
+        model.analyze_frames.side_effect = lambda frames: [([1], np.array([[0.5, 0.5, 0.2, 0.2]])) for _ in frames]
+        processor = FrameProcessor(model, MagicMock(), batch_size=3, change_detector=FrameChangeDetector(threshold=2.0),
+                                   tracker=IoUTracker())
+        frames = [(idx, np.full((48, 64, 3), value, dtype=np.uint8)) for idx, value in enumerate([50, 60, 200])]
+
+        track_ids = [ids for _, _, _, ids in processor._analyze_batch(frames)]
+
+        self.assertEqual(track_ids[0], track_ids[1])
+        self.assertNotEqual(track_ids[1], track_ids[2])
+
+if __name__ == '__main__':
+    unittest.main()
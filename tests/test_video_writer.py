@@ -0,0 +1,144 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import cv2
+import numpy as np
+from processor.frame_processor import FrameProcessor
+from processor.video_writer import FFmpegVideoWriter, find_ffmpeg, probe_audio_codec
+
+@unittest.skipIf(find_ffmpeg() is None, "ffmpeg is not available")
+class TestFFmpegVideoWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.tmp_dir.name, "source.mp4")
+        subprocess.run([
+            find_ffmpeg(), "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc=size=64x48:rate=10:duration=2",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=2",
+            "-c:v", "libx264", "-c:a", "aac", "-shortest", self.source_path,
+        ], check=True)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _streams(self, video_path):
+        result = subprocess.run([find_ffmpeg(), "-hide_banner", "-i", video_path], capture_output=True, text=True)
+        return [line.strip() for line in result.stderr.splitlines() if "Stream #" in line]
+
+    def test_copies_source_audio_stream(self):
+        output_path = os.path.join(self.tmp_dir.name, "output.mp4")
+        writer = FFmpegVideoWriter(output_path, 10, (64, 48), audio_source=self.source_path)
+        for idx in range(20):
+            writer.write(np.full((48, 64, 3), idx * 10, dtype=np.uint8))
+        writer.release()
+
+        streams = self._streams(output_path)
+        self.assertTrue(any("Video: h264" in stream for stream in streams))
+        self.assertTrue(any("Audio: aac" in stream for stream in streams))
+        cap = cv2.VideoCapture(output_path)
+        self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 20)
+        cap.release()
+
+    def _frame_count(self, video_path):
+        cap = cv2.VideoCapture(video_path)
+        count = 0
+        while cap.read()[0]:
+            count += 1
+        cap.release()
+        return count
+
+    def test_keeps_every_frame_when_audio_is_shorter(self):
+        short_path = os.path.join(self.tmp_dir.name, "short.m4a")
+        subprocess.run([find_ffmpeg(), "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=1",
+                        "-c:a", "aac", short_path], check=True)
+        output_path = os.path.join(self.tmp_dir.name, "output.mp4")
+        writer = FFmpegVideoWriter(output_path, 10, (64, 48), audio_source=short_path)
+        for idx in range(30):
+            writer.write(np.full((48, 64, 3), idx * 5, dtype=np.uint8))
+        writer.release()
+
+        self.assertTrue(any("Audio: aac" in stream for stream in self._streams(output_path)))
+        self.assertEqual(self._frame_count(output_path), 30)
+
+    def test_cuts_audio_longer_than_the_frames(self):
+        output_path = os.path.join(self.tmp_dir.name, "output.mp4")
+        writer = FFmpegVideoWriter(output_path, 10, (64, 48), audio_source=self.source_path)
+        for idx in range(5):
+            writer.write(np.full((48, 64, 3), idx * 40, dtype=np.uint8))
+        writer.release()
+
+        self.assertEqual(self._frame_count(output_path), 5)
+        duration = subprocess.run([find_ffmpeg(), "-hide_banner", "-i", output_path], capture_output=True, text=True).stderr
+        self.assertIn("Duration: 00:00:00.5", duration)
+        self.assertEqual(os.listdir(self.tmp_dir.name).count("output.partial.mp4"), 0)
+
+    def test_reports_ffmpeg_errors_when_it_exits_early(self):
+        output_path = os.path.join(self.tmp_dir.name, "output.mp4")
+        writer = FFmpegVideoWriter(output_path, 10, (64, 48))
+        writer.process.stdin.close()
+        writer.process.wait()
+        writer.process.stdin = MagicMock()
+        writer.process.stdin.write.side_effect = BrokenPipeError
+
+        with self.assertRaises(RuntimeError):
+            writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+
+    def test_encodes_audio_the_container_cannot_store(self):
+        mulaw_path = os.path.join(self.tmp_dir.name, "mulaw.mkv")
+        subprocess.run([find_ffmpeg(), "-y", "-loglevel", "error", "-i", self.source_path, "-c:v", "copy",
+                        "-c:a", "pcm_mulaw", mulaw_path], check=True)
+        self.assertEqual(probe_audio_codec(mulaw_path), "pcm_mulaw")
+        output_path = os.path.join(self.tmp_dir.name, "output.mp4")
+        writer = FFmpegVideoWriter(output_path, 10, (64, 48), audio_source=mulaw_path)
+        writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+        writer.release()
+
+        self.assertTrue(any("Audio: aac" in stream for stream in self._streams(output_path)))
+
+    def test_writes_video_without_audio_stream(self):
+        silent_path = os.path.join(self.tmp_dir.name, "silent.mp4")
+        subprocess.run([find_ffmpeg(), "-y", "-loglevel", "error", "-i", self.source_path, "-an", "-c", "copy", silent_path],
+                       check=True)
+        output_path = os.path.join(self.tmp_dir.name, "output.mp4")
+        writer = FFmpegVideoWriter(output_path, 10, (64, 48), audio_source=silent_path)
+        writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+        writer.release()
+
+        self.assertFalse(any("Audio:" in stream for stream in self._streams(output_path)))
+
+    def test_rejects_frames_of_the_wrong_size(self):
+        writer = FFmpegVideoWriter(os.path.join(self.tmp_dir.name, "output.mp4"), 10, (64, 48))
+
+        with self.assertRaises(ValueError):
+            writer.write(np.zeros((10, 10, 3), dtype=np.uint8))
+        writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+        writer.release()
+
+    def test_compile_video_muxes_in_a_single_pass(self):
+        processor = FrameProcessor(MagicMock(), MagicMock())
+        frames = (np.zeros((48, 64, 3), dtype=np.uint8) for _ in range(5))
+
+        output_video_path, output_video_and_audio_path = processor.compile_video(
+            frames, self.tmp_dir.name, fps=10, audio=processor._load_audio(self.source_path))
+
+        self.assertEqual(output_video_path, output_video_and_audio_path)
+        self.assertTrue(any("Audio: aac" in stream for stream in self._streams(output_video_path)))
+        self.assertFalse(any(name.endswith(".mp3") for name in os.listdir(self.tmp_dir.name)))
+
+class TestCompileVideo(unittest.TestCase):
+    @patch('cv2.VideoWriter')
+    def test_releases_writer_when_frames_fail(self, mock_video_writer):
+        def frames():
+            yield np.zeros((48, 64, 3), dtype=np.uint8)
+            raise RuntimeError("decoding failed")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(RuntimeError):
+                FrameProcessor(MagicMock(), MagicMock()).compile_video(frames(), tmp_dir, fps=10)
+
+        mock_video_writer.return_value.release.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()